@@ -0,0 +1,120 @@
+# Benchmark: memory held by the probed clips
+#
+# Probes CLIPS simulated clips (canned ffprobe JSON, parsed for each clip as the ffprobe output would be) and measures
+# with tracemalloc the memory still held once the clips are probed, and the peak while probing (times include the
+# tracemalloc overhead), for:
+# - legacy: the per-clip dicts probe_clips used to build (kept below), holding the ffprobe video stream dict
+# - compact: core.probe_clips and its ClipRecord / ClipMetadata records (multicam_sync/clip_store.py)
+#
+#   python benchmarks/bench_clip_memory.py --clips 100000 --cameras 8
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import simulated_resolve
+from bench_sync import create_footage
+from multicam_sync import core, probe, resolve_api
+from multicam_sync.settings import SyncSettings
+
+
+def legacy_build_clip_metadata(file_path: str, ffmpeg_metadata: dict) -> dict:
+    # the clip_metadata dict of probe.build_clip_metadata before the compact records
+    main_video_stream = [stream for stream in ffmpeg_metadata["streams"] if stream["codec_type"] == "video"][0]
+    return {
+        "file_path": file_path,
+        "video_stream": main_video_stream,
+        "nb_streams": ffmpeg_metadata["format"]["nb_streams"],
+        "size_bytes": int(ffmpeg_metadata["format"]["size"]),
+        "duration_seconds": float(ffmpeg_metadata["format"]["duration"]),
+        "frame_rate": main_video_stream["r_frame_rate"],
+        "nb_frames": int(float(main_video_stream["nb_frames"])),
+        "creation_time": datetime.fromisoformat(ffmpeg_metadata["format"]["tags"]["creation_time"]),
+        "os_creation_time": datetime.fromtimestamp(os.path.getctime(file_path)),
+        "width": main_video_stream["width"],
+        "height": main_video_stream["height"],
+        "codec_name": main_video_stream["codec_name"],
+        "codec_long_name": main_video_stream["codec_long_name"],
+    }
+
+def legacy_probe_clips(probe_jobs: list[dict], settings: SyncSettings, frame_rate) -> dict:
+    # all the probe results are held until the records are built, as probe_clips used to do
+    ffmpeg_results = [probe.probe_file(probe_job["file_path"]) for probe_job in probe_jobs]
+    cameras = {}
+    for probe_job, ffmpeg_metadata in zip(probe_jobs, ffmpeg_results):
+        clip_record = {
+            "clip": probe_job["clip"],
+            "clip_name": probe_job["clip_name"],
+            "metadata": legacy_build_clip_metadata(probe_job["file_path"], ffmpeg_metadata),
+            "camera_name": probe_job["camera_name"],
+        }
+        cameras.setdefault(probe_job["camera_name"], {"clips": []})["clips"].append(clip_record)
+    return cameras
+
+def compact_probe_clips(probe_jobs: list[dict], settings: SyncSettings, frame_rate) -> dict:
+    cameras, report = core.probe_clips(probe_jobs, settings, frame_rate)
+    return cameras
+
+
+def use_canned_probe_output(canned_json: dict) -> None:
+    def probe_canned_file(file_path, use_native_parser: bool = True) -> dict:
+        return json.loads(canned_json[file_path])
+
+    probe.probe_file = probe_canned_file
+
+
+def measure(run, probe_jobs: list[dict], settings: SyncSettings, frame_rate) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    cameras = run(probe_jobs, settings, frame_rate)
+    elapsed_seconds = time.perf_counter() - start_time
+    gc.collect()
+    retained_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    nb_clips = sum(len(camera["clips"]) for camera in cameras.values())
+    return {"nb_clips": nb_clips, "retained_bytes": retained_bytes, "peak_bytes": peak_bytes, "seconds": elapsed_seconds}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the memory held by the probed clips")
+    parser.add_argument("--clips", type=int, default=100000)
+    parser.add_argument("--cameras", type=int, default=8)
+    parser.add_argument("--probe-workers", type=int, default=4)
+    args = parser.parse_args()
+
+    nb_clips_per_camera = max(1, args.clips // args.cameras)
+    footage_directory = tempfile.mkdtemp(prefix="multicam_sync_bench_memory_")
+    try:
+        print(f"Creating {args.cameras}x{nb_clips_per_camera} placeholder clips...")
+        file_paths_by_camera = create_footage(footage_directory, args.cameras, nb_clips_per_camera, "canned")
+        use_canned_probe_output({file_path: json.dumps(result) for file_path, result in simulated_resolve.canned_probe_results(file_paths_by_camera).items()})
+
+        project = simulated_resolve.build_project(simulated_resolve.ApiCalls(), file_paths_by_camera)
+        frame_rate = resolve_api.get_project_frame_rate(project)
+        camera_names, probe_jobs = core.enumerate_clips(resolve_api.find_folder(project.GetMediaPool()))
+        settings = SyncSettings(show_ui=False, probe_concurrency=max(1, args.probe_workers), use_metadata_cache=False, use_probe_service=False)
+
+        results = {}
+        for name, run in (("legacy", legacy_probe_clips), ("compact", compact_probe_clips)):
+            results[name] = measure(run, probe_jobs, settings, frame_rate)
+    finally:
+        shutil.rmtree(footage_directory, ignore_errors=True)
+
+    print(f"{'layout':<10} {'clips':>8} {'retained MB':>12} {'bytes/clip':>11} {'peak MB':>9} {'time s':>8}")
+    for name, result in results.items():
+        print(f"{name:<10} {result['nb_clips']:8d} {result['retained_bytes'] / 1e6:12.1f} {result['retained_bytes'] / result['nb_clips']:11.0f} {result['peak_bytes'] / 1e6:9.1f} {result['seconds']:8.2f}")
+    print(f"compact / legacy: {results['compact']['retained_bytes'] / results['legacy']['retained_bytes']:.2f}x retained, {results['compact']['peak_bytes'] / results['legacy']['peak_bytes']:.2f}x peak")
+
+
+if __name__ == "__main__":
+    main()
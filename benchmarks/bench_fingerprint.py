@@ -0,0 +1,93 @@
+# Benchmark: sampled content fingerprints (multicam_sync/fingerprint.py) vs hashing the whole file
+#
+# Generates CLIPS files of CLIP_SIZE_MB random data (or uses an existing folder of clips) and reports the time to
+# fingerprint them, sequentially and on the probe worker pool, and to hash them whole with the same hash. On a
+# generated corpus the files are in the page cache: on camera cards and network shares the gap is wider, as a full
+# hash reads the whole clip where a fingerprint reads three 64 KB blocks.
+#
+#   python benchmarks/bench_fingerprint.py --clips 200 --clip-size-mb 50
+#   python benchmarks/bench_fingerprint.py --corpus "F:\Footage\camera1\CLIP"
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from multicam_sync.fingerprint import compute_fingerprint, compute_fingerprints_parallel
+from multicam_sync.resolve_api import VIDEO_FILE_EXTENSIONS
+
+
+def create_corpus(directory: str, nb_clips: int, clip_size_mb: int) -> list[str]:
+    file_paths = []
+    chunk = os.urandom(1024 * 1024)
+    for clip_index in range(nb_clips):
+        file_path = os.path.join(directory, f"C{clip_index:04d}.MP4")
+        with open(file_path, "wb") as file:
+            file.write(os.urandom(64)) # files differ from their first block on, like camera headers
+            for _ in range(clip_size_mb):
+                file.write(chunk)
+        file_paths.append(file_path)
+    return file_paths
+
+
+def hash_whole_file(file_path: str) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as file:
+        while True:
+            data = file.read(1024 * 1024)
+            if (not data):
+                break
+            hasher.update(data)
+    return hasher.hexdigest()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the cost of the sampled content fingerprints")
+    parser.add_argument("--clips", type=int, default=200)
+    parser.add_argument("--clip-size-mb", type=int, default=50)
+    parser.add_argument("--corpus", help="folder of existing clips to use instead of a generated corpus")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+
+    corpus_directory = None
+    if (args.corpus):
+        file_paths = sorted(os.path.join(args.corpus, name) for name in os.listdir(args.corpus) if name.lower().endswith(VIDEO_FILE_EXTENSIONS))
+    else:
+        corpus_directory = tempfile.mkdtemp(prefix="multicam_sync_bench_fingerprint_")
+        print(f"Creating {args.clips} clips of {args.clip_size_mb} MB...")
+        file_paths = create_corpus(corpus_directory, args.clips, args.clip_size_mb)
+    try:
+        total_mb = sum(os.path.getsize(file_path) for file_path in file_paths) / 1e6
+
+        start_time = time.perf_counter()
+        fingerprints = [compute_fingerprint(file_path) for file_path in file_paths]
+        sequential_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        parallel_fingerprints = compute_fingerprints_parallel(file_paths, args.workers, lambda nb_done, clips_per_second: None, lambda: False)
+        parallel_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for file_path in file_paths:
+            hash_whole_file(file_path)
+        full_hash_seconds = time.perf_counter() - start_time
+    finally:
+        if (corpus_directory != None):
+            shutil.rmtree(corpus_directory, ignore_errors=True)
+
+    nb_clips = len(file_paths)
+    print(f"{nb_clips} clips, {total_mb:.0f} MB")
+    print(f"{'method':<28} {'total s':>8} {'ms/clip':>8}")
+    print(f"{'fingerprint, sequential':<28} {sequential_seconds:8.3f} {sequential_seconds / nb_clips * 1000:8.2f}")
+    print(f"{f'fingerprint, {args.workers} workers':<28} {parallel_seconds:8.3f} {parallel_seconds / nb_clips * 1000:8.2f}")
+    print(f"{'whole-file hash':<28} {full_hash_seconds:8.3f} {full_hash_seconds / nb_clips * 1000:8.2f}")
+    print(f"distinct fingerprints: {len(set(fingerprints))} of {nb_clips}, parallel results identical: {parallel_fingerprints == dict(zip(file_paths, fingerprints))}")
+
+
+if (__name__ == "__main__"):
+    main()
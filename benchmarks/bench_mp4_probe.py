@@ -0,0 +1,178 @@
+# Benchmark: native MP4 header parser (multicam_sync/mp4.py) vs ffprobe
+#
+# Generates a corpus of synthetic camera-like MP4 files (moov after a large, sparse mdat, like Sony C0001.MP4)
+# or uses an existing folder of clips, probes every file with both backends and reports per-clip cost,
+# throughput and any disagreement on the fields the sync uses.
+#
+#   python benchmarks/bench_mp4_probe.py --clips 500 --clip-size-mb 200
+#   python benchmarks/bench_mp4_probe.py --corpus "F:\Footage\camera1\CLIP"
+
+import argparse
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import json
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from multicam_sync import mp4 as mp4_probe
+
+FRAME_RATES = [(25, 1), (30000, 1001), (24000, 1001), (50, 1), (60000, 1001)]
+COMPARED_FIELDS = ["creation_time", "duration", "nb_streams", "codec_name", "width", "height", "r_frame_rate", "nb_frames"]
+
+
+# --- Synthetic corpus ---
+
+def box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def full_box(box_type: bytes, version: int, payload: bytes) -> bytes:
+    return box(box_type, struct.pack(">I", version << 24) + payload)
+
+
+IDENTITY_MATRIX = struct.pack(">9I", 0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000)
+
+
+def build_moov(creation_time: datetime, frame_rate: tuple[int, int], nb_frames: int, width: int, height: int, mdat_payload_offset: int) -> bytes:
+    timescale, frame_delta = frame_rate
+    duration = nb_frames * frame_delta
+    mp4_time = int(creation_time.timestamp()) + mp4_probe.MP4_EPOCH_OFFSET
+
+    mvhd = full_box(b"mvhd", 0, struct.pack(">IIIIIH10x", mp4_time, mp4_time, timescale, duration, 0x00010000, 0x0100) + IDENTITY_MATRIX + bytes(24) + struct.pack(">I", 2))
+    tkhd = full_box(b"tkhd", 0, struct.pack(">IIIII8xHHH2x", mp4_time, mp4_time, 1, 0, duration, 0, 0, 0) + IDENTITY_MATRIX + struct.pack(">II", width << 16, height << 16))
+    mdhd = full_box(b"mdhd", 0, struct.pack(">IIIIHH", mp4_time, mp4_time, timescale, duration, 0x55C4, 0))
+    hdlr = full_box(b"hdlr", 0, struct.pack(">I4s12x", 0, b"vide") + b"VideoHandler\x00")
+    avc1 = box(b"avc1", bytes(6) + struct.pack(">H16xHHIIIH32sHh", 1, width, height, 0x00480000, 0x00480000, 0, 1, b"", 0x18, -1))
+    stsd = full_box(b"stsd", 0, struct.pack(">I", 1) + avc1)
+    stts = full_box(b"stts", 0, struct.pack(">III", 1, nb_frames, frame_delta))
+    stsc = full_box(b"stsc", 0, struct.pack(">IIII", 1, 1, nb_frames, 1))
+    stsz = full_box(b"stsz", 0, struct.pack(">II", 1, nb_frames))
+    stco = full_box(b"stco", 0, struct.pack(">II", 1, mdat_payload_offset))
+    stbl = box(b"stbl", stsd + stts + stsc + stsz + stco)
+    minf = box(b"minf", full_box(b"vmhd", 1, bytes(8)) + stbl)
+    mdia = box(b"mdia", mdhd + hdlr + minf)
+    trak = box(b"trak", tkhd + mdia)
+    return box(b"moov", mvhd + trak)
+
+
+def write_synthetic_clip(file_path: str, creation_time: datetime, frame_rate: tuple[int, int], nb_frames: int, size_bytes: int) -> None:
+    ftyp = box(b"ftyp", b"XAVC" + struct.pack(">I", 0x01000000) + b"XAVCmp42iso2")
+    mdat_size = max(16, size_bytes - len(ftyp))
+    moov = build_moov(creation_time, frame_rate, nb_frames, 3840, 2160, len(ftyp) + 8)
+
+    with open(file_path, "wb") as file:
+        file.write(ftyp)
+        file.write(struct.pack(">I4s", mdat_size, b"mdat"))
+        # leave the mdat payload as a sparse hole, only the headers matter for probing
+        file.seek(len(ftyp) + mdat_size)
+        file.write(moov)
+
+
+def generate_corpus(directory: str, nb_clips: int, clip_size_bytes: int) -> list[str]:
+    file_paths = []
+    creation_time = datetime(2024, 6, 22, 10, 0, 0, tzinfo=timezone.utc)
+    for clip_index in range(nb_clips):
+        frame_rate = FRAME_RATES[clip_index % len(FRAME_RATES)]
+        nb_frames = 300 + (clip_index * 37) % 9000
+        file_path = os.path.join(directory, f"C{clip_index + 1:04d}.MP4")
+        write_synthetic_clip(file_path, creation_time, frame_rate, nb_frames, clip_size_bytes)
+        file_paths.append(file_path)
+        creation_time += timedelta(seconds=nb_frames * frame_rate[1] / frame_rate[0] + 5)
+    return file_paths
+
+
+# --- Probing ---
+
+def run_ffprobe(file_path: str) -> dict:
+    cmd = ['ffprobe', file_path, '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams']
+    completed = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=30)
+    if completed.returncode != 0:
+        raise RuntimeError(f"ffprobe failed for '{file_path}' (exit code {completed.returncode})")
+    return json.loads(completed.stdout)
+
+
+def summarize(probe_result: dict) -> dict:
+    video_stream = next(stream for stream in probe_result["streams"] if stream["codec_type"] == "video")
+    return {
+        "creation_time": datetime.fromisoformat(probe_result["format"]["tags"]["creation_time"].replace("Z", "+00:00")),
+        "duration": round(float(probe_result["format"]["duration"]), 3),
+        "nb_streams": int(probe_result["format"]["nb_streams"]),
+        "codec_name": video_stream["codec_name"],
+        "width": int(video_stream["width"]),
+        "height": int(video_stream["height"]),
+        "r_frame_rate": video_stream["r_frame_rate"],
+        "nb_frames": int(float(video_stream["nb_frames"])),
+    }
+
+
+def time_backend(probe, file_paths: list[str]) -> tuple[float, dict, int]:
+    results = {}
+    nb_failures = 0
+    start_time = time.perf_counter()
+    for file_path in file_paths:
+        try:
+            results[file_path] = summarize(probe(file_path))
+        except Exception:
+            nb_failures += 1
+    return time.perf_counter() - start_time, results, nb_failures
+
+
+def print_backend(name: str, elapsed_seconds: float, nb_files: int, nb_failures: int) -> None:
+    per_clip_ms = elapsed_seconds / max(1, nb_files) * 1000
+    clips_per_second = nb_files / elapsed_seconds if elapsed_seconds > 0 else float("inf")
+    print(f"{name:<10} {elapsed_seconds:9.3f}s {per_clip_ms:10.3f} ms/clip {clips_per_second:10.1f} clips/s   failures: {nb_failures}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the native MP4 header parser with ffprobe")
+    parser.add_argument("--corpus", help="folder with existing clips (default: generate a synthetic corpus)")
+    parser.add_argument("--clips", type=int, default=500, help="number of synthetic clips to generate")
+    parser.add_argument("--clip-size-mb", type=int, default=200, help="apparent size of each synthetic clip (sparse file)")
+    parser.add_argument("--no-ffprobe", action="store_true", help="only time the native parser")
+    args = parser.parse_args()
+
+    temporary_directory = None
+    if args.corpus:
+        file_paths = sorted(
+            os.path.join(args.corpus, file_name) for file_name in os.listdir(args.corpus) if mp4_probe.is_supported_file(file_name))
+    else:
+        temporary_directory = tempfile.mkdtemp(prefix="mp4_probe_bench_")
+        print(f"Generating {args.clips} synthetic clips in '{temporary_directory}'...")
+        file_paths = generate_corpus(temporary_directory, args.clips, args.clip_size_mb * 1024 * 1024)
+
+    try:
+        print(f"Probing {len(file_paths)} files")
+        native_seconds, native_results, native_failures = time_backend(mp4_probe.probe_mp4, file_paths)
+        print_backend("native", native_seconds, len(file_paths), native_failures)
+
+        if args.no_ffprobe or shutil.which("ffprobe") == None:
+            print("ffprobe: skipped" + ("" if args.no_ffprobe else " (not found on PATH)"))
+            return
+
+        ffprobe_seconds, ffprobe_results, ffprobe_failures = time_backend(run_ffprobe, file_paths)
+        print_backend("ffprobe", ffprobe_seconds, len(file_paths), ffprobe_failures)
+        print(f"speedup: {ffprobe_seconds / native_seconds:.1f}x")
+
+        nb_mismatches = 0
+        for file_path, native_summary in native_results.items():
+            ffprobe_summary = ffprobe_results.get(file_path)
+            if ffprobe_summary == None:
+                continue
+            differences = [field for field in COMPARED_FIELDS if native_summary[field] != ffprobe_summary[field]]
+            if differences:
+                nb_mismatches += 1
+                print(f"mismatch in '{file_path}': " + ", ".join(f"{field}: {native_summary[field]} != {ffprobe_summary[field]}" for field in differences))
+        print(f"{nb_mismatches} files with fields differing from ffprobe")
+    finally:
+        if temporary_directory != None:
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
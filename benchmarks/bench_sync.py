@@ -0,0 +1,171 @@
+# Benchmark: the whole sync pipeline against a simulated Resolve media pool
+#
+# Runs enumerate_clips -> probe_clips -> compute_offsets -> make_sync_plan -> apply_sync -> analyze_recording -> build_timelines for scenarios of CAMERASxCLIPS clips and reports
+# the wall time and the number of Resolve API calls of each phase. Footage is either synthetic sparse MP4 files read by
+# the real probe code, or canned ffprobe JSON (no file is read, only the sync overhead is measured).
+# Results can be saved and compared with a previous run to spot regressions.
+#
+#   python benchmarks/bench_sync.py --scenarios 2x50 8x500 --latency-ms 0.2
+#   python benchmarks/bench_sync.py --scenarios 16x5000 --footage canned --save results.json
+#   python benchmarks/bench_sync.py --scenarios 2x50 8x500 --compare results.json
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import bench_mp4_probe
+import simulated_resolve
+from multicam_sync import core, plan, probe, resolve_api
+from multicam_sync.settings import SyncSettings
+
+PHASES = ["enumeration", "probing", "offsets", "plan", "write-back", "analysis", "timeline"]
+REGRESSION_THRESHOLD = 1.2 # compare: flag phases more than 20% slower...
+REGRESSION_MIN_SECONDS = 0.01 # ...unless they are too short to be timed reliably
+
+
+def parse_scenario(text: str) -> tuple[int, int]:
+    nb_cameras, nb_clips_per_camera = text.lower().split("x")
+    return int(nb_cameras), int(nb_clips_per_camera)
+
+
+def create_footage(directory: str, nb_cameras: int, nb_clips_per_camera: int, footage: str) -> dict:
+    # {camera_name: [file_path, ...]}; synthetic footage is kept between runs in `directory`
+    file_paths_by_camera = {}
+    for camera_index in range(nb_cameras):
+        camera_directory = os.path.join(directory, f"Camera{camera_index + 1}")
+        os.makedirs(camera_directory, exist_ok=True)
+        if (footage == "synthetic"):
+            existing_file_paths = sorted(os.path.join(camera_directory, file_name) for file_name in os.listdir(camera_directory))
+            if (len(existing_file_paths) >= nb_clips_per_camera):
+                file_paths = existing_file_paths[:nb_clips_per_camera]
+            else:
+                file_paths = bench_mp4_probe.generate_corpus(camera_directory, nb_clips_per_camera, 16 * 1024 * 1024)
+        else:
+            file_paths = [os.path.join(camera_directory, f"C{clip_index + 1:05d}.MP4") for clip_index in range(nb_clips_per_camera)]
+            for file_path in file_paths:
+                # distinct placeholders, so that the clips are not reported as duplicates of each other
+                with open(file_path, "w") as file:
+                    file.write(file_path)
+        file_paths_by_camera[f"Camera{camera_index + 1}"] = file_paths
+    return file_paths_by_camera
+
+
+def use_canned_probe_results(canned_results: dict, probe_latency_seconds: float) -> None:
+    def probe_canned_file(file_path, use_native_parser: bool = True) -> dict:
+        if (probe_latency_seconds > 0):
+            time.sleep(probe_latency_seconds)
+        return canned_results[file_path]
+
+    probe.probe_file = probe_canned_file
+
+
+def run_scenario(project, settings: SyncSettings, api_calls: simulated_resolve.ApiCalls) -> dict:
+    phases = {}
+
+    def timed(phase: str, function, *args):
+        api_calls.reset()
+        start_time = time.perf_counter()
+        result = function(*args)
+        phases[phase] = {"seconds": time.perf_counter() - start_time, "api_calls": sum(api_calls.reset().values())}
+        return result
+
+    frame_rate = resolve_api.get_project_frame_rate(project)
+    folder = resolve_api.find_folder(project.GetMediaPool())
+    camera_names, probe_jobs = timed("enumeration", core.enumerate_clips, folder)
+    cameras, report = timed("probing", core.probe_clips, probe_jobs, settings, frame_rate)
+    zero_creation_time = timed("offsets", core.compute_offsets, cameras, settings, frame_rate)
+    sync_plan = timed("plan", core.make_sync_plan, folder, probe_jobs, cameras, zero_creation_time, settings, frame_rate)
+    core.save_sync_plan(sync_plan, plan.get_last_plan_path())
+    timed("write-back", core.apply_sync, cameras, zero_creation_time, settings, frame_rate)
+    analysis = timed("analysis", core.analyze_recording, cameras, settings, frame_rate)
+    timed("timeline", core.build_timelines, project, analysis, settings, frame_rate)
+    return phases
+
+
+def print_scenario(name: str, nb_clips: int, phases: dict, baseline_phases: dict | None) -> None:
+    total_seconds = sum(phase["seconds"] for phase in phases.values())
+    print(f"{name}: {nb_clips} clips, {total_seconds:.3f}s total ({total_seconds / nb_clips * 1000:.3f} ms/clip)")
+    for phase_name in PHASES:
+        if (phase_name not in phases):
+            continue
+        phase = phases[phase_name]
+        line = f"  {phase_name:<12} {phase['seconds']:9.3f}s {phase['seconds'] / nb_clips * 1e6:10.1f} us/clip {phase['api_calls']:8d} API calls"
+        if (baseline_phases != None and phase_name in baseline_phases and baseline_phases[phase_name]["seconds"] > 0):
+            ratio = phase["seconds"] / baseline_phases[phase_name]["seconds"]
+            is_regression = ratio > REGRESSION_THRESHOLD and phase["seconds"] > REGRESSION_MIN_SECONDS
+            line += f"   {ratio:5.2f}x baseline" + ("  <-- REGRESSION" if is_regression else "")
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time each phase of the sync against a simulated Resolve media pool")
+    parser.add_argument("--scenarios", nargs="+", default=["2x50", "8x500"], help="CAMERASxCLIPS_PER_CAMERA, e.g. 2x50 8x500 16x5000")
+    parser.add_argument("--footage", choices=["synthetic", "canned"], default="synthetic", help="sparse MP4 files probed for real, or canned ffprobe JSON")
+    parser.add_argument("--footage-dir", help="keep the generated footage in this folder to reuse it between runs (default: temporary)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="simulated latency of each Resolve API call")
+    parser.add_argument("--probe-latency-ms", type=float, default=0, help="simulated latency of each probe with --footage canned")
+    parser.add_argument("--probe-workers", type=int, default=SyncSettings().probe_concurrency)
+    parser.add_argument("--use-cache", action="store_true", help="enable the metadata cache (in a temporary directory, cold)")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with the results saved by a previous run")
+    args = parser.parse_args()
+
+    baseline = None
+    if (args.compare != None):
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    footage_directory = args.footage_dir or tempfile.mkdtemp(prefix="multicam_sync_bench_")
+    # the metadata cache and the sync state go to a throwaway directory, never to the user's cache
+    state_directory = tempfile.mkdtemp(prefix="multicam_sync_bench_state_")
+    os.environ["XDG_CACHE_HOME"] = state_directory
+    os.environ["LOCALAPPDATA"] = state_directory
+
+    settings = SyncSettings(show_ui=False, probe_concurrency=max(1, args.probe_workers), use_metadata_cache=args.use_cache, use_probe_service=False)
+    results = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "footage": args.footage,
+        "latency_ms": args.latency_ms,
+        "probe_latency_ms": args.probe_latency_ms,
+        "probe_workers": settings.probe_concurrency,
+        "scenarios": {},
+    }
+    print(f"Footage: {args.footage}, API latency: {args.latency_ms} ms, probe workers: {settings.probe_concurrency}")
+
+    try:
+        for scenario in args.scenarios:
+            nb_cameras, nb_clips_per_camera = parse_scenario(scenario)
+            file_paths_by_camera = create_footage(os.path.join(footage_directory, scenario), nb_cameras, nb_clips_per_camera, args.footage)
+            if (args.footage == "canned"):
+                use_canned_probe_results(simulated_resolve.canned_probe_results(file_paths_by_camera), args.probe_latency_ms / 1000)
+
+            api_calls = simulated_resolve.ApiCalls(args.latency_ms / 1000)
+            project = simulated_resolve.build_project(api_calls, file_paths_by_camera)
+            phases = run_scenario(project, settings, api_calls)
+
+            results["scenarios"][scenario] = phases
+            baseline_phases = baseline["scenarios"].get(scenario) if baseline != None else None
+            print_scenario(scenario, nb_cameras * nb_clips_per_camera, phases, baseline_phases)
+    finally:
+        shutil.rmtree(state_directory, ignore_errors=True)
+        if (args.footage_dir == None):
+            shutil.rmtree(footage_directory, ignore_errors=True)
+
+    if (args.save != None):
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results saved to '{args.save}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# Benchmark: start timecode computation for many clips
+#
+# Compares the per-clip Timecode object path the apply loop used to take (kept below as LegacyTimecode, float frame
+# math and full validation on every object) with the Timecode view and the batched start_timecodes() of
+# multicam_sync/timecode.py, and checks that the labels agree.
+#
+#   python benchmarks/bench_timecode.py --clips 100000 --frame-rate 25
+#   python benchmarks/bench_timecode.py --clips 100000 --frame-rate 30000/1001 --drop-frame
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from multicam_sync.timecode import FrameRate, Timecode, start_timecodes, np
+
+
+class LegacyTimecode:
+    # the Timecode class before the integer engine, trimmed to what the apply loop used
+    def __init__(self, frame_rate, hours: int = 0, minutes: int = 0, seconds: int = 0, frames: int = 0):
+        if (frames >= frame_rate):
+            raise ValueError(f"Frames value {frames} is greater than the frame rate {frame_rate}")
+        for value in (hours, minutes, seconds, frames):
+            if not isinstance(value, int):
+                raise ValueError(f"Value {value} is not an integer")
+        if (hours < 0):
+            raise ValueError(f"Hours value {hours} is negative")
+        if (minutes < 0 or minutes >= 60):
+            raise ValueError(f"Minutes value {minutes} is not in the range 0-59")
+        if (seconds < 0 or seconds >= 60):
+            raise ValueError(f"Seconds value {seconds} is not in the range 0-59")
+        if (frames < 0 or frames >= frame_rate):
+            raise ValueError(f"Frames value {frames} is not in the range 0-{frame_rate - 1}")
+        self.hours = hours
+        self.minutes = minutes
+        self.seconds = seconds
+        self.frames = frames
+        self.frame_rate = frame_rate
+
+    def to_total_frames(self) -> int:
+        return int(self.hours * 3600 * self.frame_rate + self.minutes * 60 * self.frame_rate + self.seconds * self.frame_rate + self.frames)
+
+    @classmethod
+    def from_total_frames(cls, total_frames: int, frame_rate: float):
+        hours = int(total_frames / (3600 * frame_rate))
+        total_frames %= int(3600 * frame_rate)
+        minutes = int(total_frames / (60 * frame_rate))
+        total_frames %= int(60 * frame_rate)
+        seconds = int(total_frames / frame_rate)
+        frames = total_frames % int(frame_rate)
+        return cls(frame_rate, hours, minutes, seconds, frames)
+
+    @classmethod
+    def from_timedelta(cls, time_delta: timedelta, frame_rate: float):
+        total_frames = int(time_delta.total_seconds() * 1000 / (1000 / frame_rate))
+        return cls.from_total_frames(total_frames, frame_rate)
+
+    def to_timedelta(self) -> timedelta:
+        return timedelta(seconds=self.to_total_frames() / self.frame_rate)
+
+    def __str__(self):
+        return f"{self.hours:02d}:{self.minutes:02d}:{self.seconds:02d}:{self.frames:02d}"
+
+
+def generate_clips(nb_clips: int, nb_cameras: int) -> tuple[datetime, list[datetime], list[int]]:
+    # clips of 10 s to 5 min recorded back to back by each camera, cameras started a few seconds apart
+    random.seed(1)
+    zero_creation_time = datetime(2024, 6, 22, 10, 0, 0, tzinfo=timezone.utc)
+    creation_times = []
+    camera_indexes = []
+    clips_per_camera = nb_clips // nb_cameras
+    for camera_index in range(nb_cameras):
+        creation_time = zero_creation_time + timedelta(seconds=camera_index * 3.7)
+        for _ in range(clips_per_camera if camera_index < nb_cameras - 1 else nb_clips - clips_per_camera * (nb_cameras - 1)):
+            creation_times.append(creation_time)
+            camera_indexes.append(camera_index)
+            creation_time += timedelta(seconds=random.uniform(10, 300), microseconds=random.randint(0, 999999))
+    return zero_creation_time, creation_times, camera_indexes
+
+
+def run_legacy(creation_times, camera_offsets, camera_indexes, zero_creation_time, frame_rate) -> list[str]:
+    labels = []
+    for creation_time, camera_index in zip(creation_times, camera_indexes):
+        camera_offset_time_delta = camera_offsets[camera_index].to_timedelta()
+        time_delta = creation_time - camera_offset_time_delta - zero_creation_time
+        labels.append(str(LegacyTimecode.from_timedelta(time_delta, frame_rate)))
+    return labels
+
+
+def run_scalar(creation_times, camera_offsets, camera_indexes, zero_creation_time, frame_rate) -> list[str]:
+    labels = []
+    for creation_time, camera_index in zip(creation_times, camera_indexes):
+        start_frames = frame_rate.frames_from_timedelta(creation_time - zero_creation_time) - camera_offsets[camera_index].total_frames
+        labels.append(str(Timecode.from_total_frames(start_frames, frame_rate)))
+    return labels
+
+
+def run_batch(creation_times, camera_offsets, camera_indexes, zero_creation_time, frame_rate) -> list[str]:
+    offset_frames = [camera_offsets[camera_index].total_frames for camera_index in camera_indexes]
+    return start_timecodes(creation_times, offset_frames, zero_creation_time, frame_rate)
+
+
+def time_run(run, *args) -> tuple[float, list[str]]:
+    start_time = time.perf_counter()
+    labels = run(*args)
+    return time.perf_counter() - start_time, labels
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the start timecode computation for many clips")
+    parser.add_argument("--clips", type=int, default=100000)
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--frame-rate", default="25", help="e.g. 25, 29.97 or 30000/1001")
+    parser.add_argument("--drop-frame", action="store_true")
+    args = parser.parse_args()
+
+    frame_rate = FrameRate(args.frame_rate, args.drop_frame)
+    zero_creation_time, creation_times, camera_indexes = generate_clips(args.clips, args.cameras)
+    camera_offsets = [Timecode.from_timedelta(timedelta(seconds=camera_index * 3.7), frame_rate) for camera_index in range(args.cameras)]
+    print(f"{len(creation_times)} clips, {args.cameras} cameras, {frame_rate} fps, NumPy {'available' if np != None else 'not installed'}")
+
+    results = {}
+    if (frame_rate.rate.denominator == 1 and not frame_rate.drop_frame):
+        # the legacy class only handled integer rates
+        legacy_offsets = [LegacyTimecode.from_timedelta(camera_offset.to_timedelta(), frame_rate.timebase) for camera_offset in camera_offsets]
+        results["legacy"] = time_run(run_legacy, creation_times, legacy_offsets, camera_indexes, zero_creation_time, frame_rate.timebase)
+    results["scalar"] = time_run(run_scalar, creation_times, camera_offsets, camera_indexes, zero_creation_time, frame_rate)
+    results["batch"] = time_run(run_batch, creation_times, camera_offsets, camera_indexes, zero_creation_time, frame_rate)
+
+    baseline_seconds = results["legacy" if "legacy" in results else "scalar"][0]
+    for name, (elapsed_seconds, labels) in results.items():
+        print(f"{name:<8} {elapsed_seconds:8.3f}s {elapsed_seconds / len(labels) * 1e6:8.2f} us/clip   speedup: {baseline_seconds / elapsed_seconds:5.1f}x")
+
+    reference_labels = results["batch"][1]
+    for name, (elapsed_seconds, labels) in results.items():
+        nb_mismatches = sum(1 for label, reference_label in zip(labels, reference_labels) if label != reference_label)
+        if (nb_mismatches > 0):
+            print(f"{name}: {nb_mismatches} labels differ from the batch (float rounding in the legacy path)")
+
+
+if __name__ == "__main__":
+    main()
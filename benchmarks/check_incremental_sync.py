@@ -0,0 +1,88 @@
+# Check: an incremental sync writes again the clips whose values in Resolve no longer match the sync
+#
+# Syncs a simulated Resolve media pool (canned footage, see simulated_resolve.py) with settings.incremental, then checks
+# that a second run writes nothing, and that a run after clearing the Start TC of a clip and changing the camera of
+# another (as when a clip is re-imported or edited by hand) writes exactly those two properties again.
+#
+#   python benchmarks/check_incremental_sync.py
+#   python benchmarks/check_incremental_sync.py --scenario 4x100
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import simulated_resolve
+from bench_sync import create_footage, parse_scenario, use_canned_probe_results
+from multicam_sync import core, resolve_api
+from multicam_sync.settings import SyncSettings
+
+
+def run_incremental_sync(project, settings: SyncSettings, api_calls: simulated_resolve.ApiCalls) -> tuple[dict, int]:
+    # the apply report of the run and the number of SetClipProperty calls it made
+    api_calls.reset()
+    frame_rate = resolve_api.get_project_frame_rate(project)
+    report = core.run_sync(resolve_api.find_folder(project.GetMediaPool()), settings, frame_rate)
+    return report["apply"], api_calls.reset()["SetClipProperty"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check that an incremental sync writes again the clips changed in Resolve")
+    parser.add_argument("--scenario", default="2x5", help="CAMERASxCLIPS_PER_CAMERA (default: 2x5)")
+    args = parser.parse_args()
+
+    footage_directory = tempfile.mkdtemp(prefix="multicam_sync_check_")
+    # the sync state and the sync plans go to a throwaway directory, never to the user's cache
+    state_directory = tempfile.mkdtemp(prefix="multicam_sync_check_state_")
+    os.environ["XDG_CACHE_HOME"] = state_directory
+    os.environ["LOCALAPPDATA"] = state_directory
+
+    failures = []
+    try:
+        nb_cameras, nb_clips_per_camera = parse_scenario(args.scenario)
+        file_paths_by_camera = create_footage(footage_directory, nb_cameras, nb_clips_per_camera, "canned")
+        use_canned_probe_results(simulated_resolve.canned_probe_results(file_paths_by_camera), 0)
+        api_calls = simulated_resolve.ApiCalls()
+        project = simulated_resolve.build_project(api_calls, file_paths_by_camera)
+        settings = SyncSettings(show_ui=False, incremental=True, use_metadata_cache=False, use_probe_service=False, use_fingerprints=False)
+        nb_clips = nb_cameras * nb_clips_per_camera
+
+        first_apply, _ = run_incremental_sync(project, settings, api_calls)
+        if (first_apply["nb_added"] != nb_clips):
+            failures.append(f"first run: {first_apply['nb_added']} of {nb_clips} clips added")
+
+        unchanged_apply, nb_writes = run_incremental_sync(project, settings, api_calls)
+        if (unchanged_apply["nb_skipped"] != nb_clips or nb_writes != 0):
+            failures.append(f"unchanged run: {unchanged_apply['nb_skipped']} of {nb_clips} clips skipped, {nb_writes} properties written")
+
+        camera_folders = list(project.GetMediaPool().GetRootFolder().GetSubFolders().values())
+        cleared_clip = list(camera_folders[0].GetClips().values())[0]
+        edited_clip = list(camera_folders[-1].GetClips().values())[-1]
+        synced_start_tc = cleared_clip.properties["Start TC"]
+        synced_camera_name = edited_clip.properties[settings.camera_property]
+        cleared_clip.properties["Start TC"] = ""
+        edited_clip.properties[settings.camera_property] = "edited by hand"
+
+        changed_apply, nb_writes = run_incremental_sync(project, settings, api_calls)
+        if (changed_apply["nb_updated"] != 2 or changed_apply["nb_skipped"] != nb_clips - 2 or nb_writes != 2):
+            failures.append(f"changed run: {changed_apply['nb_updated']} clips updated, {changed_apply['nb_skipped']} skipped, {nb_writes} properties written "
+                            f"(expected 2 updated, {nb_clips - 2} skipped, 2 written)")
+        if (cleared_clip.properties["Start TC"] != synced_start_tc):
+            failures.append(f"cleared Start TC is '{cleared_clip.properties['Start TC']}', expected '{synced_start_tc}'")
+        if (edited_clip.properties[settings.camera_property] != synced_camera_name):
+            failures.append(f"edited camera is '{edited_clip.properties[settings.camera_property]}', expected '{synced_camera_name}'")
+    finally:
+        shutil.rmtree(state_directory, ignore_errors=True)
+        shutil.rmtree(footage_directory, ignore_errors=True)
+
+    if (len(failures) > 0):
+        print("FAILED:\n" + "\n".join(f"- {failure}" for failure in failures))
+        sys.exit(1)
+    print("OK: the incremental sync writes only the clips whose values in Resolve differ from the sync")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+# In-memory stand-in for the DaVinci Resolve objects the sync uses (Project, MediaPool, Folder, MediaPoolItem, Timeline),
+# with a configurable latency per scripting API call to mimic the round trip to Resolve, and call counters.
+#
+# Clips point at real files (synthetic sparse MP4s, see bench_mp4_probe.generate_corpus) or at empty placeholder files
+# probed through canned_probe_results().
+
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+
+class ApiCalls:
+    # per-call latency and call counts shared by all the simulated objects of a project
+    def __init__(self, latency_seconds: float = 0):
+        self.latency_seconds = latency_seconds
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def call(self, name: str) -> None:
+        with self.lock:
+            self.counts[name] += 1
+        if (self.latency_seconds > 0):
+            time.sleep(self.latency_seconds)
+
+    def reset(self) -> Counter:
+        with self.lock:
+            counts = self.counts
+            self.counts = Counter()
+        return counts
+
+
+class SimulatedClip:
+    def __init__(self, api_calls: ApiCalls, file_path: str):
+        self.api_calls = api_calls
+        self.properties = {
+            "Clip Name": os.path.basename(file_path),
+            "File Path": file_path,
+            "Type": "Video",
+            "Start TC": "00:00:00:00",
+        }
+
+    def GetName(self) -> str:
+        self.api_calls.call("GetName")
+        return self.properties["Clip Name"]
+
+    def GetClipProperty(self, property_name: str = None):
+        self.api_calls.call("GetClipProperty")
+        if (property_name == None):
+            return dict(self.properties)
+        return self.properties.get(property_name, "")
+
+    def SetClipProperty(self, property_name: str, value) -> bool:
+        self.api_calls.call("SetClipProperty")
+        self.properties[property_name] = value
+        return True
+
+
+class SimulatedFolder:
+    def __init__(self, api_calls: ApiCalls, name: str, sub_folders: list = None, clips: list = None):
+        self.api_calls = api_calls
+        self.name = name
+        self.sub_folders = sub_folders or []
+        self.clips = clips or []
+
+    def GetName(self) -> str:
+        self.api_calls.call("GetName")
+        return self.name
+
+    def GetUniqueId(self) -> str:
+        self.api_calls.call("GetUniqueId")
+        return f"simulated-{id(self)}"
+
+    def GetSubFolders(self) -> dict:
+        self.api_calls.call("GetSubFolders")
+        return {index + 1: sub_folder for index, sub_folder in enumerate(self.sub_folders)}
+
+    def GetClips(self) -> dict:
+        self.api_calls.call("GetClips")
+        return {index + 1: clip for index, clip in enumerate(self.clips)}
+
+
+class SimulatedTimeline:
+    def __init__(self, api_calls: ApiCalls, name: str):
+        self.api_calls = api_calls
+        self.name = name
+        self.nb_video_tracks = 1
+        self.items = []
+
+    def GetName(self) -> str:
+        self.api_calls.call("GetName")
+        return self.name
+
+    def GetStartFrame(self) -> int:
+        self.api_calls.call("GetStartFrame")
+        return 90000 # 01:00:00:00 at 25 fps, the Resolve default
+
+    def GetTrackCount(self, track_type: str) -> int:
+        self.api_calls.call("GetTrackCount")
+        return self.nb_video_tracks if track_type == "video" else 1
+
+    def AddTrack(self, track_type: str) -> bool:
+        self.api_calls.call("AddTrack")
+        if (track_type == "video"):
+            self.nb_video_tracks += 1
+        return True
+
+    def SetTrackName(self, track_type: str, track_index: int, name: str) -> bool:
+        self.api_calls.call("SetTrackName")
+        return True
+
+
+class SimulatedMediaPool:
+    def __init__(self, api_calls: ApiCalls, root_folder: SimulatedFolder):
+        self.api_calls = api_calls
+        self.root_folder = root_folder
+        self.timelines = []
+        self.current_timeline = None
+
+    def GetRootFolder(self) -> SimulatedFolder:
+        self.api_calls.call("GetRootFolder")
+        return self.root_folder
+
+    def GetCurrentFolder(self) -> SimulatedFolder:
+        self.api_calls.call("GetCurrentFolder")
+        return self.root_folder
+
+    def CreateEmptyTimeline(self, name: str) -> SimulatedTimeline:
+        self.api_calls.call("CreateEmptyTimeline")
+        self.current_timeline = SimulatedTimeline(self.api_calls, name)
+        self.timelines.append(self.current_timeline)
+        return self.current_timeline
+
+    def AppendToTimeline(self, clip_infos: list[dict]) -> list:
+        self.api_calls.call("AppendToTimeline")
+        self.current_timeline.items.extend(clip_infos)
+        return list(clip_infos)
+
+
+class SimulatedProject:
+    def __init__(self, api_calls: ApiCalls, root_folder: SimulatedFolder, frame_rate: str = "25"):
+        self.api_calls = api_calls
+        self.media_pool = SimulatedMediaPool(api_calls, root_folder)
+        self.settings = {"timelineFrameRate": frame_rate, "timelineDropFrameTimecode": "0"}
+
+    def GetName(self) -> str:
+        self.api_calls.call("GetName")
+        return "Simulated"
+
+    def GetSetting(self, setting_name: str):
+        self.api_calls.call("GetSetting")
+        return self.settings.get(setting_name, "")
+
+    def GetMediaPool(self) -> SimulatedMediaPool:
+        self.api_calls.call("GetMediaPool")
+        return self.media_pool
+
+    def GetTimelineCount(self) -> int:
+        self.api_calls.call("GetTimelineCount")
+        return len(self.media_pool.timelines)
+
+    def GetTimelineByIndex(self, timeline_index: int) -> SimulatedTimeline:
+        self.api_calls.call("GetTimelineByIndex")
+        return self.media_pool.timelines[timeline_index - 1]
+
+    def SetCurrentTimeline(self, timeline: SimulatedTimeline) -> bool:
+        self.api_calls.call("SetCurrentTimeline")
+        self.media_pool.current_timeline = timeline
+        return True
+
+
+def build_project(api_calls: ApiCalls, file_paths_by_camera: dict, frame_rate: str = "25") -> SimulatedProject:
+    # one camera subfolder per entry of file_paths_by_camera ({camera_name: [file_path, ...]})
+    camera_folders = [
+        SimulatedFolder(api_calls, camera_name, clips=[SimulatedClip(api_calls, file_path) for file_path in file_paths])
+        for camera_name, file_paths in file_paths_by_camera.items()
+    ]
+    return SimulatedProject(api_calls, SimulatedFolder(api_calls, "Footage", sub_folders=camera_folders), frame_rate)
+
+
+def canned_probe_results(file_paths_by_camera: dict, clip_duration_seconds: float = 60, camera_start_step_seconds: float = 2.5) -> dict:
+    # ffprobe-like JSON for each file: back to back 25 fps clips, cameras started a few seconds apart
+    results = {}
+    for camera_index, file_paths in enumerate(file_paths_by_camera.values()):
+        creation_time = datetime(2024, 6, 22, 10, 0, 0, tzinfo=timezone.utc) + timedelta(seconds=camera_index * camera_start_step_seconds)
+        for file_path in file_paths:
+            results[file_path] = {
+                "streams": [{
+                    "codec_type": "video",
+                    "codec_name": "h264",
+                    "codec_long_name": "H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10",
+                    "width": 3840,
+                    "height": 2160,
+                    "r_frame_rate": "25/1",
+                    "nb_frames": str(int(clip_duration_seconds * 25)),
+                }],
+                "format": {
+                    "nb_streams": 1,
+                    "size": "1048576",
+                    "duration": f"{clip_duration_seconds:.6f}",
+                    "tags": {"creation_time": creation_time.isoformat().replace("+00:00", ".000000Z")},
+                },
+            }
+            creation_time += timedelta(seconds=clip_duration_seconds + 5)
+    return results
@@ -0,0 +1,27 @@
+# Sync clips from multiple cameras without timecodes.
+# Importing the package never imports DaVinciResolveScript or tkinter: the Resolve connection is opened by
+# resolve_api.connect_resolve() and the Tk interface lives in multicam_sync.ui.
+
+from .core import (
+    SyncError,
+    SyncCancelled,
+    enumerate_clips,
+    limit_clips_per_camera,
+    probe_clips,
+    compute_offsets,
+    apply_sync,
+    load_sync_state,
+    reconcile_with_previous_sync,
+    save_sync_state,
+    analyze_recording,
+    apply_session_property,
+    build_timelines,
+    run_sync,
+    get_creation_time,
+)
+from .clip_store import ClipMetadata, ClipRecord
+from .overlap import ClipInterval, OverlapIndex, Session
+from .resolve_api import ResolveError, connect_resolve, get_current_project, get_project_frame_rate, find_folder
+from .settings import StartTimeSource, OffsetSource, SyncSettings
+from .snapshot import ClipSnapshot, MediaPoolSnapshot, take_snapshot
+from .timecode import FrameRate, Timecode, format_timecodes, start_frames, start_timecodes
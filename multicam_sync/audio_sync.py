@@ -0,0 +1,144 @@
+# --- Audio cross-correlation sync ---
+# Estimates the clock difference between each camera and a reference camera by decoding low-rate mono audio
+# from a pair of overlapping clips (streamed from an ffmpeg pipe, no temporary WAV files) and cross-correlating
+# the two signals with NumPy FFTs: first on a decimated envelope over the whole search range, then at the full
+# sample rate around the coarse peak. Only a bounded window of each clip is decoded, so long clips cost the same
+# as short ones.
+
+import time
+
+import numpy as np
+
+from . import content_sync
+from .content_sync import ContentSyncError, read_ffmpeg_output, get_pair_segments
+
+DEFAULT_SAMPLE_RATE = 8000
+DEFAULT_MAX_LAG_SECONDS = 120.0
+DEFAULT_WINDOW_SECONDS = 180.0
+DEFAULT_DECIMATION = 40  # 8 kHz -> 200 Hz envelope for the coarse search
+
+
+class AudioSyncError(ContentSyncError):
+    pass
+
+
+# --- Decoding ---
+
+def decode_audio(file_path, start_seconds: float, duration_seconds: float, sample_rate: int = DEFAULT_SAMPLE_RATE) -> np.ndarray:
+    cmd = [
+        'ffmpeg', '-v', 'error', '-nostdin',
+        '-ss', f"{max(0.0, start_seconds):.3f}", '-t', f"{duration_seconds:.3f}", '-i', file_path,
+        '-vn', '-ac', '1', '-ar', str(sample_rate), '-f', 'f32le', 'pipe:1'
+    ]
+
+    # read the raw samples straight into a preallocated array
+    samples = np.empty(int(duration_seconds * sample_rate) + sample_rate, dtype=np.float32)
+    nb_bytes = read_ffmpeg_output(cmd, memoryview(samples).cast("B"), file_path, "audio", AudioSyncError)
+    if nb_bytes < 4 * sample_rate:
+        raise AudioSyncError(f"Clip '{file_path}' has less than one second of audio in the requested range")
+
+    return samples[:nb_bytes // 4]
+
+
+# --- Correlation ---
+
+def cross_correlate(reference: np.ndarray, signal: np.ndarray) -> np.ndarray:
+    # result[p] = sum_t reference[t + p] * signal[t]; negative positions wrap around to the end of the array
+    size = 1 << int(np.ceil(np.log2(len(reference) + len(signal))))
+    return np.fft.irfft(np.fft.rfft(reference, size) * np.conj(np.fft.rfft(signal, size)), size)
+
+
+def envelope(samples: np.ndarray, decimation: int) -> np.ndarray:
+    nb_blocks = len(samples) // decimation
+    blocks = np.abs(samples[:nb_blocks * decimation]).reshape(nb_blocks, decimation).mean(axis=1)
+    return blocks - blocks.mean()
+
+
+def best_position(correlation: np.ndarray, min_position: int, max_position: int) -> int:
+    positions = np.arange(min_position, max_position + 1)
+    return int(positions[np.argmax(correlation[positions % len(correlation)])])
+
+
+def correlation_coefficient(reference: np.ndarray, signal: np.ndarray, position: int) -> float:
+    start = max(0, position)
+    end = min(len(reference), position + len(signal))
+    if end - start < 2:
+        return 0.0
+    reference_part = reference[start:end]
+    signal_part = signal[start - position:end - position]
+    norm = np.linalg.norm(reference_part) * np.linalg.norm(signal_part)
+    return float(np.dot(reference_part, signal_part) / norm) if norm > 0 else 0.0
+
+
+def estimate_position(reference: np.ndarray, signal: np.ndarray, min_position: int, max_position: int, decimation: int = DEFAULT_DECIMATION) -> tuple[int, float]:
+    # Finds where `signal` starts within `reference` (in samples, between min_position and max_position)
+    # and returns it with a confidence score (correlation coefficient at that position, 0..1)
+    reference = reference.astype(np.float64) - reference.mean()
+    signal = signal.astype(np.float64) - signal.mean()
+    min_position = max(min_position, -(len(signal) - 1))
+    max_position = min(max_position, len(reference) - 1)
+    if min_position > max_position:
+        raise AudioSyncError("The search range does not overlap the decoded audio")
+
+    # coarse: decimated envelopes over the whole search range
+    coarse_correlation = cross_correlate(envelope(reference, decimation), envelope(signal, decimation))
+    coarse_position = best_position(coarse_correlation, min_position // decimation, max_position // decimation) * decimation
+
+    # fine: full-rate correlation of a reference slice a few envelope blocks around the coarse peak
+    margin = 2 * decimation
+    slice_start = max(0, coarse_position - margin)
+    slice_end = min(len(reference), coarse_position + len(signal) + margin)
+    fine_correlation = cross_correlate(reference[slice_start:slice_end], signal)
+    fine_min = max(min_position, coarse_position - margin) - slice_start
+    fine_max = min(max_position, coarse_position + margin) - slice_start
+    position = best_position(fine_correlation, fine_min, fine_max) + slice_start if fine_min <= fine_max else coarse_position
+
+    return position, max(0.0, correlation_coefficient(reference, signal, position))
+
+
+# --- Camera offsets ---
+
+def estimate_pair_offset(task: dict) -> dict:
+    # Runs in a worker: decodes the overlapping parts of one reference clip and one camera clip and returns the
+    # clock difference (camera clock - reference clock) in seconds
+    reference_path, reference_start = task["reference_clip"][:2]
+    camera_path, camera_start = task["camera_clip"][:2]
+    sample_rate = task["sample_rate"]
+    max_lag_seconds = task["max_lag_seconds"]
+    segments = get_pair_segments(task)
+    reference_segment_start = segments["reference_segment_start"]
+    camera_segment_start = segments["camera_segment_start"]
+
+    started = time.perf_counter()
+    reference_samples = decode_audio(reference_path, reference_segment_start, segments["reference_segment_end"] - reference_segment_start, sample_rate)
+    camera_samples = decode_audio(camera_path, camera_segment_start, segments["segment_duration"], sample_rate)
+
+    nominal_position = (segments["overlap_start"] - reference_start - reference_segment_start) * sample_rate
+    max_lag = max_lag_seconds * sample_rate
+    position, confidence = estimate_position(
+        reference_samples, camera_samples,
+        int(nominal_position - max_lag), int(nominal_position + max_lag))
+
+    clock_difference = (camera_start + camera_segment_start) - (reference_start + reference_segment_start + position / sample_rate)
+
+    return {
+        "clock_difference_seconds": clock_difference,
+        "confidence": confidence,
+        "reference_clip": reference_path,
+        "clip": camera_path,
+        "elapsed_seconds": time.perf_counter() - started,
+    }
+
+
+def estimate_camera_offsets(cameras: dict, reference_camera: str, nominal_differences: dict,
+                            sample_rate: int = DEFAULT_SAMPLE_RATE,
+                            max_lag_seconds: float = DEFAULT_MAX_LAG_SECONDS,
+                            window_seconds: float = DEFAULT_WINDOW_SECONDS,
+                            max_workers: int | None = None,
+                            on_progress=None, is_cancelled=None) -> dict:
+    # cameras: {camera_name: [(file_path, start_seconds, duration_seconds, ...), ...]} (start on the camera's own clock)
+    # nominal_differences: {camera_name: expected (camera clock - reference clock) in seconds}
+    # Returns {camera_name: estimate dict or None when no overlapping clip pair was found}
+    task_parameters = {"sample_rate": sample_rate, "max_lag_seconds": max_lag_seconds, "window_seconds": window_seconds}
+    return content_sync.estimate_camera_offsets(estimate_pair_offset, cameras, reference_camera, nominal_differences, task_parameters,
+                                                max_workers, "audio_sync", on_progress, is_cancelled)
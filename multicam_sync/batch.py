@@ -0,0 +1,165 @@
+# --- Batch sync of several folders ---
+# Syncs many media pool folders (e.g. one per shoot day) in one run. Each folder is its own camera group, with its own
+# camera offsets and timeline start, its own sync plan and its own timeline ("multicam - Day 1", ...).
+# The folders go through a two-stage pipeline: a worker thread probes the clips of folder N+1 and computes its
+# offsets (core.analyze_clips, which only reads files) while the calling thread writes folder N to Resolve. Every
+# Resolve call (the folder snapshot before the probe, the write-back after it) is made by the calling thread, over the
+# one connection of the run. One folder is probed at a time, and the folders share one pool of probe workers
+# (probe.ProbePool) and one metadata cache connection, opened once for the batch, instead of competing for the disks.
+
+import dataclasses
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import core, probe, resolve_api
+from .log import print_error, print_warning
+from .plan import get_last_plan_path
+from .settings import SyncSettings
+
+
+def get_folder_settings(settings: SyncSettings, folder_path: str, folder_index: int) -> SyncSettings:
+    # the timeline is named after the folder; the metadata cache is cleared once, when run_batch opens it
+    return dataclasses.replace(settings,
+                               multicam_clip_name=f"{settings.multicam_clip_name} - {folder_path.rstrip('/').split('/')[-1]}",
+                               clear_metadata_cache=False,
+                               plan_file=None)
+
+def new_batch_result(folder_path: str) -> dict:
+    return {
+        "folder": folder_path,
+        "status": "pending", # "synced", "failed" or "cancelled" once the batch is done
+        "error": None,
+        "nb_cameras": 0,
+        "nb_clips": 0,
+        "nb_probed": 0,
+        "nb_cached": 0,
+        "nb_written": 0,
+        "nb_issues": 0,
+        "zero_creation_time": None,
+        "timeline_names": [],
+        "plan_file": None,
+        "analyze_seconds": 0.0,
+        "write_seconds": 0.0,
+    }
+
+def analyze_folder(probe_jobs: list[dict], settings: SyncSettings, frame_rate, on_progress, is_cancelled, metadata_cache, probe_pool: probe.ProbePool) -> tuple[dict, float]:
+    # runs on the pipeline worker
+    start_time = time.perf_counter()
+    report = core.analyze_clips(probe_jobs, settings, frame_rate, on_progress, is_cancelled, metadata_cache, probe_pool)
+    return report, time.perf_counter() - start_time
+
+def run_batch(folders: list[tuple[str, object]], settings: SyncSettings, frame_rate, project=None, on_progress=core.no_progress, is_cancelled=core.not_cancelled) -> list[dict]:
+    # Syncs the (path, folder) folders in order and returns one result per folder (see new_batch_result). A folder that
+    # fails is reported and the batch goes on with the next one; once cancelled (is_cancelled() or Ctrl+C), the folders
+    # not synced yet are "cancelled".
+    cancel_event = threading.Event()
+    results = [new_batch_result(folder_path) for folder_path, _ in folders]
+    analyses = {} # folder index: (probe jobs, folder settings, future of analyze_folder)
+
+    def is_batch_cancelled() -> bool:
+        return cancel_event.is_set() or is_cancelled()
+
+    def get_folder_progress(folder_path: str):
+        return lambda value, text: on_progress(value, f"{folder_path}: {text}")
+
+    def fail_folder(folder_index: int, error: str) -> None:
+        results[folder_index]["status"] = "failed"
+        results[folder_index]["error"] = error
+        print_error(f"Folder '{results[folder_index]['folder']}': {error}")
+
+    def start_analysis(folder_index: int) -> None:
+        # reads the folder from Resolve here, then probes it on the worker
+        folder_path, folder = folders[folder_index]
+        folder_settings = get_folder_settings(settings, folder_path, folder_index)
+        print(f"[{folder_index + 1}/{len(folders)}] Reading folder '{folder_path}'...")
+        try:
+            probe_jobs = core.enumerate_sync_clips(folder, folder_settings)
+            if (len(probe_jobs) == 0):
+                raise core.SyncError("No video file clips in the camera subfolders.")
+        except (core.SyncError, resolve_api.ResolveError) as e:
+            fail_folder(folder_index, str(e))
+            return
+        except Exception as e:
+            fail_folder(folder_index, f"{type(e).__name__}: {e}")
+            return
+        future = executor.submit(analyze_folder, probe_jobs, folder_settings, frame_rate, get_folder_progress(folder_path), is_batch_cancelled, metadata_cache, probe_pool)
+        analyses[folder_index] = (probe_jobs, folder_settings, future)
+
+    metadata_cache = core.open_metadata_cache(settings)
+    probe_pool = probe.ProbePool()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch")
+    try:
+        if (len(folders) > 0):
+            start_analysis(0)
+        for folder_index, (folder_path, folder) in enumerate(folders):
+            if is_batch_cancelled():
+                break
+            # the next folder is probed while this one is written
+            if (folder_index + 1 < len(folders)):
+                start_analysis(folder_index + 1)
+            if (folder_index not in analyses):
+                continue
+
+            probe_jobs, folder_settings, future = analyses.pop(folder_index)
+            result = results[folder_index]
+            try:
+                report, result["analyze_seconds"] = future.result()
+                print(f"[{folder_index + 1}/{len(folders)}] Writing folder '{folder_path}'...")
+                start_time = time.perf_counter()
+                report = core.finish_sync(folder, probe_jobs, report, folder_settings, frame_rate, get_folder_progress(folder_path), is_batch_cancelled, project,
+                                          get_last_plan_path(folder_path))
+                result["write_seconds"] = time.perf_counter() - start_time
+            except core.SyncCancelled:
+                break
+            except (core.SyncError, resolve_api.ResolveError) as e:
+                fail_folder(folder_index, str(e))
+                continue
+            except Exception as e:
+                # anything else (the metadata cache, a file that cannot be read...) only fails this folder too
+                fail_folder(folder_index, f"{type(e).__name__}: {e}")
+                continue
+            fill_batch_result(result, report, len(probe_jobs))
+    except KeyboardInterrupt:
+        print_warning("Batch cancelled by user, waiting for the current probe to stop...")
+    finally:
+        cancel_event.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        probe_pool.shutdown()
+        if (metadata_cache != None):
+            metadata_cache.close()
+
+    for result in results:
+        if (result["status"] == "pending"):
+            result["status"] = "cancelled"
+    return results
+
+def fill_batch_result(result: dict, report: dict, nb_clips: int) -> None:
+    result["status"] = "synced"
+    result["nb_cameras"] = len(report["cameras"])
+    result["nb_clips"] = nb_clips
+    result["nb_probed"] = report["probe_stats"]["nb_clips"]
+    result["nb_cached"] = report["nb_cached_clips"]
+    result["nb_issues"] = len(report["issues"])
+    result["zero_creation_time"] = report["zero_creation_time"]
+    result["plan_file"] = report["plan_file"]
+    if ("apply" in report):
+        result["nb_written"] = report["apply"]["nb_clips"] - report["apply"]["nb_failed"]
+    if (report.get("timeline") != None):
+        result["timeline_names"] = [timeline["name"] for timeline in report["timeline"]["timelines"]]
+
+def format_batch_summary(results: list[dict]) -> str:
+    # one row per folder, then the folders that failed with their error
+    header = f"{'Folder':<32} {'Status':<9} {'Cameras':>7} {'Clips':>6} {'Probed':>6} {'Cached':>6} {'Written':>7} {'Issues':>6} {'Start':<19} {'Probe s':>7} {'Write s':>7}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        zero_creation_time = result["zero_creation_time"].strftime("%Y-%m-%d %H:%M:%S") if result["zero_creation_time"] != None else "-"
+        lines.append(f"{result['folder'][-32:]:<32} {result['status']:<9} {result['nb_cameras']:>7} {result['nb_clips']:>6} {result['nb_probed']:>6} {result['nb_cached']:>6} "
+                     f"{result['nb_written']:>7} {result['nb_issues']:>6} {zero_creation_time:<19} {result['analyze_seconds']:>7.1f} {result['write_seconds']:>7.1f}")
+    synced_results = [result for result in results if result["status"] == "synced"]
+    lines.append(f"{len(synced_results)} of {len(results)} folders synced, {sum(result['nb_written'] for result in synced_results)} clips written, "
+                 f"{sum(result['analyze_seconds'] for result in results):.1f}s probing and {sum(result['write_seconds'] for result in results):.1f}s writing")
+    for result in results:
+        if (result["status"] == "failed"):
+            lines.append(f"- '{result['folder']}' failed: {result['error'].splitlines()[0]}")
+    return "\n".join(lines)
@@ -0,0 +1,211 @@
+# --- Persistent metadata cache ---
+# ClipMetadata records are kept in a SQLite database in the user cache directory, keyed by file path
+# and validated against the file identity (size, modification time, inode), so unchanged footage is not probed again.
+# Files that could not be read are quarantined the same way, so that a bad card is not probed again on every run.
+# The content fingerprint of each clip (see fingerprint.py) is indexed too, so that the metadata of a file that was
+# moved or copied elsewhere is found without probing it again.
+
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from .clip_store import ClipMetadata
+
+METADATA_CACHE_SCHEMA_VERSION = 4
+
+def get_metadata_cache_path() -> str:
+    if os.name == 'nt':
+        cache_dir = os.environ.get("LOCALAPPDATA", os.path.expanduser("~\\AppData\\Local"))
+    elif sys.platform == "darwin":
+        cache_dir = os.path.expanduser("~/Library/Caches")
+    else:
+        cache_dir = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+
+    return os.path.join(cache_dir, "resolve-multicam-sync", "metadata_cache.sqlite")
+
+def get_file_identity(file_path) -> tuple[int, int, int] | None:
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+class MetadataCache:
+    hits: int = 0
+    misses: int = 0
+    moved_hits: int = 0 # misses found under another path by their fingerprint
+    stores: int = 0
+    evictions: int = 0
+
+    def __init__(self, db_path: str, max_size_bytes: int):
+        self.db_path = db_path
+        self.max_size_bytes = max_size_bytes
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # the probe service uses its cache from several connection threads, one at a time (see probe_service.py)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+
+        schema_version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if (schema_version != METADATA_CACHE_SCHEMA_VERSION):
+            self.connection.execute("DROP TABLE IF EXISTS clip_metadata")
+            self.connection.execute(f"PRAGMA user_version = {METADATA_CACHE_SCHEMA_VERSION}")
+
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS clip_metadata (
+                file_path TEXT PRIMARY KEY,
+                size_bytes INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                metadata TEXT NOT NULL,
+                fingerprint TEXT,
+                last_used REAL NOT NULL
+            )""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS clip_metadata_last_used ON clip_metadata (last_used)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS clip_metadata_fingerprint ON clip_metadata (fingerprint)")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS quarantined_file (
+                file_path TEXT PRIMARY KEY,
+                size_bytes INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                reason TEXT NOT NULL,
+                quarantined_at REAL NOT NULL
+            )""")
+        self.connection.commit()
+
+    def get_many(self, file_paths: list[str]) -> dict:
+        # returns {file_path: ClipMetadata} for the files whose identity did not change since they were cached
+        result = {}
+        now = time.time()
+        for file_path in file_paths:
+            row = self.connection.execute(
+                "SELECT size_bytes, mtime_ns, inode, metadata FROM clip_metadata WHERE file_path = ?", (file_path,)).fetchone()
+            identity = get_file_identity(file_path)
+
+            if (row == None or identity == None or tuple(row[:3]) != identity):
+                self.misses += 1
+                continue
+
+            result[file_path] = ClipMetadata.from_dict(json.loads(row[3]))
+            self.hits += 1
+            self.connection.execute("UPDATE clip_metadata SET last_used = ? WHERE file_path = ?", (now, file_path))
+
+        self.connection.commit()
+        return result
+
+    def put_many(self, clip_metadata_by_path: dict) -> None:
+        now = time.time()
+        for file_path, clip_metadata in clip_metadata_by_path.items():
+            identity = get_file_identity(file_path)
+            if (identity == None):
+                continue
+
+            encoded_metadata = json.dumps(clip_metadata.to_dict())
+            self.connection.execute(
+                "INSERT OR REPLACE INTO clip_metadata (file_path, size_bytes, mtime_ns, inode, metadata, fingerprint, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_path, *identity, encoded_metadata, clip_metadata.fingerprint, now))
+            self.connection.execute("DELETE FROM quarantined_file WHERE file_path = ?", (file_path,))
+            self.stores += 1
+
+        self.connection.commit()
+        self.evict()
+
+    def find_move_candidates(self, file_paths: list[str]) -> list[str]:
+        # the files that may have been moved or copied since they were cached: nothing is cached under their path, and
+        # a fingerprinted file of the same size is cached under another path (the size is part of the fingerprint)
+        cached_sizes = {row[0] for row in self.connection.execute("SELECT DISTINCT size_bytes FROM clip_metadata WHERE fingerprint IS NOT NULL")}
+        candidates = []
+        for file_path in file_paths:
+            if (self.connection.execute("SELECT 1 FROM clip_metadata WHERE file_path = ?", (file_path,)).fetchone() != None):
+                continue
+            try:
+                size_bytes = os.path.getsize(file_path)
+            except OSError:
+                continue
+            if (size_bytes in cached_sizes):
+                candidates.append(file_path)
+        return candidates
+
+    def get_many_by_fingerprint(self, fingerprints_by_path: dict) -> dict:
+        # returns {file_path: ClipMetadata} for the files whose content fingerprint is cached under another path (the
+        # file was moved or copied); the path-dependent fields are those of the file at its new path
+        result = {}
+        now = time.time()
+        for file_path, fingerprint in fingerprints_by_path.items():
+            row = self.connection.execute("SELECT file_path, metadata FROM clip_metadata WHERE fingerprint = ? LIMIT 1", (fingerprint,)).fetchone()
+            if (row == None):
+                continue
+            try:
+                os_creation_time = datetime.fromtimestamp(os.path.getctime(file_path))
+            except OSError:
+                continue
+
+            clip_metadata = ClipMetadata.from_dict(json.loads(row[1]))
+            clip_metadata.file_path = file_path
+            clip_metadata.os_creation_time = os_creation_time
+            result[file_path] = clip_metadata
+            self.moved_hits += 1
+            self.connection.execute("UPDATE clip_metadata SET last_used = ? WHERE file_path = ?", (now, row[0]))
+
+        self.connection.commit()
+        return result
+
+    def evict(self) -> None:
+        # drop the least recently used entries until the cached metadata fits in max_size_bytes
+        total_size = self.connection.execute("SELECT COALESCE(SUM(LENGTH(metadata)), 0) FROM clip_metadata").fetchone()[0]
+        if (total_size <= self.max_size_bytes):
+            return
+
+        evicted_paths = []
+        for file_path, entry_size in self.connection.execute("SELECT file_path, LENGTH(metadata) FROM clip_metadata ORDER BY last_used"):
+            if (total_size <= self.max_size_bytes):
+                break
+            evicted_paths.append((file_path,))
+            total_size -= entry_size
+
+        self.connection.executemany("DELETE FROM clip_metadata WHERE file_path = ?", evicted_paths)
+        self.connection.commit()
+        self.evictions += len(evicted_paths)
+
+    def get_quarantined(self, file_paths: list[str]) -> dict:
+        # returns {file_path: reason} for the quarantined files that did not change since they failed
+        result = {}
+        for file_path in file_paths:
+            row = self.connection.execute(
+                "SELECT size_bytes, mtime_ns, inode, reason FROM quarantined_file WHERE file_path = ?", (file_path,)).fetchone()
+            if (row != None and tuple(row[:3]) == get_file_identity(file_path)):
+                result[file_path] = row[3]
+        return result
+
+    def quarantine_many(self, reasons_by_path: dict) -> None:
+        now = time.time()
+        for file_path, reason in reasons_by_path.items():
+            identity = get_file_identity(file_path)
+            if (identity == None):
+                continue
+            self.connection.execute(
+                "INSERT OR REPLACE INTO quarantined_file (file_path, size_bytes, mtime_ns, inode, reason, quarantined_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (file_path, *identity, reason, now))
+        self.connection.commit()
+
+    def clear(self) -> None:
+        self.connection.execute("DELETE FROM quarantined_file")
+        self.connection.execute("DELETE FROM clip_metadata")
+        self.connection.commit()
+        self.connection.execute("VACUUM")
+
+    def reset_counters(self) -> None:
+        # the summary of a cache shared by several syncs (see batch.py) covers the lookups since the last reset
+        self.hits = self.misses = self.moved_hits = self.stores = self.evictions = 0
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups * 100 if lookups > 0 else 0.0
+        moved_summary = f", {self.moved_hits} of them found by fingerprint after a move" if self.moved_hits > 0 else ""
+        return f"Metadata cache: {self.hits} hits, {self.misses} misses{moved_summary} ({hit_rate:.0f}% hit rate), {self.stores} stored, {self.evictions} evicted"
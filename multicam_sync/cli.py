@@ -0,0 +1,221 @@
+# --- Command line entry point ---
+#   python -m multicam_sync --no-ui --folder "Footage/Day 1" --camera-property "Camera #"
+#   python -m multicam_sync --no-ui --local /path/to/footage --frame-rate 25
+#   python -m multicam_sync --plan day1.plan.json.gz --folder "Footage/Day 1"          # analysis only
+#   python -m multicam_sync --apply-plan day1.plan.json.gz --folder "Footage/Day 1"    # write it to Resolve
+#   python -m multicam_sync --folder Festival --folder-pattern "Day *"                  # one sync per shoot day (batch.py)
+# With --no-ui nothing imports tkinter and no dialog is ever shown, so unattended runs never block; --plan, --apply-plan
+# and --revert-plan never show dialogs either.
+
+import argparse
+
+from . import batch, core, resolve_api
+from .plan import PlanError, load_plan
+from .log import print_error, print_warning, set_debug
+from .settings import StartTimeSource, OffsetSource, SyncSettings
+
+
+class ConsoleProgress:
+    # prints progress every 10% instead of on every clip
+    def __init__(self):
+        self.last_text_prefix = None
+        self.last_step = -1
+
+    def __call__(self, value: float, text: str) -> None:
+        text_prefix = text.split("...")[0]
+        step = int(value // 10)
+        if (text_prefix == self.last_text_prefix and step == self.last_step):
+            return
+        self.last_text_prefix = text_prefix
+        self.last_step = step
+        print(f"[{value:5.1f}%] {text}")
+
+
+def parse_device_workers(value: str) -> tuple[str, int]:
+    mount_point, _, concurrency = value.rpartition("=")
+    if (mount_point == "" or not concurrency.isdigit() or int(concurrency) < 1):
+        raise argparse.ArgumentTypeError(f"expected MOUNT_POINT=N, e.g. /mnt/nas=8, got '{value}'")
+    return mount_point, int(concurrency)
+
+def parse_args(argv=None) -> argparse.Namespace:
+    defaults = SyncSettings()
+    parser = argparse.ArgumentParser(prog="multicam_sync", description="Sync clips from multiple cameras without timecodes: sets 'Start TC' and the camera property of every clip of a DaVinci Resolve media pool folder.")
+    parser.add_argument("--folder", help="media pool folder path from the root, e.g. 'Footage/Day 1' (default: the folder selected in the media pool)")
+    parser.add_argument("--folders", metavar="FOLDER", nargs="+", default=[], help="batch mode: sync each of these media pool folders (paths from the root), e.g. 'Festival/Day 1' 'Festival/Day 2'")
+    parser.add_argument("--folder-pattern", metavar="PATTERN", help="batch mode: sync every folder whose path matches PATTERN under --folder (default: under the media pool root), e.g. 'Day *'")
+    parser.add_argument("--local", metavar="DIRECTORY", help="read clips from a directory tree instead of Resolve (one subdirectory per camera) and print the result")
+    parser.add_argument("--frame-rate", default="25", help="timeline frame rate used with --local, e.g. 25, 29.97 or 30000/1001 (default: 25)")
+    parser.add_argument("--drop-frame", action="store_true", help="use drop-frame timecodes with --local (29.97 and 59.94 only)")
+    parser.add_argument("--camera-property", default=defaults.camera_property, help=f"clip property receiving the camera name (default: '{defaults.camera_property}')")
+    parser.add_argument("--start-time-source", choices=[source.name for source in StartTimeSource], default=defaults.start_time_source.name)
+    parser.add_argument("--offset-source", choices=[source.name for source in OffsetSource], default=defaults.offset_source.name)
+    parser.add_argument("--clips-limit", type=int, default=defaults.clips_number_limit, help="maximum number of clips per camera")
+    parser.add_argument("--probe-workers", type=int, default=defaults.probe_concurrency, help=f"number of clips probed in parallel on each SSD or unknown storage device (default: {defaults.probe_concurrency})")
+    parser.add_argument("--device-workers", metavar="MOUNT_POINT=N", type=parse_device_workers, action="append", default=[],
+                        help="number of clips probed in parallel on the storage device mounted at MOUNT_POINT, instead of the default of its kind (SSD: --probe-workers, "
+                             "spinning disk or card: 2, network share: 8); can be repeated")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the metadata cache")
+    parser.add_argument("--clear-cache", action="store_true", help="clear the metadata cache before probing")
+    parser.add_argument("--retry-quarantined", action="store_true", help="probe again the files that could not be read on a previous run")
+    parser.add_argument("--skip-duplicates", action="store_true", help="leave out the clips with the same content as a clip found earlier in the folder (e.g. a card imported twice)")
+    parser.add_argument("--no-fingerprints", action="store_true", help="do not fingerprint the clips: no duplicate check, and moved files are probed again")
+    parser.add_argument("--sample-sequences", metavar="N", type=int, nargs="?", const=defaults.sequence_sample_interval,
+                        help=f"fast mode: in each run of sequentially named clips (C0001, C0002...), probe the first and last clip and one in N (default: {defaults.sequence_sample_interval}), "
+                             "and infer the others from their file size and modification time, checked against the probed clips around them")
+    parser.add_argument("--keep-probe-output", metavar="DIR", help="also write the raw probe output of each probed clip to DIR as JSON")
+    parser.add_argument("--session-gap", type=float, default=defaults.session_gap_seconds, help=f"seconds without any camera recording that split the recording sessions (default: {defaults.session_gap_seconds:g})")
+    parser.add_argument("--session-property", default=defaults.session_property, help="clip property receiving the name of the recording session of each clip, e.g. 'Scene' (default: none)")
+    parser.add_argument("--timeline-name", default=defaults.multicam_clip_name, help=f"name of the timeline built with one track per camera (default: '{defaults.multicam_clip_name}')")
+    parser.add_argument("--timeline-per-session", action="store_true", help="build one timeline per recording session instead of one in all")
+    parser.add_argument("--no-timeline", action="store_true", help="only set the clip properties, do not build a timeline")
+    parser.add_argument("--incremental", action="store_true", help="only probe and write clips that are new or changed since the previous sync of the folder")
+    parser.add_argument("--probe-service", metavar="HOST:PORT", default=defaults.probe_service_address, help=f"address of the probe service (python -m multicam_sync.probe_service) to ask before probing in-process (default: {defaults.probe_service_address})")
+    parser.add_argument("--no-probe-service", action="store_true", help="always probe in-process")
+    parser.add_argument("--no-native-parser", action="store_true", help="always use ffprobe, even for MP4/MOV files")
+    parser.add_argument("--plan", metavar="FILE", help="probe and compute the sync, save it as a sync plan (.json or .json.gz) and stop without writing to Resolve")
+    parser.add_argument("--apply-plan", metavar="FILE", help="write a sync plan saved by --plan (or by any sync run) to the folder, without probing")
+    parser.add_argument("--revert-plan", metavar="FILE", help="put back the Start TC and camera values the clips had when the sync plan was made")
+    parser.add_argument("--no-ui", action="store_true", help="run headless: no dialogs, the computed camera offsets are applied as-is")
+    parser.add_argument("--trace", metavar="FILE", help="record the time of each phase, probe and Resolve API call to a Chrome trace JSON file and print a latency summary")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args(argv)
+    if (is_batch(args) and (args.plan != None or args.apply_plan != None or args.revert_plan != None)):
+        parser.error("--plan, --apply-plan and --revert-plan work on one folder, not with --folders or --folder-pattern")
+    return args
+
+def is_batch(args: argparse.Namespace) -> bool:
+    return len(args.folders) > 0 or args.folder_pattern != None
+
+def settings_from_args(args: argparse.Namespace) -> SyncSettings:
+    return SyncSettings(
+        start_time_source=StartTimeSource[args.start_time_source],
+        offset_source=OffsetSource[args.offset_source],
+        camera_property=args.camera_property,
+        multicam_clip_name=args.timeline_name,
+        build_timeline=not args.no_timeline,
+        timeline_per_session=args.timeline_per_session,
+        show_ui=not args.no_ui,
+        debug=args.debug,
+        clips_number_limit=args.clips_limit,
+        probe_concurrency=max(1, args.probe_workers),
+        device_concurrency=dict(args.device_workers),
+        use_metadata_cache=not args.no_cache,
+        clear_metadata_cache=args.clear_cache,
+        retry_quarantined=args.retry_quarantined,
+        use_fingerprints=not args.no_fingerprints,
+        skip_duplicate_clips=args.skip_duplicates,
+        sample_clip_sequences=args.sample_sequences != None,
+        sequence_sample_interval=max(1, args.sample_sequences) if args.sample_sequences != None else SyncSettings.sequence_sample_interval,
+        probe_output_dir=args.keep_probe_output,
+        use_native_mp4_parser=not args.no_native_parser,
+        use_probe_service=not args.no_probe_service,
+        probe_service_address=args.probe_service,
+        incremental=args.incremental,
+        session_gap_seconds=args.session_gap,
+        session_property=args.session_property,
+        plan_file=args.plan,
+        plan_only=args.plan != None,
+        trace_file=args.trace,
+    )
+
+
+def print_local_result(cameras: dict, camera_property: str, project: resolve_api.LocalProject) -> None:
+    for camera_name, camera in cameras.items():
+        print(f"Camera '{camera_name}' (offset {camera['offset']}):")
+        for clip_record in camera["clips"]:
+            clip = clip_record.clip
+            print(f"  {clip.GetClipProperty('Start TC')}  {clip.GetClipProperty(camera_property)}  {clip.GetClipProperty('File Path')}")
+
+    for timeline in project.GetMediaPool().timelines:
+        print(f"Timeline '{timeline.GetName()}' (starts at {timeline.GetStartTimecode()}):")
+        for track_index, track_name in enumerate(timeline.track_names["video"], start=1):
+            track_items = [item for item in timeline.items if item["trackIndex"] == track_index]
+            first_record = timeline.frame_rate.format(track_items[0]["recordFrame"]) if len(track_items) > 0 else "-"
+            print(f"  V{track_index} '{track_name}': {len(track_items)} clips, first at {first_record}")
+
+
+def run_batch(args: argparse.Namespace, settings: SyncSettings, project) -> int:
+    project = core.start_tracing(settings, project)
+    try:
+        print(f"Working with current_project '{project.GetName()}'")
+        frame_rate = resolve_api.get_project_frame_rate(project)
+        print(f"Current project frame rate: {frame_rate}")
+        media_pool = project.GetMediaPool()
+        folders = [(folder_path, resolve_api.find_folder(media_pool, folder_path)) for folder_path in args.folders]
+        if (args.folder_pattern != None):
+            folder_paths = {folder_path for folder_path, _ in folders}
+            folders += [(folder_path, folder) for folder_path, folder in resolve_api.find_matching_folders(media_pool, args.folder_pattern, args.folder) if folder_path not in folder_paths]
+        if (len(folders) == 0):
+            raise core.SyncError(f"No folder matches '{args.folder_pattern}'" + (f" under '{args.folder}'" if args.folder else "") + ".")
+        print(f"Batch of {len(folders)} folders: {', '.join(folder_path for folder_path, _ in folders)}")
+        results = batch.run_batch(folders, settings, frame_rate, project, on_progress=ConsoleProgress())
+    finally:
+        core.finish_tracing(settings)
+
+    print(batch.format_batch_summary(results))
+    if (any(result["status"] == "cancelled" for result in results)):
+        return 130
+    return 1 if any(result["status"] == "failed" for result in results) else 0
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    settings = settings_from_args(args)
+    set_debug(settings.debug)
+
+    try:
+        if (args.local != None):
+            project = resolve_api.LocalProject(args.local, args.frame_rate, args.drop_frame)
+        else:
+            project = resolve_api.get_current_project(resolve_api.connect_resolve())
+
+        if (is_batch(args)):
+            # a batch never shows dialogs, so that it runs unattended
+            settings.show_ui = False
+            return run_batch(args, settings, project)
+
+        if (settings.show_ui and args.plan == None and args.apply_plan == None and args.revert_plan == None):
+            from . import ui
+            ui.run(settings, project, args.folder)
+            return 0
+
+        project = core.start_tracing(settings, project)
+        try:
+            print(f"Working with current_project '{project.GetName()}'")
+            frame_rate = resolve_api.get_project_frame_rate(project)
+            print(f"Current project frame rate: {frame_rate}")
+            folder = resolve_api.find_folder(project.GetMediaPool(), args.folder)
+            print(f"Selected folder: '{folder.GetName()}'")
+
+            if (args.revert_plan != None):
+                revert_result = core.revert_sync_plan(folder, load_plan(args.revert_plan), on_progress=ConsoleProgress())
+            elif (args.apply_plan != None):
+                report = core.apply_sync_plan(folder, load_plan(args.apply_plan), settings, frame_rate, on_progress=ConsoleProgress(), project=project)
+            else:
+                report = core.run_sync(folder, settings, frame_rate, on_progress=ConsoleProgress(), project=project)
+        finally:
+            core.finish_tracing(settings)
+
+        if (args.revert_plan != None):
+            print(f"Time codes and camera names have been reverted for {revert_result['nb_reverted']} of {revert_result['nb_clips']} clips.")
+            issues_summary = revert_result["issues"].summary()
+            if (issues_summary != None):
+                print(issues_summary)
+            return 0
+        if (settings.plan_only):
+            print(f"Nothing was written to Resolve: apply the sync plan with --apply-plan \"{report['plan_file']}\".")
+            return 0
+
+        if (args.local != None):
+            print_local_result(report["cameras"], settings.camera_property, project)
+        apply_result = report["apply"]
+        print(f"Time codes and camera names have been set for {apply_result['nb_clips'] - apply_result['nb_failed']} clips ({apply_result['nb_added']} added, {apply_result['nb_updated']} updated, {apply_result['nb_skipped']} unchanged).")
+        issues_summary = report["issues"].summary()
+        if (issues_summary != None):
+            print(issues_summary)
+        return 0
+    except core.SyncCancelled as e:
+        print_warning(str(e))
+        return 130
+    except (core.SyncError, resolve_api.ResolveError, PlanError) as e:
+        print_error(str(e))
+        return 1
@@ -0,0 +1,88 @@
+# --- Compact clip records ---
+# One ClipMetadata and one ClipRecord per clip, for folders of tens of thousands of clips: __slots__ objects holding
+# only the fields the sync uses, with the repeated strings (codec, frame rate, camera name) interned so that all the
+# clips of a camera share them. The ffprobe output itself is dropped once the metadata is built; it can be kept on disk
+# for inspection with settings.probe_output_dir (see save_probe_output).
+
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+
+class ClipMetadata:
+    __slots__ = ("file_path", "size_bytes", "duration_seconds", "frame_rate", "nb_frames", "creation_time", "os_creation_time", "width", "height", "codec_name", "fingerprint")
+
+    def __init__(self, file_path: str, size_bytes: int, duration_seconds: float, frame_rate: str, nb_frames: int,
+                 creation_time: datetime, os_creation_time: datetime, width: int, height: int, codec_name: str, fingerprint: str | None = None):
+        self.file_path = file_path
+        self.size_bytes = size_bytes
+        self.duration_seconds = duration_seconds
+        self.frame_rate = sys.intern(frame_rate) # exact frame rate as a fraction, e.g. "30000/1001"
+        self.nb_frames = nb_frames
+        self.creation_time = creation_time # creation_time tag of the file (ffprobe format tags)
+        self.os_creation_time = os_creation_time # creation time of the file on disk
+        self.width = width
+        self.height = height
+        self.codec_name = sys.intern(codec_name)
+        self.fingerprint = fingerprint # sampled content fingerprint (see fingerprint.py), None when not computed
+
+    def to_dict(self) -> dict:
+        # JSON-ready dict for the metadata cache
+        clip_metadata = {key: getattr(self, key) for key in self.__slots__}
+        clip_metadata["creation_time"] = self.creation_time.isoformat()
+        clip_metadata["os_creation_time"] = self.os_creation_time.isoformat()
+        return clip_metadata
+
+    @classmethod
+    def from_dict(cls, clip_metadata: dict) -> "ClipMetadata":
+        return cls(
+            file_path=clip_metadata["file_path"],
+            size_bytes=clip_metadata["size_bytes"],
+            duration_seconds=clip_metadata["duration_seconds"],
+            frame_rate=clip_metadata["frame_rate"],
+            nb_frames=clip_metadata["nb_frames"],
+            creation_time=datetime.fromisoformat(clip_metadata["creation_time"]),
+            os_creation_time=datetime.fromisoformat(clip_metadata["os_creation_time"]),
+            width=clip_metadata["width"],
+            height=clip_metadata["height"],
+            codec_name=clip_metadata["codec_name"],
+            fingerprint=clip_metadata.get("fingerprint"),
+        )
+
+    def __repr__(self) -> str:
+        return f"ClipMetadata({self.file_path!r}, {self.width}x{self.height} {self.codec_name} {self.frame_rate} fps, {self.nb_frames} frames, created {self.creation_time})"
+
+
+class ClipRecord:
+    # a probed clip of a camera; start_frame is set by apply_sync
+    __slots__ = ("clip", "clip_name", "camera_name", "metadata", "start_frame", "current_properties")
+
+    def __init__(self, clip, clip_name: str, camera_name: str, metadata: ClipMetadata, current_properties: dict | None = None):
+        self.clip = clip # the Resolve media pool item
+        self.clip_name = clip_name
+        self.camera_name = sys.intern(camera_name)
+        self.metadata = metadata
+        self.start_frame = None
+        # {property name: value} of the clip in Resolve when the folder was read (the probe job's previous_properties),
+        # None when unknown; shared with the probe job, never modified
+        self.current_properties = current_properties
+
+    @property
+    def file_path(self) -> str:
+        return self.metadata.file_path
+
+    def __repr__(self) -> str:
+        return f"ClipRecord({self.clip_name!r}, camera {self.camera_name!r}, start frame {self.start_frame})"
+
+
+def get_probe_output_path(probe_output_dir: str, file_path: str) -> str:
+    # one JSON file per clip, named after the clip file and a hash of its full path (clip names repeat across cards)
+    path_hash = hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(probe_output_dir, f"{os.path.basename(file_path)}.{path_hash}.json")
+
+def save_probe_output(probe_output_dir: str, file_path: str, ffmpeg_metadata: dict) -> None:
+    os.makedirs(probe_output_dir, exist_ok=True)
+    with open(get_probe_output_path(probe_output_dir, file_path), "w", encoding="utf-8") as file:
+        json.dump(ffmpeg_metadata, file, indent=1)
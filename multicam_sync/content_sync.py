@@ -0,0 +1,158 @@
+# --- Content sync ---
+# What the audio (audio_sync.py) and visual (visual_sync.py) offset estimates share: decoding a range of a clip with
+# ffmpeg straight into a preallocated buffer through a raw pipe, choosing the pair of overlapping clips of each camera
+# and the segments of them to decode, and running one estimate per camera on a worker pool. Each mode only has its own
+# signal extraction and correlation, in the estimate_pair_offset(task) it gives to estimate_camera_offsets.
+
+import bisect
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+MIN_OVERLAP_SECONDS = 5.0
+READ_CHUNK_BYTES = 1 << 16
+
+
+class ContentSyncError(Exception):
+    # base of AudioSyncError and VisualSyncError: an estimate that failed, reported for its camera only
+    pass
+
+
+# --- Decoding ---
+
+def read_ffmpeg_output(cmd: list, buffer: memoryview, file_path, content: str, error_class=ContentSyncError) -> int:
+    # Runs the ffmpeg command writing raw data to pipe:1, reads it into `buffer` and returns the number of bytes read;
+    # failures (ffmpeg missing, decoding error) raise error_class, about the `content` ("audio" or "video") of file_path
+    startup_info = None
+    if os.name == 'nt':  # Check if the OS is Windows
+        startup_info = subprocess.STARTUPINFO()
+        startup_info.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=startup_info)
+    except OSError as e:
+        raise error_class(f"Cannot run ffmpeg to decode the {content} of '{file_path}' (ffmpeg not found or not executable: {e})") from e
+
+    nb_bytes = 0
+    with proc:
+        while nb_bytes < len(buffer):
+            nb_read = proc.stdout.readinto(buffer[nb_bytes:nb_bytes + READ_CHUNK_BYTES])
+            if not nb_read:
+                break
+            nb_bytes += nb_read
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.wait()
+
+    if proc.returncode != 0:
+        raise error_class(f"Error decoding {content} from '{file_path}' (exit code {proc.returncode}): {stderr.decode(errors='replace').strip()}")
+    return nb_bytes
+
+
+# --- Camera offsets ---
+
+def find_best_overlap(reference_clips: list, camera_clips: list, nominal_difference: float):
+    # clips are (file_path, start_seconds, duration_seconds) on their own camera clock;
+    # nominal_difference is the expected (camera clock - reference clock) in seconds
+    reference_clips = sorted(reference_clips, key=lambda clip: clip[1])
+    reference_starts = [clip[1] for clip in reference_clips]
+    max_reference_duration = max(clip[2] for clip in reference_clips)
+
+    best = None
+    best_overlap = MIN_OVERLAP_SECONDS
+    for camera_clip in camera_clips:
+        camera_start = camera_clip[1] - nominal_difference
+        camera_end = camera_start + camera_clip[2]
+        reference_index = bisect.bisect_left(reference_starts, camera_end) - 1
+        while reference_index >= 0 and reference_starts[reference_index] + max_reference_duration > camera_start:
+            reference_clip = reference_clips[reference_index]
+            overlap = min(camera_end, reference_clip[1] + reference_clip[2]) - max(camera_start, reference_clip[1])
+            if overlap > best_overlap:
+                best_overlap = overlap
+                best = (reference_clip, camera_clip)
+            reference_index -= 1
+
+    return best
+
+
+def get_pair_segments(task: dict) -> dict:
+    # The parts of the two clips of an estimate task to decode, in seconds from the start of each clip: the camera
+    # segment (at most task["window_seconds"] of the overlap, assuming the nominal difference) and the reference segment
+    # (the same part of the reference clip, widened by task["max_lag_seconds"] on both sides).
+    # "overlap_start" is the start of the overlap on the reference clock.
+    reference_start, reference_duration = task["reference_clip"][1:3]
+    camera_start, camera_duration = task["camera_clip"][1:3]
+    nominal_difference = task["nominal_difference"]
+    max_lag_seconds = task["max_lag_seconds"]
+
+    overlap_start = max(reference_start, camera_start - nominal_difference)
+    overlap_end = min(reference_start + reference_duration, camera_start - nominal_difference + camera_duration)
+    segment_duration = min(overlap_end - overlap_start, task["window_seconds"])
+
+    return {
+        "overlap_start": overlap_start,
+        "segment_duration": segment_duration,
+        "camera_segment_start": overlap_start + nominal_difference - camera_start,
+        "reference_segment_start": max(0.0, overlap_start - reference_start - max_lag_seconds),
+        "reference_segment_end": min(reference_duration, overlap_start - reference_start + segment_duration + max_lag_seconds),
+    }
+
+
+def create_worker_pool(max_workers: int | None, thread_name_prefix: str = "content_sync"):
+    # Inside Resolve sys.executable is not a Python interpreter, so no worker process can be started there;
+    # threads are used instead (ffmpeg does the decoding in its own process either way).
+    if os.path.basename(sys.executable).lower().startswith("python"):
+        return ProcessPoolExecutor(max_workers=max_workers)
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+
+
+def estimate_camera_offsets(estimate_pair_offset, cameras: dict, reference_camera: str, nominal_differences: dict, task_parameters: dict,
+                            max_workers: int | None = None, thread_name_prefix: str = "content_sync", on_progress=None, is_cancelled=None) -> dict:
+    # cameras: {camera_name: [(file_path, start_seconds, duration_seconds, ...), ...]} (start on the camera's own clock)
+    # nominal_differences: {camera_name: expected (camera clock - reference clock) in seconds}
+    # Runs estimate_pair_offset(task) on the best overlapping clip pair of each camera, task being task_parameters with
+    # the "reference_clip", "camera_clip" and "nominal_difference" of the pair; estimate_pair_offset must be a module
+    # level function, as it may run in a worker process.
+    # Returns {camera_name: estimate dict, {"error", "confidence"} when it raised a ContentSyncError, or None when no
+    # overlapping clip pair was found}
+    estimates = {}
+    tasks = {}
+    for camera_name, camera_clips in cameras.items():
+        if camera_name == reference_camera:
+            continue
+        best_pair = find_best_overlap(cameras[reference_camera], camera_clips, nominal_differences[camera_name])
+        if best_pair == None:
+            estimates[camera_name] = None
+            continue
+        tasks[camera_name] = {
+            **task_parameters,
+            "reference_clip": best_pair[0],
+            "camera_clip": best_pair[1],
+            "nominal_difference": nominal_differences[camera_name],
+        }
+
+    if not tasks:
+        return estimates
+
+    with create_worker_pool(max_workers, thread_name_prefix) as executor:
+        futures = {executor.submit(estimate_pair_offset, task): camera_name for camera_name, task in tasks.items()}
+        pending = set(futures.keys())
+        while pending:
+            if is_cancelled != None and is_cancelled():
+                for future in pending:
+                    future.cancel()
+                break
+
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                camera_name = futures[future]
+                try:
+                    estimates[camera_name] = future.result()
+                except ContentSyncError as e:
+                    estimates[camera_name] = {"error": str(e), "confidence": 0.0}
+
+            if on_progress != None:
+                on_progress(len(tasks) - len(pending), len(tasks))
+
+    return estimates
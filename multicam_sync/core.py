@@ -0,0 +1,1121 @@
+# --- Sync pipeline ---
+# enumerate_clips -> probe_clips -> compute_offsets -> [load_sync_state -> reconcile_with_previous_sync] -> apply_sync -> save_sync_state
+#   -> analyze_recording -> [apply_session_property] -> [build_timelines]
+# run_sync saves the sync plan (see plan.py) before the write-back, which apply_sync_plan can run on its own later.
+# The functions only talk to Resolve through the folder/clip objects they are given (see resolve_api.py), report
+# progress through on_progress(percent, text) and check is_cancelled() between clips, so they can run under the Tk UI,
+# from the command line or against a local stand-in.
+
+import collections
+import dataclasses
+import itertools
+import os
+import re
+import time
+from datetime import datetime, timedelta
+
+from . import probe, resolve_api, trace
+from .cache import MetadataCache, get_metadata_cache_path, get_file_identity
+from .clip_store import ClipMetadata, ClipRecord, save_probe_output
+from .fingerprint import compute_fingerprints, compute_fingerprints_parallel
+from .issues import ClipIssues
+from .log import is_debug, print_debug, print_warning
+from .settings import StartTimeSource, OffsetSource, SyncSettings
+from .snapshot import MediaPoolSnapshot, take_snapshot
+from .sync_state import SyncStateStore, get_sync_state_path
+from .timecode import FrameRate, Timecode, format_timecodes, start_frames
+from .overlap import ClipInterval, OverlapIndex
+from .plan import new_plan, add_plan_clip, iter_plan_clips, is_file_unchanged, get_plan_frame_rate, get_last_plan_path, save_plan
+from .sequences import find_clip_runs, get_sampled_jobs, infer_run_metadata
+from .sidecar import SidecarIndex, SidecarError, read_sidecar_metadata
+
+try:
+    from . import audio_sync, visual_sync
+except ImportError: # NumPy is not installed: audio and visual sync are not available
+    audio_sync = None
+    visual_sync = None
+
+
+class SyncError(Exception):
+    pass
+
+class SyncCancelled(SyncError):
+    pass
+
+
+def no_progress(value: float, text: str) -> None:
+    pass
+
+def not_cancelled() -> bool:
+    return False
+
+
+def get_creation_time(clip_metadata: ClipMetadata, start_time_source: StartTimeSource) -> datetime:
+    if start_time_source == StartTimeSource.OS_FILE_CREATION_TIME:
+        return clip_metadata.os_creation_time
+    elif start_time_source == StartTimeSource.FORMAT_TAG_CREATION_TIME:
+        return clip_metadata.creation_time
+    elif start_time_source == StartTimeSource.SIDECAR_CREATION_TIME:
+        return clip_metadata.creation_time # read from the sidecar, or the format tag when the clip has none
+    else:
+        return None
+
+
+# --- Tracing ---
+
+def start_tracing(settings: SyncSettings, project):
+    # starts tracing when settings.trace_file is set; returns the project to use (wrapped to trace the Resolve API calls)
+    if (settings.trace_file == None):
+        return project
+    trace.start()
+    return trace.trace_resolve_calls(project)
+
+def finish_tracing(settings: SyncSettings) -> None:
+    summary = trace.stop(settings.trace_file)
+    if (summary != None):
+        print(summary)
+        print(f"Trace written to '{settings.trace_file}' (open it in chrome://tracing or https://ui.perfetto.dev)")
+
+
+# --- Enumerate ---
+
+# clip properties the sync may write: their values before the sync are kept in the probe jobs for the sync plan, so
+# that the sync can be reverted (see plan.py)
+CAPTURED_CLIP_PROPERTIES = ("Start TC", "Angle", "Camera #", "Scene", "Shot", "Comments")
+
+def get_captured_clip_properties(settings: SyncSettings) -> tuple:
+    # the properties the sync with these settings may write, including the camera and session properties chosen
+    return (*CAPTURED_CLIP_PROPERTIES, settings.camera_property, settings.session_property)
+
+def take_folder_snapshot(folder) -> MediaPoolSnapshot:
+    media_pool_snapshot = take_snapshot(folder)
+    if (len(media_pool_snapshot.camera_names) == 0):
+        raise SyncError("No subfolders found in the selected folder. Please select a folder with subfolders representing the clips for each camera. E.g. footage/Camera1, footage/Camera2, etc.")
+    return media_pool_snapshot
+
+@trace.traced("phase")
+def enumerate_clips(folder, captured_properties: tuple = CAPTURED_CLIP_PROPERTIES, media_pool_snapshot: MediaPoolSnapshot | None = None) -> tuple[list[str], list[dict]]:
+    # Each subfolder of `folder` is a camera. Returns the camera names and the clips to probe (in per-camera order).
+    # The folder is read once (see snapshot.py), or not at all when its snapshot is given (see take_folder_snapshot):
+    # the probe jobs carry everything later phases need about the clips.
+    if (media_pool_snapshot == None):
+        media_pool_snapshot = take_folder_snapshot(folder)
+
+    print(f"Found {len(media_pool_snapshot.camera_names)} subfolders: will consider each subfolder a camera subfolder:")
+
+    probe_jobs = []
+    for cameraIndex, camera_name in enumerate(media_pool_snapshot.camera_names, start=1):
+        video_file_clips = media_pool_snapshot.video_file_clips(camera_name)
+        print(f"- Camera {cameraIndex} '{camera_name}': {len(video_file_clips)} clips")
+
+        if (len(video_file_clips) == 0):
+            print_warning(f"No video file clips found in camera '{camera_name}'. Skipping this camera.")
+            continue
+
+        for clip_snapshot in video_file_clips:
+            probe_jobs.append({
+                "clip": clip_snapshot.clip,
+                "clip_id": clip_snapshot.clip_id,
+                "clip_name": clip_snapshot.name,
+                "file_path": clip_snapshot.file_path,
+                "camera_name": camera_name,
+                "previous_properties": {name: clip_snapshot.properties[name] for name in captured_properties if name in clip_snapshot.properties},
+            })
+
+    print(f"Total number of clips: {len(probe_jobs)}")
+    return list(media_pool_snapshot.camera_names), probe_jobs
+
+def limit_clips_per_camera(probe_jobs: list[dict], clips_number_limit: int) -> list[dict]:
+    nb_clips_per_camera = {}
+    limited_probe_jobs = []
+    for probe_job in probe_jobs:
+        camera_name = probe_job["camera_name"]
+        nb_clips_per_camera[camera_name] = nb_clips_per_camera.get(camera_name, 0) + 1
+        if (nb_clips_per_camera[camera_name] > clips_number_limit):
+            if (nb_clips_per_camera[camera_name] == clips_number_limit + 1):
+                print_debug(f"Number of clips for camera '{camera_name}' exceeds the limit of {clips_number_limit}. Skipping the rest of the clips.")
+            continue
+        limited_probe_jobs.append(probe_job)
+    return limited_probe_jobs
+
+
+# --- Probe ---
+
+def open_metadata_cache(settings: SyncSettings) -> MetadataCache | None:
+    # an incremental sync always reads the cache, so that only new or modified clips are probed
+    use_metadata_cache = settings.use_metadata_cache or settings.incremental
+    if (not use_metadata_cache and not settings.clear_metadata_cache):
+        return None
+
+    metadata_cache = MetadataCache(get_metadata_cache_path(), settings.metadata_cache_max_size_mb * 1024 * 1024)
+    if (settings.clear_metadata_cache):
+        print(f"Clearing metadata cache '{metadata_cache.db_path}'")
+        metadata_cache.clear()
+    if (not use_metadata_cache):
+        metadata_cache.close()
+        return None
+    return metadata_cache
+
+@trace.traced("phase")
+def probe_clips(probe_jobs: list[dict], settings: SyncSettings, frame_rate, on_progress=no_progress, is_cancelled=not_cancelled, issues: ClipIssues | None = None,
+                on_provisional_cameras=None, metadata_cache: MetadataCache | None = None, probe_pool: probe.ProbePool | None = None) -> tuple[dict, dict]:
+    # Returns the cameras dict ({camera_name: {'clips', 'minimum_creation_time', 'minimum_creation_time_clip', 'offset'}},
+    # 'clips' being ClipRecord lists) and a report with the probe statistics and the clips that could not be read
+    # (report["issues"], a ClipIssues). Unreadable files are quarantined in the metadata cache and skipped on the next
+    # runs until they change (or settings.retry_quarantined is set).
+    # The clips are probed by priority, the likely earliest clips of each camera first (see order_probe_jobs_by_priority).
+    # With on_provisional_cameras, on_provisional_cameras(cameras) is called from the probing thread once the first
+    # PRIORITY_CLIPS_PER_CAMERA clips of every camera are read, with the cameras of the clips read so far, so that the
+    # offsets can be shown while the rest of the folder is probed (see correct_provisional_offsets).
+    # A batch shares its metadata cache and its probe workers between its folders (see batch.py): they are opened and
+    # closed by the caller when given, here otherwise.
+    if (issues == None):
+        issues = ClipIssues()
+
+    # clips with a camera sidecar are read from it and not probed
+    sidecar_metadata = {}
+    if (settings.start_time_source == StartTimeSource.SIDECAR_CREATION_TIME):
+        sidecar_metadata = read_sidecars(probe_jobs, on_progress, is_cancelled, issues)
+        probe_jobs_without_sidecar = [probe_job for probe_job in probe_jobs if probe_job["file_path"] not in sidecar_metadata]
+    else:
+        probe_jobs_without_sidecar = probe_jobs
+
+    owns_metadata_cache = metadata_cache == None
+    if owns_metadata_cache:
+        metadata_cache = open_metadata_cache(settings)
+    else:
+        metadata_cache.reset_counters()
+    try:
+        cached_metadata = {}
+        quarantined_files = {}
+        if (metadata_cache != None):
+            cached_metadata = metadata_cache.get_many([probe_job["file_path"] for probe_job in probe_jobs_without_sidecar])
+            if (not settings.retry_quarantined):
+                quarantined_files = metadata_cache.get_quarantined([probe_job["file_path"] for probe_job in probe_jobs_without_sidecar if probe_job["file_path"] not in cached_metadata])
+        for file_path, reason in quarantined_files.items():
+            issues.add("error", "quarantine", file_path, f"Skipped, could not be read on a previous run: {reason}")
+
+        jobs_to_probe = [probe_job for probe_job in probe_jobs_without_sidecar if probe_job["file_path"] not in cached_metadata and probe_job["file_path"] not in quarantined_files]
+
+        # content fingerprints, for the duplicate check and to find the files moved since they were cached, which are
+        # then not probed. A probed clip is fingerprinted on the probe worker right after its probe (see
+        # build_clip_metadata below); only the clips that may have moved (nothing cached under their path, a cached
+        # clip of the same size elsewhere) are fingerprinted before the probe, as their fingerprint decides whether
+        # they are probed at all. The clips read without a probe get theirs once the probe is done.
+        fingerprints = {}
+        moved_metadata = {}
+        if (settings.use_fingerprints and metadata_cache != None and len(jobs_to_probe) > 0):
+            move_candidate_paths = set(metadata_cache.find_move_candidates([probe_job["file_path"] for probe_job in jobs_to_probe]))
+            fingerprints = compute_clip_fingerprints([probe_job for probe_job in jobs_to_probe if probe_job["file_path"] in move_candidate_paths], settings, on_progress, is_cancelled, probe_pool)
+            moved_metadata = metadata_cache.get_many_by_fingerprint(fingerprints)
+            jobs_to_probe = [probe_job for probe_job in jobs_to_probe if probe_job["file_path"] not in moved_metadata]
+
+        # clips read by the probe service are not probed again here (None: the service could not read them)
+        service_metadata = {}
+        if (settings.use_probe_service and len(jobs_to_probe) > 0):
+            service_metadata = request_service_metadata(jobs_to_probe, settings, on_progress, is_cancelled, issues)
+            jobs_to_probe = [probe_job for probe_job in jobs_to_probe if probe_job["file_path"] not in service_metadata]
+        # with settings.sample_clip_sequences, only the ends and a sample of each run of clips are probed, the metadata
+        # of the others is inferred from their files once the sample is probed (see sequences.py)
+        clip_runs = []
+        jobs_to_infer = []
+        if (settings.sample_clip_sequences and len(jobs_to_probe) > 0):
+            clip_runs = find_clip_runs(probe_jobs)
+            sampled_paths = {probe_job["file_path"] for probe_job in get_sampled_jobs(clip_runs, settings.sequence_sample_interval)}
+            jobs_to_infer = [probe_job for probe_job in jobs_to_probe if probe_job["file_path"] not in sampled_paths]
+            jobs_to_probe = [probe_job for probe_job in jobs_to_probe if probe_job["file_path"] in sampled_paths]
+
+        jobs_to_probe = order_probe_jobs_by_priority(jobs_to_probe)
+        nb_clips_to_probe = len(jobs_to_probe)
+
+        # the clips that must be read before the provisional cameras are handed over
+        known_metadata = {**sidecar_metadata, **cached_metadata, **moved_metadata, **{file_path: clip_metadata for file_path, clip_metadata in service_metadata.items() if clip_metadata != None}}
+        waiting_priority_paths = set()
+        if (on_provisional_cameras != None):
+            probed_paths = {probe_job["file_path"] for probe_job in jobs_to_probe}
+            waiting_priority_paths = {probe_job["file_path"] for probe_job in get_priority_probe_jobs(probe_jobs) if probe_job["file_path"] in probed_paths}
+
+        def hand_over_provisional_cameras() -> None:
+            provisional_cameras = {}
+            for probe_job in probe_jobs:
+                clip_metadata = known_metadata.get(probe_job["file_path"])
+                if (clip_metadata != None):
+                    add_clip_record(provisional_cameras, ClipRecord(probe_job["clip"], probe_job["clip_name"], probe_job["camera_name"], clip_metadata, probe_job["previous_properties"]), settings, frame_rate)
+            if (len(provisional_cameras) > 0):
+                print(f"Earliest clips of each camera read ({len(known_metadata)} of {len(probe_jobs)} clips), the other clips are probed in the background")
+                on_provisional_cameras(provisional_cameras)
+
+        def on_probe_result(probe_job: dict, clip_metadata: ClipMetadata | None) -> None:
+            if (len(waiting_priority_paths) == 0):
+                return
+            if (clip_metadata != None):
+                known_metadata[probe_job["file_path"]] = clip_metadata
+            waiting_priority_paths.discard(probe_job["file_path"])
+            if (len(waiting_priority_paths) == 0):
+                hand_over_provisional_cameras()
+
+        if (on_provisional_cameras != None and len(waiting_priority_paths) == 0):
+            hand_over_provisional_cameras()
+
+        def on_probe_progress(nb_probed: int, clips_per_second: float) -> None:
+            if is_cancelled():
+                return
+            on_progress(float(nb_probed) / max(1, nb_clips_to_probe) * 100, f"Reading clips information... ({nb_probed} of {nb_clips_to_probe}, {clips_per_second:.1f} clips/s)")
+
+        def build_clip_metadata(probe_job: dict, ffmpeg_metadata: dict) -> ClipMetadata | None:
+            # runs on the probe workers: only the ClipMetadata is kept, the ffprobe output is dropped here
+            if (settings.probe_output_dir):
+                save_probe_output(settings.probe_output_dir, probe_job["file_path"], ffmpeg_metadata)
+            clip_metadata = probe.build_clip_metadata(probe_job["file_path"], probe_job["clip_name"], ffmpeg_metadata, issues)
+            if (settings.use_fingerprints):
+                clip_metadata.fingerprint = fingerprints.get(probe_job["file_path"]) or compute_fingerprints([probe_job["file_path"]]).get(probe_job["file_path"])
+            return clip_metadata
+
+        # the earliest clips of each camera go first on every device, the others in file path order
+        nb_clips_by_camera = collections.Counter(probe_job["camera_name"] for probe_job in jobs_to_probe)
+        nb_priority_jobs = sum(min(PRIORITY_CLIPS_PER_CAMERA, nb_clips) for nb_clips in nb_clips_by_camera.values())
+
+        print(f"Probing {nb_clips_to_probe} clips ({len(cached_metadata)} clips found in the metadata cache)...")
+        probed_metadata, probe_stats = probe.probe_clips_parallel(jobs_to_probe, settings.probe_concurrency, on_probe_progress, is_cancelled, settings.use_native_mp4_parser,
+                                                                  build_clip_metadata, issues, on_probe_result, settings.device_concurrency, nb_priority_jobs, probe_pool)
+
+        if is_cancelled():
+            raise SyncCancelled("Processing cancelled by user.")
+
+        print(f"Probed {probe_stats['nb_clips']} clips in {probe_stats['elapsed_seconds']:.1f}s ({probe_stats['clips_per_second']:.1f} clips/s, {probe_stats['concurrency']} workers)")
+        if (probe_stats["nb_clips"] > 0):
+            print(f"Probe throughput per storage device:\n{probe.format_device_probe_stats(probe_stats['devices'])}")
+
+        new_clip_metadata_by_path = {probe_job["file_path"]: clip_metadata for probe_job, clip_metadata in zip(jobs_to_probe, probed_metadata) if clip_metadata != None}
+
+        inferred_metadata = {}
+        if (len(jobs_to_infer) > 0):
+            known_metadata = {**sidecar_metadata, **cached_metadata, **moved_metadata, **{file_path: clip_metadata for file_path, clip_metadata in service_metadata.items() if clip_metadata != None},
+                              **new_clip_metadata_by_path}
+            inferred_metadata, failed_jobs = infer_clip_sequences(clip_runs, jobs_to_infer, known_metadata)
+            if (len(failed_jobs) > 0):
+                def on_failed_probe_progress(nb_probed: int, clips_per_second: float) -> None:
+                    if is_cancelled():
+                        return
+                    on_progress(float(nb_probed) / len(failed_jobs) * 100, f"Probing the clips that could not be inferred... ({nb_probed} of {len(failed_jobs)}, {clips_per_second:.1f} clips/s)")
+
+                failed_metadata, failed_probe_stats = probe.probe_clips_parallel(failed_jobs, settings.probe_concurrency, on_failed_probe_progress, is_cancelled, settings.use_native_mp4_parser,
+                                                                                 build_clip_metadata, issues, None, settings.device_concurrency, probe_pool=probe_pool)
+                if is_cancelled():
+                    raise SyncCancelled("Processing cancelled by user.")
+                new_clip_metadata_by_path.update({probe_job["file_path"]: clip_metadata for probe_job, clip_metadata in zip(failed_jobs, failed_metadata) if clip_metadata != None})
+                probe_stats["nb_clips"] += failed_probe_stats["nb_clips"]
+                probe_stats["elapsed_seconds"] += failed_probe_stats["elapsed_seconds"]
+                probe_stats["clips_per_second"] = probe_stats["nb_clips"] / probe_stats["elapsed_seconds"] if probe_stats["elapsed_seconds"] > 0 else 0.0
+            nb_sequence_clips = len(jobs_to_probe) + len(jobs_to_infer)
+            print(f"Sequence sampling: {len(inferred_metadata)} of {nb_sequence_clips} clips inferred ({len(inferred_metadata) / nb_sequence_clips:.0%}), "
+                  f"{nb_sequence_clips - len(inferred_metadata)} probed ({len(failed_jobs)} of them after failing the consistency check)")
+
+        if (settings.use_fingerprints):
+            unprobed_metadata = {**sidecar_metadata, **cached_metadata, **{file_path: clip_metadata for file_path, clip_metadata in service_metadata.items() if clip_metadata != None}, **inferred_metadata}
+            fingerprints.update(compute_clip_fingerprints([probe_job for probe_job in probe_jobs if probe_job["file_path"] in unprobed_metadata
+                                                           and unprobed_metadata[probe_job["file_path"]].fingerprint == None and probe_job["file_path"] not in fingerprints],
+                                                          settings, on_progress, is_cancelled, probe_pool))
+
+        cameras = {}
+        clip_records_by_fingerprint = {}
+        duplicates = [] # (clip_record, clip_record it duplicates, found earlier in the folder)
+        for probe_job in probe_jobs:
+            if is_cancelled():
+                raise SyncCancelled("Processing cancelled by user.")
+
+            camera_name = probe_job["camera_name"]
+            file_path = probe_job["file_path"]
+            clip_metadata = (sidecar_metadata.get(file_path) or cached_metadata.get(file_path) or moved_metadata.get(file_path)
+                             or service_metadata.get(file_path) or new_clip_metadata_by_path.get(file_path) or inferred_metadata.get(file_path))
+            if (clip_metadata == None):
+                continue
+            if (clip_metadata.fingerprint == None):
+                clip_metadata.fingerprint = fingerprints.get(file_path)
+
+            clip_record = ClipRecord(probe_job["clip"], probe_job["clip_name"], camera_name, clip_metadata, probe_job["previous_properties"])
+            add_clip_record(cameras, clip_record, settings, frame_rate)
+            if (clip_metadata.fingerprint != None):
+                original_clip_record = clip_records_by_fingerprint.setdefault(clip_metadata.fingerprint, clip_record)
+                if (original_clip_record is not clip_record):
+                    duplicates.append((clip_record, original_clip_record))
+
+        for clip_record, original_clip_record in duplicates:
+            issues.add("warning", "duplicate", clip_record.file_path, f"Clip '{clip_record.clip_name}' (camera '{clip_record.camera_name}') has the same content as clip "
+                       f"'{original_clip_record.clip_name}' (camera '{original_clip_record.camera_name}', '{original_clip_record.file_path}')")
+
+        report = {
+            "probe_stats": probe_stats,
+            "nb_sidecar_clips": len(sidecar_metadata),
+            "nb_cached_clips": len(cached_metadata),
+            "nb_service_clips": len(service_metadata),
+            "nb_quarantined_clips": len(quarantined_files),
+            "nb_moved_clips": len(moved_metadata),
+            "nb_inferred_clips": len(inferred_metadata),
+            "duplicates": duplicates,
+            "cache_summary": None,
+            "issues": issues,
+        }
+        if (metadata_cache != None):
+            metadata_cache.quarantine_many(issues.quarantined_files())
+            # the clips answered by the probe service are cached too, for the runs without the service, and so are the
+            # moved clips under their new path and the cached clips that just got their fingerprint
+            service_clip_metadata_by_path = {file_path: clip_metadata for file_path, clip_metadata in service_metadata.items() if clip_metadata != None}
+            fingerprinted_metadata = {file_path: clip_metadata for file_path, clip_metadata in cached_metadata.items() if file_path in fingerprints}
+            metadata_cache.put_many({**fingerprinted_metadata, **moved_metadata, **service_clip_metadata_by_path, **new_clip_metadata_by_path})
+            report["cache_summary"] = metadata_cache.summary()
+            print(report["cache_summary"])
+    finally:
+        if (metadata_cache != None and owns_metadata_cache):
+            metadata_cache.close()
+
+    if (len(cameras) == 0):
+        raise SyncError("None of the clips could be read." + (f"\n\n{issues.summary()}" if len(issues) > 0 else ""))
+
+    return cameras, report
+
+
+PRIORITY_CLIPS_PER_CAMERA = 3 # clips of each camera read before the provisional offsets are shown
+
+def get_probe_priority_key(probe_job: dict) -> tuple:
+    # cards write the clips in recording order: the file modification time (the end of the recording, or the time of the
+    # copy, which copies the files in name order) and then the clip number in the name (C0001, C0002...) come first
+    try:
+        mtime_ns = os.stat(probe_job["file_path"]).st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    name_numbers = [int(number) for number in re.findall(r"\d+", probe_job["clip_name"])]
+    return (mtime_ns == None, mtime_ns or 0, name_numbers, probe_job["clip_name"])
+
+def order_probe_jobs_by_priority(probe_jobs: list[dict]) -> list[dict]:
+    # the likely earliest clip of every camera, then the second of every camera, and so on
+    jobs_by_camera = {}
+    for probe_job in probe_jobs:
+        jobs_by_camera.setdefault(probe_job["camera_name"], []).append((get_probe_priority_key(probe_job), probe_job))
+    ordered_camera_jobs = [[probe_job for _, probe_job in sorted(camera_jobs, key=lambda keyed_job: keyed_job[0])] for camera_jobs in jobs_by_camera.values()]
+    return [probe_job for rank_jobs in itertools.zip_longest(*ordered_camera_jobs) for probe_job in rank_jobs if probe_job != None]
+
+def infer_clip_sequences(clip_runs: list[list[dict]], jobs_to_infer: list[dict], known_metadata: dict) -> tuple[dict, list[dict]]:
+    # ({file_path: inferred ClipMetadata}, jobs to probe after all) for the clips of jobs_to_infer (see sequences.py)
+    paths_to_infer = {probe_job["file_path"] for probe_job in jobs_to_infer}
+    inferred_metadata = {}
+    failed_jobs = []
+    for clip_run in clip_runs:
+        if (not any(probe_job["file_path"] in paths_to_infer for probe_job in clip_run)):
+            continue
+        run_metadata, run_failed_jobs = infer_run_metadata(clip_run, known_metadata)
+        inferred_metadata.update(run_metadata)
+        failed_jobs.extend(probe_job for probe_job in run_failed_jobs if probe_job["file_path"] in paths_to_infer)
+    return inferred_metadata, failed_jobs
+
+def get_priority_probe_jobs(probe_jobs: list[dict], nb_clips_per_camera: int = PRIORITY_CLIPS_PER_CAMERA) -> list[dict]:
+    # the first nb_clips_per_camera clips of each camera in priority order
+    nb_taken_by_camera = {}
+    priority_jobs = []
+    for probe_job in order_probe_jobs_by_priority(probe_jobs):
+        if (nb_taken_by_camera.get(probe_job["camera_name"], 0) < nb_clips_per_camera):
+            nb_taken_by_camera[probe_job["camera_name"]] = nb_taken_by_camera.get(probe_job["camera_name"], 0) + 1
+            priority_jobs.append(probe_job)
+    return priority_jobs
+
+def add_clip_record(cameras: dict, clip_record: ClipRecord, settings: SyncSettings, frame_rate) -> None:
+    camera = cameras.setdefault(clip_record.camera_name, {
+        'clips': [],
+        'minimum_creation_time': None,
+        'minimum_creation_time_clip': None,
+        'offset': Timecode(frame_rate, 0, 0, 0, 0),
+    })
+    camera['clips'].append(clip_record)
+
+    creation_time = get_creation_time(clip_record.metadata, settings.start_time_source)
+
+    if (camera['minimum_creation_time'] == None or creation_time < camera['minimum_creation_time']):
+        camera['minimum_creation_time'] = creation_time
+        camera['minimum_creation_time_clip'] = clip_record
+
+def compute_clip_fingerprints(probe_jobs: list[dict], settings: SyncSettings, on_progress=no_progress, is_cancelled=not_cancelled, probe_pool: probe.ProbePool | None = None) -> dict:
+    # {file_path: content fingerprint} (see fingerprint.py), on the probe workers' concurrency: a few small reads per clip
+    nb_clips = len(probe_jobs)
+    if (nb_clips == 0):
+        return {}
+
+    def on_fingerprint_progress(nb_done: int, clips_per_second: float) -> None:
+        if is_cancelled():
+            return
+        on_progress(float(nb_done) / nb_clips * 100, f"Fingerprinting clips... ({nb_done} of {nb_clips}, {clips_per_second:.1f} clips/s)")
+
+    start_time = time.perf_counter()
+    executor = probe_pool.get_executor(settings.probe_concurrency) if probe_pool != None else None
+    fingerprints = compute_fingerprints_parallel([probe_job["file_path"] for probe_job in probe_jobs], settings.probe_concurrency, on_fingerprint_progress, is_cancelled, executor)
+    if is_cancelled():
+        raise SyncCancelled("Processing cancelled by user.")
+    print(f"Fingerprinted {len(fingerprints)} clips in {time.perf_counter() - start_time:.1f}s")
+    return fingerprints
+
+def remove_duplicate_clips(cameras: dict, duplicates: list[tuple], settings: SyncSettings, frame_rate) -> dict:
+    # the cameras without the duplicate clips found by probe_clips (the first copy in the folder is kept); a camera
+    # made only of duplicates is dropped. The offsets are computed afterwards.
+    duplicate_clip_records = {id(clip_record) for clip_record, _ in duplicates}
+    remaining_cameras = {}
+    for camera in cameras.values():
+        for clip_record in camera["clips"]:
+            if (id(clip_record) not in duplicate_clip_records):
+                add_clip_record(remaining_cameras, clip_record, settings, frame_rate)
+    print(f"Skipped {len(duplicate_clip_records)} duplicate clips" + (f", cameras left out: {', '.join(sorted(set(cameras) - set(remaining_cameras)))}" if len(remaining_cameras) < len(cameras) else ""))
+    if (len(remaining_cameras) == 0):
+        raise SyncError("No clips are left once the duplicate clips are skipped.")
+    return remaining_cameras
+
+def read_sidecars(probe_jobs: list[dict], on_progress=no_progress, is_cancelled=not_cancelled, issues: ClipIssues | None = None) -> dict:
+    # {file_path: ClipMetadata} of the clips read from their camera sidecar (see sidecar.py)
+    sidecar_index = SidecarIndex()
+    sidecar_metadata = {}
+    nb_clips = len(probe_jobs)
+    for job_index, probe_job in enumerate(probe_jobs):
+        if is_cancelled():
+            raise SyncCancelled("Processing cancelled by user.")
+        if (job_index % 100 == 0):
+            on_progress(float(job_index) / max(1, nb_clips) * 100, f"Reading camera sidecar files... ({job_index} of {nb_clips})")
+
+        file_path = probe_job["file_path"]
+        sidecar_path = sidecar_index.find(file_path)
+        if (sidecar_path == None):
+            continue
+        try:
+            sidecar_metadata[file_path] = read_sidecar_metadata(file_path, sidecar_path)
+        except SidecarError as e:
+            message = f"Clip '{probe_job['clip_name']}': cannot read sidecar '{sidecar_path}' ({e}), probing the clip instead"
+            if (issues != None):
+                issues.add("warning", "sidecar", file_path, message)
+            else:
+                print_warning(message)
+
+    print(f"Creation times: {len(sidecar_metadata)} clips from camera sidecar files ({len(sidecar_index.scanned_directories)} directories listed), "
+          f"{nb_clips - len(sidecar_metadata)} clips without a sidecar are probed")
+    return sidecar_metadata
+
+def request_service_metadata(probe_jobs: list[dict], settings: SyncSettings, on_progress=no_progress, is_cancelled=not_cancelled, issues: ClipIssues | None = None) -> dict:
+    # {file_path: ClipMetadata | None} of the clips the probe service answered, empty when no service is reachable
+    nb_clips = len(probe_jobs)
+
+    def on_service_progress(nb_answered: int, clips_per_second: float) -> None:
+        if is_cancelled():
+            return
+        on_progress(float(nb_answered) / nb_clips * 100, f"Reading clips information from the probe service... ({nb_answered} of {nb_clips}, {clips_per_second:.1f} clips/s)")
+
+    service_metadata = probe.request_clip_metadata([probe_job["file_path"] for probe_job in probe_jobs], settings.probe_service_address,
+                                                   settings.use_native_mp4_parser, on_service_progress, is_cancelled, issues)
+    if is_cancelled():
+        raise SyncCancelled("Processing cancelled by user.")
+    if (service_metadata == None):
+        return {}
+
+    print(f"Probe service at {settings.probe_service_address} answered {len(service_metadata)} of {nb_clips} clips")
+    return service_metadata
+
+
+# --- Offsets ---
+
+@trace.traced("phase")
+def compute_offsets(cameras: dict, settings: SyncSettings, frame_rate, on_progress=no_progress, is_cancelled=not_cancelled) -> datetime:
+    # Sets camera["offset"] for every camera and returns the creation time of the start of the multicam timeline
+    zero_creation_time = min([camera["minimum_creation_time"] for camera in cameras.values()])
+
+    # -- Calculate default camera offsets considering they all started recording roughly at the same time --
+    for camera_name, camera in cameras.items():
+        camera_earliest_creation_time = camera["minimum_creation_time"]
+        offset_time_delta = camera_earliest_creation_time - zero_creation_time
+        offset_timecode = Timecode.from_timedelta(offset_time_delta, frame_rate)
+
+        print_debug(f"Camera '{camera_name}': earliest creation time = {camera_earliest_creation_time}, offset time  = {offset_time_delta}, offset timecode = {offset_timecode}")
+
+        camera["offset"] = offset_timecode
+
+    if (settings.offset_source in (OffsetSource.AUDIO_CROSS_CORRELATION, OffsetSource.VISUAL_LUMA_CORRELATION)):
+        if (audio_sync == None):
+            print_warning(f"{'Audio' if settings.offset_source == OffsetSource.AUDIO_CROSS_CORRELATION else 'Visual'} sync requires NumPy, which is not installed. Camera offsets are based on the camera start times.")
+        elif (len(cameras) > 1 and settings.offset_source == OffsetSource.AUDIO_CROSS_CORRELATION):
+            zero_creation_time = estimate_offsets_from_audio(cameras, settings, frame_rate, on_progress, is_cancelled)
+        elif (len(cameras) > 1):
+            zero_creation_time = estimate_offsets_from_video(cameras, settings, frame_rate, on_progress, is_cancelled)
+
+    return zero_creation_time
+
+def correct_provisional_offsets(cameras: dict, provisional_cameras: dict, chosen_offsets: dict, settings: SyncSettings, frame_rate,
+                                on_progress=no_progress, is_cancelled=not_cancelled) -> tuple[datetime, list[str]]:
+    # Offsets of the final cameras when the user chose chosen_offsets ({camera_name: Timecode}) for the provisional
+    # cameras (see probe_clips' on_provisional_cameras): the change the user made to each automatic offset is kept on
+    # top of the final automatic offset, which moves when a clip probed later is earlier than the camera's provisional
+    # start. Returns the creation time of the start of the timeline and a message for each camera that moved.
+    provisional_zero_creation_time = min([camera["minimum_creation_time"] for camera in provisional_cameras.values()])
+    zero_creation_time = compute_offsets(cameras, settings, frame_rate, on_progress, is_cancelled)
+
+    messages = []
+    for camera_name, camera in cameras.items():
+        provisional_camera = provisional_cameras.get(camera_name)
+        if (provisional_camera == None or camera_name not in chosen_offsets):
+            messages.append(f"Camera '{camera_name}' had no clip read when the offsets were shown, its offset is the automatic one: {camera['offset']}")
+            continue
+        if (camera["minimum_creation_time"] < provisional_camera["minimum_creation_time"]):
+            messages.append(f"Camera '{camera_name}' starts at {camera['minimum_creation_time']} (clip '{camera['minimum_creation_time_clip'].clip_name}'), "
+                            f"earlier than the {provisional_camera['minimum_creation_time']} of the clips read when the offsets were shown")
+
+        provisional_offset_frames = Timecode.from_timedelta(provisional_camera["minimum_creation_time"] - provisional_zero_creation_time, frame_rate).total_frames
+        offset_frames = camera["offset"].total_frames + chosen_offsets[camera_name].total_frames - provisional_offset_frames
+        if (offset_frames < 0):
+            messages.append(f"Camera '{camera_name}': the offset chosen would be negative once all the clips are read, it is set to 0")
+            offset_frames = 0
+        camera["offset"] = Timecode.from_total_frames(offset_frames, frame_rate)
+
+    if (len(messages) > 0):
+        print_warning("Camera offsets corrected after all the clips were read:\n" + "\n".join(messages))
+    return zero_creation_time, messages
+
+def get_camera_clip_spans(cameras: dict, settings: SyncSettings) -> dict:
+    # clips per camera as (file path, start on the camera clock in seconds, duration in seconds, content fingerprint)
+    camera_clips = {}
+    for camera_name, camera in cameras.items():
+        camera_clips[camera_name] = [
+            (clip_record.file_path, get_creation_time(clip_record.metadata, settings.start_time_source).timestamp(), clip_record.metadata.duration_seconds, clip_record.metadata.fingerprint)
+            for clip_record in camera["clips"]
+        ]
+    return camera_clips
+
+def estimate_offsets_from_audio(cameras: dict, settings: SyncSettings, frame_rate, on_progress=no_progress, is_cancelled=not_cancelled) -> datetime:
+    def estimate_camera_offsets(camera_clips: dict, reference_camera_name: str, nominal_differences: dict, on_estimate_progress) -> dict:
+        return audio_sync.estimate_camera_offsets(camera_clips, reference_camera_name, nominal_differences, max_workers=settings.probe_concurrency,
+                                                  on_progress=on_estimate_progress, is_cancelled=is_cancelled)
+
+    return estimate_offsets_from_content(cameras, "audio", estimate_camera_offsets, settings.audio_sync_min_confidence, frame_rate, settings, on_progress, is_cancelled)
+
+def estimate_offsets_from_video(cameras: dict, settings: SyncSettings, frame_rate, on_progress=no_progress, is_cancelled=not_cancelled) -> datetime:
+    # the luma signatures are cached next to the metadata cache, unless the metadata cache is turned off
+    cache_dir = visual_sync.get_signature_cache_dir() if settings.use_metadata_cache else None
+
+    def estimate_camera_offsets(camera_clips: dict, reference_camera_name: str, nominal_differences: dict, on_estimate_progress) -> dict:
+        return visual_sync.estimate_camera_offsets(camera_clips, reference_camera_name, nominal_differences, max_workers=settings.probe_concurrency,
+                                                   cache_dir=cache_dir, on_progress=on_estimate_progress, is_cancelled=is_cancelled)
+
+    return estimate_offsets_from_content(cameras, "visual", estimate_camera_offsets, settings.visual_sync_min_confidence, frame_rate, settings, on_progress, is_cancelled)
+
+def estimate_offsets_from_content(cameras: dict, content: str, estimate_camera_offsets, min_confidence: float, frame_rate, settings: SyncSettings,
+                                  on_progress=no_progress, is_cancelled=not_cancelled) -> datetime:
+    # Camera offsets from the clock differences estimate_camera_offsets(camera_clips, reference_camera_name,
+    # nominal_differences, on_progress) finds in the audio or the picture ("audio" or "visual" content); the result of
+    # each camera is in camera["audio_sync"] or camera["visual_sync"]
+    camera_clips = get_camera_clip_spans(cameras, settings)
+
+    # the camera with the most recorded time is the most likely to overlap all the others
+    reference_camera_name = max(camera_clips, key=lambda camera_name: sum(clip[2] for clip in camera_clips[camera_name]))
+    reference_camera = cameras[reference_camera_name]
+    nominal_differences = {
+        camera_name: (camera["minimum_creation_time"] - reference_camera["minimum_creation_time"]).total_seconds()
+        for camera_name, camera in cameras.items()
+    }
+
+    def on_estimate_progress(nb_done: int, nb_total: int) -> None:
+        if is_cancelled():
+            return
+        on_progress(float(nb_done) / nb_total * 100, f"Estimating camera offsets from {'audio' if content == 'audio' else 'the picture'}... ({nb_done} of {nb_total} cameras)")
+
+    print(f"Estimating camera offsets from {'audio' if content == 'audio' else 'the picture'} against reference camera '{reference_camera_name}'...")
+    estimates = estimate_camera_offsets(camera_clips, reference_camera_name, nominal_differences, on_estimate_progress)
+
+    if is_cancelled():
+        raise SyncCancelled("Processing cancelled by user.")
+
+    # camera clock time at the start of the multicam timeline
+    timeline_origins = {camera_name: camera["minimum_creation_time"] for camera_name, camera in cameras.items()}
+    synced_camera_names = [reference_camera_name]
+    sync_key = f"{content}_sync"
+    reference_camera[sync_key] = "reference"
+
+    for camera_name, estimate in estimates.items():
+        camera = cameras[camera_name]
+        if (estimate == None):
+            camera[sync_key] = "no overlap"
+            print(f"- Camera '{camera_name}': no clip overlapping the reference camera, keeping the start time offset")
+        elif ("error" in estimate):
+            camera[sync_key] = "error"
+            print(f"- Camera '{camera_name}': {estimate['error']}")
+        elif (estimate["confidence"] < min_confidence):
+            camera[sync_key] = f"low ({estimate['confidence']:.2f})"
+            print(f"- Camera '{camera_name}': confidence {estimate['confidence']:.2f} is too low, keeping the start time offset")
+        else:
+            camera[sync_key] = f"{estimate['confidence']:.2f}"
+            timeline_origins[camera_name] = reference_camera["minimum_creation_time"] + timedelta(seconds=estimate["clock_difference_seconds"])
+            synced_camera_names.append(camera_name)
+            print(f"- Camera '{camera_name}': clock difference {estimate['clock_difference_seconds']:+.3f}s (confidence {estimate['confidence']:.2f}, '{estimate['clip']}' vs '{estimate['reference_clip']}')")
+
+    # move the synced cameras together so that none of their clips starts before the timeline start
+    shift = min(cameras[camera_name]["minimum_creation_time"] - timeline_origins[camera_name] for camera_name in synced_camera_names)
+    for camera_name in synced_camera_names:
+        timeline_origins[camera_name] += shift
+
+    new_zero_creation_time = min(timeline_origins.values())
+    for camera_name, camera in cameras.items():
+        camera["offset"] = Timecode.from_timedelta(timeline_origins[camera_name] - new_zero_creation_time, frame_rate)
+
+    return new_zero_creation_time
+
+
+# --- Incremental sync ---
+
+def get_folder_key(folder) -> str:
+    # Resolve 18+ folders have a unique id; older versions only have the name
+    if hasattr(folder, "GetUniqueId"):
+        return folder.GetUniqueId()
+    return folder.GetName()
+
+@trace.traced("phase")
+def load_sync_state(folder) -> dict | None:
+    sync_state_store = SyncStateStore(get_sync_state_path())
+    try:
+        return sync_state_store.load(get_folder_key(folder))
+    finally:
+        sync_state_store.close()
+
+def reconcile_with_previous_sync(cameras: dict, zero_creation_time: datetime, previous_state: dict | None, settings: SyncSettings, frame_rate) -> dict | None:
+    # Restores the camera offsets of the previous sync (they may have been edited by the user) when the timeline is
+    # unchanged, and returns the clips it applied so that apply_sync only writes what differs from them.
+    # Returns None when every clip has to be written.
+    if (previous_state == None):
+        print("Incremental sync: no previous sync of this folder, syncing all clips.")
+        return None
+
+    if (previous_state["camera_property"] != settings.camera_property):
+        print(f"Incremental sync: the camera property changed from '{previous_state['camera_property']}' to '{settings.camera_property}', syncing all clips.")
+        return None
+
+    if (previous_state["frame_rate"] != str(frame_rate) or previous_state["start_time_source"] != settings.start_time_source.name):
+        print("Incremental sync: the frame rate or start time source changed since the previous sync, recomputing all camera offsets and timecodes.")
+    elif (previous_state["zero_creation_time"] != zero_creation_time):
+        print(f"Incremental sync: the timeline start moved from {previous_state['zero_creation_time']} to {zero_creation_time}, recomputing all camera offsets and timecodes.")
+    else:
+        for camera_name, camera in cameras.items():
+            if (camera_name in previous_state["camera_offsets"]):
+                camera["offset"] = Timecode.from_total_frames(previous_state["camera_offsets"][camera_name], frame_rate)
+        print(f"Incremental sync: building on the previous sync of {len(previous_state['applied_clips'])} clips.")
+
+    return previous_state["applied_clips"]
+
+@trace.traced("phase")
+def save_sync_state(folder, settings: SyncSettings, frame_rate, cameras: dict, zero_creation_time: datetime, applied_clips: dict) -> None:
+    camera_offsets = {camera_name: camera["offset"].total_frames for camera_name, camera in cameras.items()}
+    sync_state_store = SyncStateStore(get_sync_state_path())
+    try:
+        sync_state_store.save(get_folder_key(folder), str(frame_rate), settings.start_time_source.name, settings.camera_property, zero_creation_time, camera_offsets, applied_clips)
+    finally:
+        sync_state_store.close()
+
+
+# --- Apply ---
+
+def compute_start_timecodes(cameras: dict, zero_creation_time: datetime, settings: SyncSettings, frame_rate) -> tuple[list[ClipRecord], list[datetime], list[str]]:
+    # Sets clip_record.start_frame of every clip and returns the clips with their creation times and start timecodes
+    clip_records = [clip_record for camera in cameras.values() for clip_record in camera["clips"]]
+    creation_times = [get_creation_time(clip_record.metadata, settings.start_time_source) for clip_record in clip_records]
+    offset_frames = [cameras[clip_record.camera_name]["offset"].total_frames for clip_record in clip_records]
+    try:
+        clip_start_frames = start_frames(creation_times, offset_frames, zero_creation_time, frame_rate)
+    except ValueError as e:
+        raise SyncError(f"Invalid camera offsets: {e}. Reduce the camera offsets and try again.") from e
+    start_timecode_strs = format_timecodes(clip_start_frames, frame_rate)
+    for clip_record, start_frame in zip(clip_records, clip_start_frames):
+        clip_record.start_frame = int(start_frame)
+    return clip_records, creation_times, start_timecode_strs
+
+def get_current_sync_values(clip_record: ClipRecord, previous_clip: dict | None, identity, settings: SyncSettings) -> tuple[str | None, str | None]:
+    # (Start TC, camera) of the clip in Resolve: read with the folder, or else as written by the previous sync of the
+    # same file; None when unknown
+    current_properties = clip_record.current_properties or {}
+    same_file = previous_clip != None and previous_clip["identity"] == identity
+    current_start_tc = current_properties.get("Start TC", previous_clip["start_tc"] if same_file else None)
+    current_camera_name = current_properties.get(settings.camera_property, previous_clip["camera_name"] if same_file else None)
+    return current_start_tc, current_camera_name
+
+@trace.traced("phase")
+def apply_sync(cameras: dict, zero_creation_time: datetime, settings: SyncSettings, frame_rate, on_progress=no_progress, is_cancelled=not_cancelled,
+               previous_clips: dict | None = None, issues: ClipIssues | None = None) -> dict:
+    # -- Set "Start TC" for all clips, as well as "Camera #" --
+    # Earliest clip will be the reference for the multicam clip being "00:00:00:00"
+    # With previous_clips (see reconcile_with_previous_sync), only the properties whose value in Resolve differs from
+    # the computed one are written, and clips with nothing to write are skipped. The values in Resolve are those read
+    # with the folder (clip_record.current_properties), so that a clip re-imported or edited by hand since the last
+    # sync is written again; the sync state is only used for the clips whose values were not read.
+    # Returns the counts and the applied clips for save_sync_state; clips Resolve refused to update are added to
+    # `issues` and left out of the applied clips, so that an incremental sync writes them again.
+    if (issues == None):
+        issues = ClipIssues()
+    clip_records, creation_times, start_timecode_strs = compute_start_timecodes(cameras, zero_creation_time, settings, frame_rate)
+
+    nb_clips_total = len(clip_records)
+    nb_clips_processed = 0
+    result = {"nb_clips": nb_clips_total, "nb_added": 0, "nb_updated": 0, "nb_skipped": 0, "nb_failed": 0, "applied_clips": {}, "issues": issues}
+    for clip_record, clip_creation_time, start_timecode_str in zip(clip_records, creation_times, start_timecode_strs):
+        if is_cancelled():
+            raise SyncCancelled(f"Processing cancelled by user after {nb_clips_processed} of {nb_clips_total} clips.")
+
+        clip = clip_record.clip
+        camera_name = clip_record.camera_name
+        file_path = clip_record.file_path
+        applied_clip = {"identity": get_file_identity(file_path), "camera_name": camera_name, "start_tc": start_timecode_str}
+        result["applied_clips"][file_path] = applied_clip
+
+        previous_clip = previous_clips.get(file_path) if previous_clips != None else None
+        write_start_tc = True
+        write_camera = True
+        if (previous_clips != None):
+            current_start_tc, current_camera_name = get_current_sync_values(clip_record, previous_clip, applied_clip["identity"], settings)
+            write_start_tc = current_start_tc != start_timecode_str
+            write_camera = current_camera_name != camera_name
+        if (not write_start_tc and not write_camera):
+            result["nb_skipped"] += 1
+        else:
+            if is_debug():
+                print_debug(f"Clip '{clip_record.clip_name}' (Camera {camera_name}): creation time = {clip_creation_time}, camera offset = {cameras[camera_name]['offset']}, start timecode = {start_timecode_str}")
+
+            failed_property_names = []
+            with trace.span("clip", "apply", file_path=file_path, start_tc=start_timecode_str):
+                if (write_start_tc):
+                    if (clip.SetClipProperty("Start TC", start_timecode_str) == False):
+                        failed_property_names.append("Start TC")
+                if (write_camera):
+                    if (clip.SetClipProperty(settings.camera_property, camera_name) == False):
+                        failed_property_names.append(settings.camera_property)
+
+            if (len(failed_property_names) > 0):
+                issues.add("error", "apply", file_path, f"Resolve did not set {' and '.join(repr(name) for name in failed_property_names)} of clip '{clip_record.clip_name}'")
+                del result["applied_clips"][file_path]
+                result["nb_failed"] += 1
+            else:
+                result["nb_added" if previous_clip == None else "nb_updated"] += 1
+
+        nb_clips_processed += 1
+
+        on_progress(float(nb_clips_processed) / nb_clips_total * 100, f"Setting clips time codes and angles... ({nb_clips_processed} of {nb_clips_total})")
+
+    if (previous_clips != None):
+        print(f"Incremental sync: {result['nb_added']} clips added, {result['nb_updated']} updated, {result['nb_skipped']} unchanged, {result['nb_failed']} failed")
+    return result
+
+
+# --- Overlaps and sessions ---
+
+@trace.traced("phase")
+def analyze_recording(cameras: dict, settings: SyncSettings, frame_rate) -> dict:
+    # Indexes the clip intervals on the timeline (after apply_sync has set clip_record.start_frame), splits them in
+    # recording sessions and prints a short report of the sessions, camera coverage and cross-camera overlaps
+    frame_rate = FrameRate.of(frame_rate)
+    clip_records = [clip_record for camera in cameras.values() for clip_record in camera["clips"]]
+    intervals = []
+    for clip_index, clip_record in enumerate(clip_records):
+        duration_frames = max(1, frame_rate.frames_from_microseconds(round(clip_record.metadata.duration_seconds * 1000000)))
+        intervals.append(ClipInterval(clip_record.start_frame, clip_record.start_frame + duration_frames, clip_record.camera_name, clip_index))
+
+    overlap_index = OverlapIndex(intervals)
+    session_gap_frames = frame_rate.frames_from_microseconds(round(settings.session_gap_seconds * 1000000))
+    sessions = overlap_index.sessions(session_gap_frames)
+    nb_overlapping_pairs = overlap_index.count_cross_camera_overlaps()
+    nb_isolated_clips = sum(1 for interval in intervals if not overlap_index.overlaps_other_camera(interval))
+
+    print(f"Recording sessions (split on gaps over {settings.session_gap_seconds:g}s in all cameras): {len(sessions)}")
+    for session in sessions:
+        cameras_summary = ", ".join(f"'{camera_name}' {nb_clips}" for camera_name, nb_clips in session.nb_clips_per_camera.items())
+        print(f"- Session {session.index}: {frame_rate.format(session.start)} - {frame_rate.format(session.end)} ({len(session.clip_indexes)} clips: {cameras_summary})")
+
+    if (len(sessions) > 0):
+        timeline_frames = sessions[-1].end - sessions[0].start
+        gap_threshold_frames = frame_rate.frames_from_microseconds(1000000)
+        print("Camera coverage:")
+        for camera_name in overlap_index.camera_names:
+            gaps = overlap_index.coverage_gaps(camera_name, gap_threshold_frames)
+            longest_gap = max((end - start for start, end in gaps), default=0)
+            print(f"- '{camera_name}': {overlap_index.covered_frames(camera_name) / max(1, timeline_frames) * 100:.0f}% of the timeline, {len(gaps)} gaps over 1s (longest {frame_rate.format(longest_gap)})")
+    print(f"Cross-camera overlaps: {nb_overlapping_pairs} clip pairs, {nb_isolated_clips} clips overlap no other camera")
+
+    return {
+        "clip_records": clip_records,
+        "overlap_index": overlap_index,
+        "sessions": sessions,
+        "nb_overlapping_pairs": nb_overlapping_pairs,
+        "nb_isolated_clips": nb_isolated_clips,
+    }
+
+@trace.traced("phase")
+def apply_session_property(analysis: dict, settings: SyncSettings, on_progress=no_progress, is_cancelled=not_cancelled, issues: ClipIssues | None = None) -> int:
+    # Sets settings.session_property (e.g. "Scene") of each clip to the name of its recording session
+    clip_records = analysis["clip_records"]
+    nb_clips_processed = 0
+    for session in analysis["sessions"]:
+        for clip_index in session.clip_indexes:
+            if is_cancelled():
+                raise SyncCancelled(f"Processing cancelled by user after {nb_clips_processed} of {len(clip_records)} clips.")
+
+            clip_record = clip_records[clip_index]
+            if (clip_record.clip.SetClipProperty(settings.session_property, f"Session {session.index}") == False and issues != None):
+                issues.add("warning", "apply", clip_record.file_path, f"Resolve did not set '{settings.session_property}' of clip '{clip_record.clip_name}'")
+            nb_clips_processed += 1
+            on_progress(float(nb_clips_processed) / len(clip_records) * 100, f"Setting clips sessions... ({nb_clips_processed} of {len(clip_records)})")
+    return nb_clips_processed
+
+
+# --- Timeline ---
+
+TIMELINE_APPEND_BATCH_SIZE = 500 # clips per AppendToTimeline call
+
+def get_clip_end_frame(clip_record: ClipRecord) -> int:
+    # last frame of the clip, in clip frames (the unit of the clip info startFrame and endFrame)
+    nb_frames = clip_record.metadata.nb_frames
+    if (nb_frames <= 0):
+        nb_frames = round(clip_record.metadata.duration_seconds * float(FrameRate(clip_record.metadata.frame_rate)))
+    return max(0, nb_frames - 1)
+
+@trace.traced("phase")
+def build_timelines(project, analysis: dict, settings: SyncSettings, frame_rate, on_progress=no_progress, is_cancelled=not_cancelled) -> dict:
+    # Creates a timeline named settings.multicam_clip_name (or one per recording session with
+    # settings.timeline_per_session) with one video track per camera, each clip placed at its start frame
+    # (clip_record.start_frame, set by apply_sync). The clips of a camera go in with a few AppendToTimeline calls taking
+    # TIMELINE_APPEND_BATCH_SIZE clip infos each, instead of one call per clip. The timeline starts at the timecode of its
+    # first frame when Resolve supports SetStartTimecode, so that its timecodes are the clips' Start TC.
+    start_time = time.perf_counter()
+    frame_rate = FrameRate.of(frame_rate)
+    media_pool = project.GetMediaPool()
+    clip_records = analysis["clip_records"]
+    camera_names = list(dict.fromkeys(clip_record.camera_name for clip_record in clip_records))
+
+    if (settings.timeline_per_session):
+        timeline_groups = [
+            (f"{settings.multicam_clip_name} - Session {session.index}", session.start, [clip_records[clip_index] for clip_index in session.clip_indexes])
+            for session in analysis["sessions"]
+        ]
+    else:
+        timeline_groups = [(settings.multicam_clip_name, 0, clip_records)]
+
+    result = {"timelines": [], "nb_clips": len(clip_records), "nb_added": 0, "nb_append_calls": 0, "elapsed_seconds": 0.0}
+    nb_clips_processed = 0
+    for timeline_name, timeline_start_frame, group_clip_records in timeline_groups:
+        timeline_name = resolve_api.get_unique_timeline_name(project, timeline_name)
+        timeline = media_pool.CreateEmptyTimeline(timeline_name)
+        if (timeline == None):
+            raise SyncError(f"Resolve could not create the timeline '{timeline_name}'.")
+        project.SetCurrentTimeline(timeline) # AppendToTimeline adds to the current timeline
+        if (callable(getattr(timeline, "SetStartTimecode", None))):
+            timeline.SetStartTimecode(frame_rate.format(timeline_start_frame))
+        record_frame_offset = timeline.GetStartFrame() - timeline_start_frame
+
+        while (timeline.GetTrackCount("video") < len(camera_names)):
+            if (not timeline.AddTrack("video")):
+                raise SyncError(f"Resolve could not add a video track to the timeline '{timeline_name}'.")
+        for track_index, camera_name in enumerate(camera_names, start=1):
+            timeline.SetTrackName("video", track_index, camera_name)
+
+        # video only: the audio tracks would need the channel layout of each camera
+        clip_infos_by_camera = {}
+        for clip_record in group_clip_records:
+            clip_infos_by_camera.setdefault(clip_record.camera_name, []).append({
+                "mediaPoolItem": clip_record.clip,
+                "startFrame": 0,
+                "endFrame": get_clip_end_frame(clip_record),
+                "mediaType": 1,
+                "trackIndex": camera_names.index(clip_record.camera_name) + 1,
+                "recordFrame": clip_record.start_frame + record_frame_offset,
+            })
+
+        nb_timeline_clips = 0
+        for camera_name, clip_infos in clip_infos_by_camera.items():
+            clip_infos.sort(key=lambda clip_info: clip_info["recordFrame"])
+            for batch_start in range(0, len(clip_infos), TIMELINE_APPEND_BATCH_SIZE):
+                if is_cancelled():
+                    raise SyncCancelled(f"Processing cancelled by user after adding {nb_clips_processed} of {len(clip_records)} clips to the timeline.")
+                batch = clip_infos[batch_start:batch_start + TIMELINE_APPEND_BATCH_SIZE]
+                timeline_items = media_pool.AppendToTimeline(batch) or []
+                result["nb_append_calls"] += 1
+                nb_timeline_clips += len(timeline_items)
+                if (len(timeline_items) < len(batch)):
+                    print_warning(f"Resolve added {len(timeline_items)} of {len(batch)} clips of camera '{camera_name}' to the timeline '{timeline_name}'")
+                nb_clips_processed += len(batch)
+                on_progress(float(nb_clips_processed) / max(1, len(clip_records)) * 100, f"Building the timeline... ({nb_clips_processed} of {len(clip_records)} clips)")
+
+        result["timelines"].append({"name": timeline_name, "nb_clips": nb_timeline_clips})
+        result["nb_added"] += nb_timeline_clips
+
+    result["elapsed_seconds"] = time.perf_counter() - start_time
+    timeline_names = ", ".join(f"'{timeline['name']}'" for timeline in result["timelines"])
+    print(f"Built {len(result['timelines'])} timelines ({timeline_names}) with {len(camera_names)} camera tracks and {result['nb_added']} clips "
+          f"in {result['elapsed_seconds']:.2f}s ({result['nb_append_calls']} AppendToTimeline calls)")
+    return result
+
+
+# --- Sync plans ---
+
+def make_sync_plan(folder, probe_jobs: list[dict], cameras: dict, zero_creation_time: datetime, settings: SyncSettings, frame_rate) -> dict:
+    # The sync as computed, ready to be applied by apply_sync_plan (see plan.py); the property values before the sync
+    # come from the probe jobs (see CAPTURED_CLIP_PROPERTIES)
+    frame_rate = FrameRate.of(frame_rate)
+    previous_properties_by_clip = {(probe_job["camera_name"], probe_job["file_path"]): probe_job.get("previous_properties", {}) for probe_job in probe_jobs}
+    camera_offsets = {camera_name: camera["offset"].total_frames for camera_name, camera in cameras.items()}
+    sync_plan = new_plan(folder.GetName(), frame_rate, settings.start_time_source.name, settings.camera_property, settings.session_property, zero_creation_time, camera_offsets)
+
+    clip_records, creation_times, start_timecode_strs = compute_start_timecodes(cameras, zero_creation_time, settings, frame_rate)
+    for clip_record, start_timecode_str in zip(clip_records, start_timecode_strs):
+        previous_properties = previous_properties_by_clip.get((clip_record.camera_name, clip_record.file_path), {})
+        add_plan_clip(sync_plan, clip_record.camera_name, clip_record.clip_name, get_file_identity(clip_record.file_path), start_timecode_str, {
+            "start_tc": previous_properties.get("Start TC"),
+            "camera": previous_properties.get(settings.camera_property),
+            "session": previous_properties.get(settings.session_property) if settings.session_property else None,
+        }, clip_record.metadata)
+    return sync_plan
+
+def save_sync_plan(sync_plan: dict, plan_path: str) -> str:
+    elapsed_seconds = save_plan(plan_path, sync_plan)
+    print(f"Sync plan of {len(sync_plan['clips'])} clips saved to '{plan_path}' ({os.path.getsize(plan_path) / 1024:.0f} KB in {elapsed_seconds:.2f}s)")
+    return plan_path
+
+def find_plan_clips(folder, sync_plan: dict, issues: ClipIssues) -> list[tuple[dict, dict]]:
+    # (plan clip, probe job) of the clips of the plan found in the folder, matched on camera and file path
+    camera_names, probe_jobs = enumerate_clips(folder)
+    probe_jobs_by_clip = {(probe_job["camera_name"], probe_job["file_path"]): probe_job for probe_job in probe_jobs}
+    print(f"Sync plan of {sync_plan['created_at']}: {len(sync_plan['clips'])} clips of folder '{sync_plan['folder_name']}'")
+
+    plan_clips = []
+    for plan_clip in iter_plan_clips(sync_plan):
+        probe_job = probe_jobs_by_clip.get((plan_clip["camera_name"], plan_clip["file_path"]))
+        if (probe_job == None):
+            issues.add("error", "plan", plan_clip["file_path"], f"Clip '{plan_clip['clip_name']}' of the sync plan is not in the camera folder '{plan_clip['camera_name']}'")
+            continue
+        plan_clips.append((plan_clip, probe_job))
+    return plan_clips
+
+@trace.traced("phase")
+def apply_sync_plan(folder, sync_plan: dict, settings: SyncSettings, frame_rate, on_progress=no_progress, is_cancelled=not_cancelled, project=None) -> dict:
+    # Writes a sync plan to Resolve without probing: the clips are rebuilt from the plan and go through the same
+    # write-back as run_sync. Clips whose file changed since the plan was made are skipped (and reported).
+    plan_frame_rate = get_plan_frame_rate(sync_plan)
+    if (plan_frame_rate != FrameRate.of(frame_rate)):
+        raise SyncError(f"The sync plan was made for a {plan_frame_rate} fps timeline, the current project is at {frame_rate} fps.")
+    settings = dataclasses.replace(settings, start_time_source=StartTimeSource[sync_plan["start_time_source"]],
+                                   camera_property=sync_plan["camera_property"], session_property=sync_plan["session_property"])
+
+    issues = ClipIssues()
+    cameras = {}
+    for plan_clip, probe_job in find_plan_clips(folder, sync_plan, issues):
+        if (not is_file_unchanged(plan_clip)):
+            issues.add("error", "plan", plan_clip["file_path"], f"Clip '{plan_clip['clip_name']}' changed since the sync plan was made: run the analysis again to sync it")
+            continue
+        add_clip_record(cameras, ClipRecord(probe_job["clip"], probe_job["clip_name"], plan_clip["camera_name"], plan_clip["metadata"], probe_job["previous_properties"]), settings, frame_rate)
+
+    if (len(cameras) == 0):
+        raise SyncError("None of the clips of the sync plan can be applied." + (f"\n\n{issues.summary()}" if len(issues) > 0 else ""))
+
+    for camera_name, camera in cameras.items():
+        camera["offset"] = Timecode.from_total_frames(sync_plan["camera_offsets"][camera_name], frame_rate)
+        print(f"- Camera '{camera_name}': offset {camera['offset']}")
+    zero_creation_time = datetime.fromisoformat(sync_plan["zero_creation_time"])
+
+    previous_clips = None
+    if (settings.incremental):
+        previous_state = load_sync_state(folder)
+        if (previous_state != None and previous_state["camera_property"] == settings.camera_property):
+            previous_clips = previous_state["applied_clips"]
+
+    report = {"issues": issues, "cameras": cameras, "zero_creation_time": zero_creation_time}
+    report.update(write_sync(folder, cameras, zero_creation_time, settings, frame_rate, on_progress, is_cancelled, previous_clips, issues, project))
+    return report
+
+@trace.traced("phase")
+def revert_sync_plan(folder, sync_plan: dict, on_progress=no_progress, is_cancelled=not_cancelled) -> dict:
+    # Puts back the Start TC, camera and session property values the clips had when the plan was made, and forgets the
+    # sync state of the folder. Properties whose previous value is unknown are left as they are.
+    issues = ClipIssues()
+    plan_clips = find_plan_clips(folder, sync_plan, issues)
+    reverted_properties = [("previous_start_tc", "Start TC"), ("previous_camera", sync_plan["camera_property"]), ("previous_session", sync_plan["session_property"])]
+
+    result = {"nb_clips": len(plan_clips), "nb_reverted": 0, "nb_failed": 0, "issues": issues}
+    for nb_clips_processed, (plan_clip, probe_job) in enumerate(plan_clips, start=1):
+        if is_cancelled():
+            raise SyncCancelled(f"Processing cancelled by user after reverting {nb_clips_processed - 1} of {len(plan_clips)} clips.")
+
+        failed_property_names = []
+        for plan_field, property_name in reverted_properties:
+            if (property_name and plan_clip[plan_field] != None):
+                if (probe_job["clip"].SetClipProperty(property_name, plan_clip[plan_field]) == False):
+                    failed_property_names.append(property_name)
+        if (len(failed_property_names) > 0):
+            issues.add("error", "revert", plan_clip["file_path"], f"Resolve did not set {' and '.join(repr(name) for name in failed_property_names)} of clip '{plan_clip['clip_name']}'")
+            result["nb_failed"] += 1
+        else:
+            result["nb_reverted"] += 1
+        on_progress(float(nb_clips_processed) / len(plan_clips) * 100, f"Reverting clips time codes and angles... ({nb_clips_processed} of {len(plan_clips)})")
+
+    sync_state_store = SyncStateStore(get_sync_state_path())
+    try:
+        sync_state_store.delete(get_folder_key(folder))
+    finally:
+        sync_state_store.close()
+    return result
+
+
+def write_sync(folder, cameras: dict, zero_creation_time: datetime, settings: SyncSettings, frame_rate, on_progress=no_progress, is_cancelled=not_cancelled,
+               previous_clips: dict | None = None, issues: ClipIssues | None = None, project=None) -> dict:
+    # The Resolve side of a sync: write-back, sync state, analysis, session property and timeline
+    report = {}
+    report["apply"] = apply_sync(cameras, zero_creation_time, settings, frame_rate, on_progress, is_cancelled, previous_clips, issues)
+    save_sync_state(folder, settings, frame_rate, cameras, zero_creation_time, report["apply"]["applied_clips"])
+
+    report["analysis"] = analyze_recording(cameras, settings, frame_rate)
+    if (settings.session_property):
+        apply_session_property(report["analysis"], settings, on_progress, is_cancelled, issues)
+    report["timeline"] = None
+    if (settings.build_timeline and project != None):
+        report["timeline"] = build_timelines(project, report["analysis"], settings, frame_rate, on_progress, is_cancelled)
+    return report
+
+def run_sync(folder, settings: SyncSettings, frame_rate, on_progress=no_progress, is_cancelled=not_cancelled, project=None) -> dict:
+    # Headless run of the whole pipeline with the camera offsets computed from the settings; the timeline is built when
+    # the project is given. The sync plan is saved before anything is written to Resolve, so that a failed or cancelled
+    # write can be finished with apply_sync_plan without probing again; with settings.plan_only nothing is written.
+    probe_jobs = enumerate_sync_clips(folder, settings)
+    report = analyze_clips(probe_jobs, settings, frame_rate, on_progress, is_cancelled)
+    return finish_sync(folder, probe_jobs, report, settings, frame_rate, on_progress, is_cancelled, project)
+
+def enumerate_sync_clips(folder, settings: SyncSettings, media_pool_snapshot: MediaPoolSnapshot | None = None) -> list[dict]:
+    # the probe jobs of the folder, with the clip properties the sync replaces (reads Resolve unless the snapshot is given)
+    camera_names, probe_jobs = enumerate_clips(folder, get_captured_clip_properties(settings), media_pool_snapshot)
+    return limit_clips_per_camera(probe_jobs, settings.clips_number_limit)
+
+def analyze_clips(probe_jobs: list[dict], settings: SyncSettings, frame_rate, on_progress=no_progress, is_cancelled=not_cancelled,
+                  metadata_cache: MetadataCache | None = None, probe_pool: probe.ProbePool | None = None) -> dict:
+    # probe_clips' report with the cameras, their offsets and the start of the timeline ("cameras" and
+    # "zero_creation_time"); only reads the clip files, never Resolve, so it can run next to a write to Resolve
+    issues = ClipIssues()
+    cameras, report = probe_clips(probe_jobs, settings, frame_rate, on_progress, is_cancelled, issues, metadata_cache=metadata_cache, probe_pool=probe_pool)
+    if (settings.skip_duplicate_clips and len(report["duplicates"]) > 0):
+        cameras = remove_duplicate_clips(cameras, report["duplicates"], settings, frame_rate)
+    report["zero_creation_time"] = compute_offsets(cameras, settings, frame_rate, on_progress, is_cancelled)
+    report["cameras"] = cameras
+    return report
+
+def finish_sync(folder, probe_jobs: list[dict], report: dict, settings: SyncSettings, frame_rate, on_progress=no_progress, is_cancelled=not_cancelled, project=None,
+                plan_path: str | None = None) -> dict:
+    # The sync of an analyze_clips report: the offsets of the previous sync with settings.incremental, the sync plan
+    # (saved to plan_path, settings.plan_file or plan.get_last_plan_path()) and, unless settings.plan_only, write_sync
+    cameras = report["cameras"]
+    zero_creation_time = report["zero_creation_time"]
+    previous_clips = None
+    if (settings.incremental):
+        previous_clips = reconcile_with_previous_sync(cameras, zero_creation_time, load_sync_state(folder), settings, frame_rate)
+
+    for camera_name, camera in cameras.items():
+        print(f"- Camera '{camera_name}': offset {camera['offset']}")
+
+    plan_path = save_sync_plan(make_sync_plan(folder, probe_jobs, cameras, zero_creation_time, settings, frame_rate), plan_path or settings.plan_file or get_last_plan_path())
+    report["plan_file"] = plan_path
+    if (settings.plan_only):
+        return report
+
+    try:
+        report.update(write_sync(folder, cameras, zero_creation_time, settings, frame_rate, on_progress, is_cancelled, previous_clips, report["issues"], project))
+    except SyncError as e:
+        raise type(e)(f"{e}\n\nThe sync plan is saved in '{plan_path}': python -m multicam_sync --apply-plan \"{plan_path}\" finishes the sync without probing again.") from e
+    return report
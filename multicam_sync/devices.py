@@ -0,0 +1,146 @@
+# --- Storage devices ---
+# The clips of a folder are often spread over several physical devices: card readers, a spinning RAID, a NAS mount.
+# A flat pool of probe workers leaves a device idle while the workers wait on another one, or has many workers seeking
+# on the same spinning disk, so probe.probe_clips_parallel groups the files by the device they are on and gives each
+# device its own queue and its own number of concurrent probes (StorageDevices):
+# - SSDs and unknown devices: the probe concurrency,
+# - spinning disks and card readers: a few, they read fastest one file after another,
+# - network shares: more, the time goes into round trips rather than into the device.
+# The device kind is read from /proc/self/mountinfo and /sys on Linux and from GetDriveTypeW on Windows; elsewhere
+# devices are "unknown" unless their concurrency is set with settings.device_concurrency.
+
+import ctypes
+import os
+from dataclasses import dataclass
+
+from .log import print_debug
+
+ROTATIONAL_DEVICE_CONCURRENCY = 2 # one probe reading while the next one starts, without seeking between files
+REMOVABLE_DEVICE_CONCURRENCY = 2 # SD / CFexpress card readers
+NETWORK_DEVICE_CONCURRENCY = 8 # latency-bound: more requests in flight hide the round trips
+
+NETWORK_FILE_SYSTEM_TYPES = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "afpfs", "9p", "ceph", "glusterfs", "fuse.sshfs", "fuse.rclone", "davfs"}
+
+# GetDriveTypeW results
+WINDOWS_DRIVE_REMOVABLE = 2
+WINDOWS_DRIVE_REMOTE = 4
+
+
+@dataclass(frozen=True, slots=True)
+class StorageDevice:
+    device_id: int | str # st_dev of the files on the device
+    mount_point: str
+    kind: str # "ssd", "rotational", "removable", "network" or "unknown"
+
+    def default_concurrency(self, probe_concurrency: int) -> int:
+        if (self.kind == "rotational"):
+            return min(probe_concurrency, ROTATIONAL_DEVICE_CONCURRENCY)
+        if (self.kind == "removable"):
+            return min(probe_concurrency, REMOVABLE_DEVICE_CONCURRENCY)
+        if (self.kind == "network"):
+            return max(probe_concurrency, NETWORK_DEVICE_CONCURRENCY)
+        return probe_concurrency
+
+    def __str__(self) -> str:
+        return f"{self.mount_point} ({self.kind})"
+
+
+def find_mount_point(path: str) -> str:
+    path = os.path.abspath(path)
+    while (not os.path.ismount(path)):
+        parent = os.path.dirname(path)
+        if (parent == path):
+            break
+        path = parent
+    return path
+
+def read_linux_mounts() -> dict:
+    # {mount point: (major, minor, file system type)} from /proc/self/mountinfo
+    mounts = {}
+    try:
+        with open("/proc/self/mountinfo", encoding="utf-8", errors="replace") as file:
+            for line in file:
+                fields = line.split()
+                separator_index = fields.index("-")
+                major, minor = fields[2].split(":")
+                mount_point = fields[4].replace("\\040", " ")
+                mounts[mount_point] = (int(major), int(minor), fields[separator_index + 1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return mounts
+
+def read_linux_block_flag(major: int, minor: int, name: str) -> bool | None:
+    # queue/rotational or removable of a block device; a partition has them on its parent disk
+    block_path = f"/sys/dev/block/{major}:{minor}"
+    for flag_path in (os.path.join(block_path, name), os.path.join(block_path, "..", name)):
+        try:
+            with open(flag_path) as file:
+                return file.read().strip() == "1"
+        except OSError:
+            continue
+    return None
+
+def get_linux_device_kind(mount_point: str, linux_mounts: dict) -> str:
+    if (mount_point not in linux_mounts):
+        return "unknown"
+    major, minor, file_system_type = linux_mounts[mount_point]
+    if (file_system_type in NETWORK_FILE_SYSTEM_TYPES):
+        return "network"
+    if (read_linux_block_flag(major, minor, "removable")):
+        return "removable"
+    rotational = read_linux_block_flag(major, minor, "queue/rotational")
+    if (rotational == None):
+        return "unknown"
+    return "rotational" if rotational else "ssd"
+
+def get_windows_device_kind(mount_point: str) -> str:
+    if (mount_point.startswith("\\\\")):
+        return "network"
+    try:
+        drive_type = ctypes.windll.kernel32.GetDriveTypeW(ctypes.c_wchar_p(mount_point))
+    except (AttributeError, OSError):
+        return "unknown"
+    if (drive_type == WINDOWS_DRIVE_REMOTE):
+        return "network"
+    if (drive_type == WINDOWS_DRIVE_REMOVABLE):
+        return "removable"
+    return "unknown" # fixed drives do not tell whether they spin
+
+
+class StorageDevices:
+    # the device of each file, with one lookup per device rather than per file
+    def __init__(self, device_concurrency: dict | None = None, probe_concurrency: int = 4):
+        # device_concurrency: {mount point: number of concurrent probes}, overriding the default of the device kind
+        self.device_concurrency = {os.path.normcase(os.path.abspath(mount_point)): concurrency for mount_point, concurrency in (device_concurrency or {}).items()}
+        self.probe_concurrency = max(1, probe_concurrency)
+        self.devices = {}
+        self.linux_mounts = read_linux_mounts() if os.path.exists("/proc/self/mountinfo") else {}
+
+    def get_device(self, file_path: str) -> StorageDevice:
+        try:
+            device_id = os.stat(file_path).st_dev
+        except OSError:
+            try:
+                device_id = os.stat(os.path.dirname(file_path) or ".").st_dev
+            except OSError:
+                device_id = "unreadable"
+        device = self.devices.get(device_id)
+        if (device == None):
+            device = self.devices[device_id] = self.describe_device(device_id, file_path)
+        return device
+
+    def describe_device(self, device_id, file_path: str) -> StorageDevice:
+        if (device_id == "unreadable"):
+            return StorageDevice(device_id, "?", "unknown")
+        mount_point = find_mount_point(file_path)
+        if (os.name == "nt"):
+            kind = get_windows_device_kind(mount_point)
+        else:
+            kind = get_linux_device_kind(mount_point, self.linux_mounts)
+        device = StorageDevice(device_id, mount_point, kind)
+        print_debug(f"Storage device of '{file_path}': {device}, {self.get_concurrency(device)} concurrent probes")
+        return device
+
+    def get_concurrency(self, device: StorageDevice) -> int:
+        concurrency = self.device_concurrency.get(os.path.normcase(device.mount_point))
+        return max(1, concurrency) if concurrency != None else device.default_concurrency(self.probe_concurrency)
@@ -0,0 +1,90 @@
+# --- Sampled content fingerprints ---
+# A fingerprint identifies the content of a clip file without reading all of it: the file size and a hash of a few
+# blocks (head, middle, tail) read through a memory map. Two copies of a clip (a card imported into two camera folders,
+# or imported twice) have the same fingerprint wherever they are, so probe_clips uses it to report duplicate clips,
+# and the metadata cache uses it to find the metadata of a file that was moved or copied since it was probed.
+# Camera files of the same size differ in their header (creation time, clip name) and in their samples, so sampling is
+# enough to tell them apart; it is not a guarantee against files crafted to collide.
+
+import hashlib
+import mmap
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .log import print_debug
+
+FINGERPRINT_BLOCK_SIZE = 64 * 1024
+FINGERPRINT_BATCH_SIZE = 32 # files per worker task
+FINGERPRINT_VERSION = 1 # part of the fingerprint, so that fingerprints computed differently never match
+
+
+def compute_fingerprint(file_path: str) -> str:
+    # "<version>:<size>:<hash>"; raises OSError when the file cannot be read
+    with open(file_path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        hasher = hashlib.blake2b(digest_size=16)
+        if (size <= 3 * FINGERPRINT_BLOCK_SIZE):
+            hasher.update(file.read())
+        else:
+            sample_offsets = (0, (size // 2) - (FINGERPRINT_BLOCK_SIZE // 2), size - FINGERPRINT_BLOCK_SIZE)
+            try:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+                    for offset in sample_offsets:
+                        hasher.update(mapped_file[offset:offset + FINGERPRINT_BLOCK_SIZE])
+            except (ValueError, OSError):
+                # some network file systems cannot be memory-mapped
+                for offset in sample_offsets:
+                    file.seek(offset)
+                    hasher.update(file.read(FINGERPRINT_BLOCK_SIZE))
+    return f"{FINGERPRINT_VERSION}:{size}:{hasher.hexdigest()}"
+
+def compute_fingerprints(file_paths: list[str]) -> dict:
+    fingerprints = {}
+    for file_path in file_paths:
+        try:
+            fingerprints[file_path] = compute_fingerprint(file_path)
+        except OSError as e:
+            print_debug(f"Cannot fingerprint '{file_path}': {e}")
+    return fingerprints
+
+def compute_fingerprints_parallel(file_paths: list[str], concurrency: int, on_progress, is_cancelled, executor: ThreadPoolExecutor | None = None) -> dict:
+    # {file_path: fingerprint} of the files that could be read (a file that cannot be read is probed and reported as
+    # usual, it only has no fingerprint). The files go to the workers in batches of FINGERPRINT_BATCH_SIZE: a
+    # fingerprint takes a few reads, less than handing a single file to a worker. on_progress(nb_done, files_per_second)
+    # and is_cancelled() are called from the calling thread only. The workers are those of `executor` when given (e.g.
+    # the probe pool of a batch), otherwise they are started for this run.
+    fingerprints = {}
+    nb_done = 0
+    start_time = time.perf_counter()
+    concurrency = max(1, concurrency)
+    batches = [file_paths[index:index + FINGERPRINT_BATCH_SIZE] for index in range(0, len(file_paths), FINGERPRINT_BATCH_SIZE)]
+    owns_executor = executor == None
+    if owns_executor:
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fingerprint")
+    futures = {}
+    try:
+        next_batch_index = 0
+        while (next_batch_index < len(batches) or len(futures) > 0):
+            if is_cancelled():
+                break
+
+            while (next_batch_index < len(batches) and len(futures) < concurrency * 2):
+                futures[executor.submit(compute_fingerprints, batches[next_batch_index])] = len(batches[next_batch_index])
+                next_batch_index += 1
+
+            done, _ = wait(futures, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                nb_done += futures.pop(future)
+                fingerprints.update(future.result())
+
+            elapsed_seconds = time.perf_counter() - start_time
+            on_progress(nb_done, nb_done / elapsed_seconds if elapsed_seconds > 0 else 0.0)
+    finally:
+        if owns_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            for future in futures:
+                future.cancel()
+            wait(futures)
+    return fingerprints
@@ -0,0 +1,59 @@
+# --- Per-clip problems ---
+# A clip that cannot be probed or written is not reported on its own (a message box per bad file would stop a long run
+# at every one of them): it is added to a ClipIssues report, printed to the console as it happens, skipped, and the
+# report is shown once at the end of the run.
+
+import os
+from dataclasses import dataclass
+
+from .log import print_error, print_warning
+
+SUMMARY_MAX_ISSUES = 10 # issues listed in the end of run summary, the rest are only in the console
+
+
+@dataclass(frozen=True, slots=True)
+class ClipIssue:
+    level: str # "error" (the clip is skipped) or "warning"
+    stage: str # "sidecar", "probe", "quarantine" (skipped: failed on a previous run), "duplicate" or "apply"
+    file_path: str
+    message: str
+    quarantine: bool = False # the file itself is unreadable: it is not probed again until it changes
+
+
+class ClipIssues:
+    def __init__(self):
+        self.issues = [] # list.append is thread-safe: issues are added from the probe workers
+
+    def add(self, level: str, stage: str, file_path: str, message: str, quarantine: bool = False) -> None:
+        self.issues.append(ClipIssue(level, stage, file_path, message, quarantine))
+        print_issue = print_error if level == "error" else print_warning
+        print_issue(message, show=False)
+
+    def __len__(self) -> int:
+        return len(self.issues)
+
+    @property
+    def errors(self) -> list[ClipIssue]:
+        return [issue for issue in self.issues if issue.level == "error"]
+
+    @property
+    def warnings(self) -> list[ClipIssue]:
+        return [issue for issue in self.issues if issue.level == "warning"]
+
+    def quarantined_files(self) -> dict:
+        # {file_path: reason} of the files to quarantine
+        return {issue.file_path: issue.message.splitlines()[0] for issue in self.issues if issue.quarantine}
+
+    def summary(self, max_issues: int = SUMMARY_MAX_ISSUES) -> str | None:
+        # None when there is nothing to report
+        if (len(self.issues) == 0):
+            return None
+
+        nb_skipped_files = len({issue.file_path for issue in self.errors})
+        lines = [f"{nb_skipped_files} clips skipped, {len(self.warnings)} warnings:"]
+        for issue in self.issues[:max_issues]:
+            message = issue.message.splitlines()[0] if issue.message else ""
+            lines.append(f"- [{issue.stage}] {os.path.basename(issue.file_path)}: {message[:200]}")
+        if (len(self.issues) > max_issues):
+            lines.append(f"... and {len(self.issues) - max_issues} more (see the console)")
+        return "\n".join(lines)
@@ -0,0 +1,55 @@
+# --- Console messages ---
+# Everything is printed to the console. When a UI is running it registers a message handler
+# (message boxes) with set_message_handler(); headless runs only get the console output.
+# show=False keeps a message in the console, e.g. for per-clip problems that are reported at the end (see issues.py).
+
+debug: bool = False
+message_handler = None # callable(level: str, message: str) -> None
+
+
+def set_debug(enabled: bool) -> None:
+    global debug
+    debug = enabled
+
+
+def is_debug() -> bool:
+    # guard for debug messages that are costly to build (e.g. calling Resolve)
+    return debug
+
+
+def set_message_handler(handler) -> None:
+    global message_handler
+    message_handler = handler
+
+
+def show_message(level: str, message) -> None:
+    if (message_handler != None):
+        message_handler(level, str(message))
+
+
+def print_error(message, show: bool = True) -> None:
+    print(f"❌ [ERROR] {message}")
+    if (show):
+        show_message("error", message)
+    
+def print_info(message) -> None:
+    print(f"ℹ️ [INFO ] {message}")
+    show_message("info", message)
+    
+def print_warning(message, show: bool = True):
+    print(f"⚠️ [WARN ] {message}")    
+    if (show):
+        show_message("warning", message)
+    
+def print_debug(message):
+    if (debug):
+        print(f"🧪 [DEBUG] {message}")
+    
+def print_trace(message):
+    #print(f"🔍 [TRACE] {message}")    
+    pass
+    
+def print_question(message):
+    print(f"❓")
+    print(f"❓{message}")
+    print(f"❓")
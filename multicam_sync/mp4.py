@@ -0,0 +1,265 @@
+# --- Native MP4/MOV header reader ---
+# Reads only the ISO-BMFF boxes the sync needs (moov/mvhd and, per track, tkhd, mdhd, hdlr, stsd and stts)
+# from a memory-mapped file and returns the same subset of the `ffprobe -show_format -show_streams` JSON
+# that the sync reads, so a clip can be probed with a few page reads instead of an ffprobe process.
+# Anything that cannot be parsed raises Mp4ParseError so the caller can fall back to ffprobe.
+
+import mmap
+import os
+import struct
+from collections import Counter
+from datetime import datetime, timezone
+from fractions import Fraction
+
+SUPPORTED_EXTENSIONS = (".mp4", ".mov", ".m4v", ".3gp")
+
+# seconds between the ISO-BMFF epoch (1904-01-01) and the Unix epoch (1970-01-01)
+MP4_EPOCH_OFFSET = 2082844800
+
+VIDEO_CODECS = {
+    b"avc1": ("h264", "H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10"),
+    b"avc3": ("h264", "H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10"),
+    b"hvc1": ("hevc", "H.265 / HEVC (High Efficiency Video Coding)"),
+    b"hev1": ("hevc", "H.265 / HEVC (High Efficiency Video Coding)"),
+    b"mp4v": ("mpeg4", "MPEG-4 part 2"),
+    b"av01": ("av1", "Alliance for Open Media AV1"),
+    b"apch": ("prores", "Apple ProRes (iCodec Pro)"),
+    b"apcn": ("prores", "Apple ProRes (iCodec Pro)"),
+    b"apcs": ("prores", "Apple ProRes (iCodec Pro)"),
+    b"apco": ("prores", "Apple ProRes (iCodec Pro)"),
+    b"ap4h": ("prores", "Apple ProRes (iCodec Pro)"),
+    b"ap4x": ("prores", "Apple ProRes (iCodec Pro)"),
+    b"mjpa": ("mjpeg", "Motion JPEG"),
+    b"jpeg": ("mjpeg", "Motion JPEG"),
+}
+
+AUDIO_CODECS = {
+    b"mp4a": ("aac", "AAC (Advanced Audio Coding)"),
+    b"lpcm": ("pcm_s16le", "PCM signed 16-bit little-endian"),
+    b"sowt": ("pcm_s16le", "PCM signed 16-bit little-endian"),
+    b"twos": ("pcm_s16be", "PCM signed 16-bit big-endian"),
+    b"in24": ("pcm_s24be", "PCM signed 24-bit big-endian"),
+}
+
+HANDLER_CODEC_TYPES = {
+    b"vide": "video",
+    b"soun": "audio",
+    b"tmcd": "data",
+    b"meta": "data",
+    b"text": "subtitle",
+    b"sbtl": "subtitle",
+}
+
+
+class Mp4ParseError(ValueError):
+    pass
+
+
+def is_supported_file(file_path) -> bool:
+    return os.path.splitext(str(file_path))[1].lower() in SUPPORTED_EXTENSIONS
+
+
+def iter_boxes(data, start: int, end: int):
+    # yields (box_type, payload_start, box_end) for each box in data[start:end]
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header_size = 8
+        if (size == 1):
+            if (offset + 16 > end):
+                raise Mp4ParseError(f"Truncated '{box_type.decode('latin-1')}' box header at offset {offset}")
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header_size = 16
+        elif (size == 0):
+            size = end - offset
+
+        if (size < header_size or offset + size > end):
+            raise Mp4ParseError(f"Invalid '{box_type.decode('latin-1')}' box size {size} at offset {offset}")
+
+        yield box_type, offset + header_size, offset + size
+        offset += size
+
+
+def find_box(data, start: int, end: int, box_type: bytes) -> tuple[int, int]:
+    for child_type, child_start, child_end in iter_boxes(data, start, end):
+        if (child_type == box_type):
+            return child_start, child_end
+    raise Mp4ParseError(f"Box '{box_type.decode('latin-1')}' not found")
+
+
+def find_box_path(data, start: int, end: int, *box_types: bytes) -> tuple[int, int]:
+    for box_type in box_types:
+        start, end = find_box(data, start, end, box_type)
+    return start, end
+
+
+def read_header_times(data, start: int) -> tuple[int, int, int]:
+    # mvhd and mdhd share the same leading fields: (creation_time, timescale, duration)
+    version = data[start]
+    if (version == 1):
+        creation_time, _, timescale, duration = struct.unpack_from(">QQIQ", data, start + 4)
+    else:
+        creation_time, _, timescale, duration = struct.unpack_from(">IIII", data, start + 4)
+    return creation_time, timescale, duration
+
+
+def mp4_time_to_datetime(value: int) -> datetime:
+    # Same rule as ffmpeg: some muxers write Unix timestamps instead of 1904-based ones
+    if (value >= MP4_EPOCH_OFFSET):
+        value -= MP4_EPOCH_OFFSET
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+def format_creation_time(value: datetime) -> str:
+    # same format as the ffprobe creation_time tag
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def format_fraction(value: Fraction) -> str:
+    return f"{value.numerator}/{value.denominator}"
+
+
+def read_track_dimensions(data, tkhd_start: int) -> tuple[int, int]:
+    version = data[tkhd_start]
+    # version/flags + times/track id/duration + reserved, layer, alternate group, volume, reserved + matrix
+    offset = tkhd_start + 4 + (32 if version == 1 else 20) + 16 + 36
+    width, height = struct.unpack_from(">II", data, offset)
+    return width >> 16, height >> 16
+
+
+def read_sample_description(data, stsd_start: int, stsd_end: int) -> tuple[bytes, int, int]:
+    entry_count = struct.unpack_from(">I", data, stsd_start + 4)[0]
+    if (entry_count == 0):
+        raise Mp4ParseError("Empty 'stsd' box")
+
+    entry_start = stsd_start + 8
+    entry_size, entry_format = struct.unpack_from(">I4s", data, entry_start)
+    if (entry_size < 8 or entry_start + entry_size > stsd_end):
+        raise Mp4ParseError(f"Invalid sample description size {entry_size}")
+
+    width = height = 0
+    if (entry_size >= 36):
+        # visual sample entry: reserved(6), data reference index(2), pre-defined/reserved(16), width(2), height(2)
+        width, height = struct.unpack_from(">HH", data, entry_start + 32)
+    return entry_format, width, height
+
+
+def read_time_to_sample(data, stts_start: int, stts_end: int) -> tuple[int, int, int]:
+    # returns (number of samples, total duration, most common sample delta)
+    entry_count = struct.unpack_from(">I", data, stts_start + 4)[0]
+    entries_start = stts_start + 8
+    if (entries_start + entry_count * 8 > stts_end):
+        raise Mp4ParseError(f"Truncated 'stts' box ({entry_count} entries)")
+
+    nb_samples = 0
+    total_duration = 0
+    deltas = Counter()
+    for sample_count, sample_delta in struct.iter_unpack(">II", data[entries_start:entries_start + entry_count * 8]):
+        nb_samples += sample_count
+        total_duration += sample_count * sample_delta
+        deltas[sample_delta] += sample_count
+
+    if (nb_samples == 0):
+        raise Mp4ParseError("Track has no samples")
+    return nb_samples, total_duration, deltas.most_common(1)[0][0]
+
+
+def read_track(data, trak_start: int, trak_end: int, index: int) -> dict:
+    tkhd_start, _ = find_box(data, trak_start, trak_end, b"tkhd")
+    mdia_start, mdia_end = find_box(data, trak_start, trak_end, b"mdia")
+    mdhd_start, _ = find_box(data, mdia_start, mdia_end, b"mdhd")
+    hdlr_start, _ = find_box(data, mdia_start, mdia_end, b"hdlr")
+
+    handler_type = bytes(data[hdlr_start + 8:hdlr_start + 12])
+    _, timescale, duration = read_header_times(data, mdhd_start)
+    codec_type = HANDLER_CODEC_TYPES.get(handler_type, "data")
+
+    stream = {
+        "index": index,
+        "codec_type": codec_type,
+        "time_base": f"1/{timescale}",
+    }
+    if (timescale > 0):
+        stream["duration"] = f"{duration / timescale:.6f}"
+
+    if (codec_type not in ("video", "audio")):
+        return stream
+
+    stbl_start, stbl_end = find_box_path(data, mdia_start, mdia_end, b"minf", b"stbl")
+    stsd_start, stsd_end = find_box(data, stbl_start, stbl_end, b"stsd")
+    entry_format, width, height = read_sample_description(data, stsd_start, stsd_end)
+    stream["codec_tag_string"] = entry_format.decode("latin-1")
+
+    if (codec_type == "audio"):
+        codec_name, codec_long_name = AUDIO_CODECS.get(entry_format, (stream["codec_tag_string"].strip().lower(), ""))
+        stream["codec_name"] = codec_name
+        stream["codec_long_name"] = codec_long_name
+        return stream
+
+    if (entry_format not in VIDEO_CODECS):
+        raise Mp4ParseError(f"Unsupported video codec '{stream['codec_tag_string']}'")
+    if (timescale == 0):
+        raise Mp4ParseError("Video track has no timescale")
+
+    stts_start, stts_end = find_box(data, stbl_start, stbl_end, b"stts")
+    nb_frames, total_duration, frame_delta = read_time_to_sample(data, stts_start, stts_end)
+
+    if (width == 0 or height == 0):
+        width, height = read_track_dimensions(data, tkhd_start)
+
+    codec_name, codec_long_name = VIDEO_CODECS[entry_format]
+    stream.update({
+        "codec_name": codec_name,
+        "codec_long_name": codec_long_name,
+        "width": width,
+        "height": height,
+        "r_frame_rate": format_fraction(Fraction(timescale, frame_delta)),
+        "avg_frame_rate": format_fraction(Fraction(nb_frames * timescale, total_duration)) if total_duration > 0 else "0/0",
+        "nb_frames": str(nb_frames),
+    })
+    return stream
+
+
+def parse_mp4(data, file_size: int, file_path) -> dict:
+    moov_start, moov_end = find_box(data, 0, file_size, b"moov")
+    mvhd_start, _ = find_box(data, moov_start, moov_end, b"mvhd")
+    creation_time, timescale, duration = read_header_times(data, mvhd_start)
+
+    if (creation_time == 0):
+        raise Mp4ParseError("Movie header has no creation time")
+    if (timescale == 0 or duration == 0):
+        raise Mp4ParseError("Movie header has no duration (fragmented file?)")
+
+    streams = []
+    for box_type, trak_start, trak_end in iter_boxes(data, moov_start, moov_end):
+        if (box_type == b"trak"):
+            streams.append(read_track(data, trak_start, trak_end, len(streams)))
+
+    return {
+        "streams": streams,
+        "format": {
+            "filename": str(file_path),
+            "nb_streams": len(streams),
+            "format_name": "mov,mp4,m4a,3gp,3g2,mj2",
+            "duration": f"{duration / timescale:.6f}",
+            "size": str(file_size),
+            "tags": {
+                "creation_time": format_creation_time(mp4_time_to_datetime(creation_time)),
+            },
+        },
+    }
+
+
+def probe_mp4(file_path) -> dict:
+    try:
+        with open(file_path, "rb") as file:
+            file_size = os.fstat(file.fileno()).st_size
+            if (file_size < 8):
+                raise Mp4ParseError(f"File is too small ({file_size} bytes)")
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return parse_mp4(data, file_size, file_path)
+    except (OSError, ValueError, struct.error) as e:
+        if isinstance(e, Mp4ParseError):
+            raise
+        raise Mp4ParseError(f"Could not read '{file_path}': {e}") from e
@@ -0,0 +1,134 @@
+# --- Overlap index and recording sessions ---
+# Works on clip intervals [start, end) in timeline frames, once the start timecodes are known.
+# OverlapIndex keeps the intervals of each camera sorted by start with the running maximum of their ends, so finding
+# the clips of a camera that overlap a range is two binary searches plus the matches (O(log n + k)), and all the
+# cross-camera overlapping pairs come from one sweep over the sorted intervals (O(n log n + k)).
+# A recording session ends where every camera has a gap longer than the session gap, i.e. where the union of all the
+# clips has a hole that long.
+
+import bisect
+import heapq
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True, slots=True)
+class ClipInterval:
+    start: int # first frame on the timeline
+    end: int # frame after the last one
+    camera_name: str
+    clip_index: int # position of the clip in the list given to OverlapIndex
+
+
+@dataclass(slots=True)
+class Session:
+    index: int # 1-based
+    start: int
+    end: int
+    clip_indexes: list[int] = field(default_factory=list)
+    nb_clips_per_camera: dict = field(default_factory=dict)
+
+
+def merge_intervals(intervals: list[ClipInterval]) -> list[tuple[int, int]]:
+    # union of intervals sorted by start, as (start, end) ranges
+    merged = []
+    for interval in intervals:
+        if (len(merged) > 0 and interval.start <= merged[-1][1]):
+            if (interval.end > merged[-1][1]):
+                merged[-1] = (merged[-1][0], interval.end)
+        else:
+            merged.append((interval.start, interval.end))
+    return merged
+
+
+class OverlapIndex:
+    def __init__(self, intervals: list[ClipInterval]):
+        self.intervals = sorted(intervals, key=lambda interval: (interval.start, interval.end))
+        self.intervals_by_camera = {}
+        for interval in self.intervals:
+            self.intervals_by_camera.setdefault(interval.camera_name, []).append(interval)
+
+        self.starts_by_camera = {}
+        self.max_ends_by_camera = {}
+        for camera_name, camera_intervals in self.intervals_by_camera.items():
+            self.starts_by_camera[camera_name] = [interval.start for interval in camera_intervals]
+            max_ends = []
+            max_end = None
+            for interval in camera_intervals:
+                max_end = interval.end if max_end == None else max(max_end, interval.end)
+                max_ends.append(max_end)
+            self.max_ends_by_camera[camera_name] = max_ends
+
+    @property
+    def camera_names(self) -> list[str]:
+        return list(self.intervals_by_camera)
+
+    def overlapping(self, start: int, end: int, camera_name: str | None = None) -> list[ClipInterval]:
+        # clips overlapping [start, end), of one camera or of all of them
+        camera_names = [camera_name] if camera_name != None else self.camera_names
+        result = []
+        for name in camera_names:
+            if (name not in self.intervals_by_camera):
+                continue
+            # candidates start before `end`; the ones before `first` all end at or before `start`
+            last = bisect.bisect_left(self.starts_by_camera[name], end)
+            first = bisect.bisect_right(self.max_ends_by_camera[name], start)
+            result.extend(interval for interval in self.intervals_by_camera[name][first:last] if interval.end > start)
+        return result
+
+    def cross_camera_overlaps(self) -> list[tuple[ClipInterval, ClipInterval, int]]:
+        # every pair of clips of different cameras that overlap, with the length of the overlap in frames
+        pairs = []
+        active = [] # heap of (end, position, interval) of the clips containing the sweep position
+        for position, interval in enumerate(self.intervals):
+            while (len(active) > 0 and active[0][0] <= interval.start):
+                heapq.heappop(active)
+            for _, _, other in active:
+                if (other.camera_name != interval.camera_name):
+                    pairs.append((other, interval, min(other.end, interval.end) - interval.start))
+            heapq.heappush(active, (interval.end, position, interval))
+        return pairs
+
+    def count_cross_camera_overlaps(self) -> int:
+        # number of pairs cross_camera_overlaps() would return, without building them
+        nb_pairs = 0
+        active = [] # heap of (end, camera name)
+        nb_active_per_camera = {}
+        for interval in self.intervals:
+            while (len(active) > 0 and active[0][0] <= interval.start):
+                _, camera_name = heapq.heappop(active)
+                nb_active_per_camera[camera_name] -= 1
+            nb_pairs += len(active) - nb_active_per_camera.get(interval.camera_name, 0)
+            heapq.heappush(active, (interval.end, interval.camera_name))
+            nb_active_per_camera[interval.camera_name] = nb_active_per_camera.get(interval.camera_name, 0) + 1
+        return nb_pairs
+
+    def overlaps_other_camera(self, interval: ClipInterval) -> bool:
+        # the first candidate of a camera (see overlapping) ends after interval.start, so any candidate is an overlap
+        for camera_name in self.intervals_by_camera:
+            if (camera_name == interval.camera_name):
+                continue
+            last = bisect.bisect_left(self.starts_by_camera[camera_name], interval.end)
+            first = bisect.bisect_right(self.max_ends_by_camera[camera_name], interval.start)
+            if (first < last):
+                return True
+        return False
+
+    def coverage_gaps(self, camera_name: str, min_gap: int = 0) -> list[tuple[int, int]]:
+        # (start, end) of the holes between the clips of a camera longer than min_gap frames
+        merged = merge_intervals(self.intervals_by_camera.get(camera_name, []))
+        return [(previous_end, next_start) for (_, previous_end), (next_start, _) in zip(merged, merged[1:]) if next_start - previous_end > min_gap]
+
+    def covered_frames(self, camera_name: str) -> int:
+        return sum(end - start for start, end in merge_intervals(self.intervals_by_camera.get(camera_name, [])))
+
+    def sessions(self, min_gap: int) -> list[Session]:
+        # splits the timeline where no camera records for more than min_gap frames
+        sessions = []
+        for interval in self.intervals:
+            if (len(sessions) == 0 or interval.start - sessions[-1].end > min_gap):
+                sessions.append(Session(len(sessions) + 1, interval.start, interval.end))
+            session = sessions[-1]
+            session.end = max(session.end, interval.end)
+            session.clip_indexes.append(interval.clip_index)
+            session.nb_clips_per_camera[interval.camera_name] = session.nb_clips_per_camera.get(interval.camera_name, 0) + 1
+        return sessions
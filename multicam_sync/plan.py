@@ -0,0 +1,123 @@
+# --- Sync plan files ---
+# The outcome of the analysis (probe + camera offsets) as a file, so that writing it to Resolve is a separate step: it
+# can run later, again after a failed or cancelled write, or on another workstation (a plan made with --local on the
+# machine holding the footage applies to a Resolve folder with the same camera subfolders and file paths).
+# For each clip a plan holds the file it was computed from (size and modification time), the clip metadata, the
+# computed start timecode and the values the written properties had before, so that a revert can put them back.
+# Format: JSON, gzip-compressed when the file name ends with .gz; the clips are rows under "clip_fields" so that the
+# field names are not repeated for every clip.
+
+import gzip
+import json
+import os
+import re
+import time
+import zlib
+from datetime import datetime
+
+from .cache import get_metadata_cache_path
+from .clip_store import ClipMetadata
+from .timecode import FrameRate
+
+PLAN_FORMAT = "multicam_sync.plan"
+PLAN_VERSION = 1
+
+# the first fields of a clip row; the ClipMetadata fields follow
+PLAN_CLIP_FIELDS = ("camera_name", "clip_name", "file_size", "mtime_ns", "start_tc", "previous_start_tc", "previous_camera", "previous_session")
+PLAN_METADATA_FIELDS = ClipMetadata.__slots__
+
+# memory cards (FAT/exFAT) store modification times with a 2 s resolution, and network shares may round them
+PLAN_MTIME_TOLERANCE_NS = 2000000000
+
+
+class PlanError(Exception):
+    pass
+
+
+def get_last_plan_path(folder_path: str | None = None) -> str:
+    # where a sync run saves its plan when no plan file is given; a batch run (see batch.py) saves one per folder
+    if (folder_path == None):
+        return os.path.join(os.path.dirname(get_metadata_cache_path()), "last_sync_plan.json.gz")
+    file_name_part = re.sub(r"[^\w.-]+", "_", folder_path.strip("/\\")).strip("_") or "root"
+    return os.path.join(os.path.dirname(get_metadata_cache_path()), f"last_sync_plan - {file_name_part}.json.gz")
+
+def new_plan(folder_name: str, frame_rate: FrameRate, start_time_source: str, camera_property: str, session_property: str,
+             zero_creation_time: datetime, camera_offsets: dict) -> dict:
+    # camera_offsets is {camera_name: offset in frames}; clips are added with add_plan_clip
+    return {
+        "format": PLAN_FORMAT,
+        "version": PLAN_VERSION,
+        "created_at": datetime.now().astimezone().isoformat(timespec="seconds"),
+        "folder_name": folder_name,
+        "frame_rate": f"{frame_rate.rate.numerator}/{frame_rate.rate.denominator}",
+        "drop_frame": frame_rate.drop_frame,
+        "start_time_source": start_time_source,
+        "camera_property": camera_property,
+        "session_property": session_property,
+        "zero_creation_time": zero_creation_time.isoformat(),
+        "camera_offsets": camera_offsets,
+        "clip_fields": [*PLAN_CLIP_FIELDS, *PLAN_METADATA_FIELDS],
+        "clips": [],
+    }
+
+def add_plan_clip(plan: dict, camera_name: str, clip_name: str, file_identity: tuple | None, start_tc: str, previous_properties: dict, clip_metadata: ClipMetadata) -> None:
+    # file_identity: cache.get_file_identity() of the clip file (None when it cannot be read: the clip is never
+    # considered changed); previous_properties: {"start_tc", "camera", "session"} values before the sync, None when unknown
+    metadata = clip_metadata.to_dict()
+    plan["clips"].append([
+        camera_name, clip_name, file_identity[0] if file_identity != None else None, file_identity[1] if file_identity != None else None, start_tc,
+        previous_properties.get("start_tc"), previous_properties.get("camera"), previous_properties.get("session"),
+        *[metadata[field] for field in PLAN_METADATA_FIELDS],
+    ])
+
+def get_plan_frame_rate(plan: dict) -> FrameRate:
+    return FrameRate(plan["frame_rate"], plan["drop_frame"])
+
+def iter_plan_clips(plan: dict):
+    # the clips as dicts of the clip fields, "metadata" being the ClipMetadata
+    clip_fields = plan["clip_fields"]
+    for row in plan["clips"]:
+        plan_clip = dict(zip(clip_fields, row))
+        plan_clip["metadata"] = ClipMetadata.from_dict(plan_clip)
+        yield plan_clip
+
+def is_file_unchanged(plan_clip: dict) -> bool:
+    # same size and (about) the same modification time as when the plan was made
+    try:
+        stat = os.stat(plan_clip["file_path"])
+    except OSError:
+        return False
+    if (plan_clip["file_size"] != None and stat.st_size != plan_clip["file_size"]):
+        return False
+    return plan_clip["mtime_ns"] == None or abs(stat.st_mtime_ns - plan_clip["mtime_ns"]) <= PLAN_MTIME_TOLERANCE_NS
+
+
+def save_plan(plan_path: str, plan: dict) -> float:
+    # written to a temporary file first, so that an interrupted save never leaves a truncated plan; returns the seconds taken
+    start_time = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(plan_path))
+    os.makedirs(directory, exist_ok=True)
+    temporary_path = f"{plan_path}.tmp"
+    data = json.dumps(plan, separators=(",", ":")).encode("utf-8")
+    if (plan_path.endswith(".gz")):
+        data = gzip.compress(data, compresslevel=5)
+    with open(temporary_path, "wb") as file:
+        file.write(data)
+    os.replace(temporary_path, plan_path)
+    return time.perf_counter() - start_time
+
+def load_plan(plan_path: str) -> dict:
+    try:
+        with open(plan_path, "rb") as file:
+            data = file.read()
+        if (data[:2] == b"\x1f\x8b"):
+            data = gzip.decompress(data)
+        plan = json.loads(data)
+    except (OSError, EOFError, ValueError, zlib.error) as e:
+        raise PlanError(f"Cannot read the sync plan '{plan_path}': {e}") from e
+
+    if (not isinstance(plan, dict) or plan.get("format") != PLAN_FORMAT):
+        raise PlanError(f"'{plan_path}' is not a sync plan.")
+    if (plan.get("version") != PLAN_VERSION):
+        raise PlanError(f"The sync plan '{plan_path}' has version {plan.get('version')}, this version of the script reads version {PLAN_VERSION}. Run the analysis again.")
+    return plan
@@ -0,0 +1,390 @@
+import collections
+import json
+import os
+import socket
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from . import mp4, trace
+from .clip_store import ClipMetadata
+from .devices import StorageDevice, StorageDevices
+from .log import is_debug, print_debug, print_error, print_warning
+
+
+class ProbeError(Exception):
+    def __init__(self, message: str, is_file_error: bool = False):
+        super().__init__(message)
+        self.is_file_error = is_file_error # the file itself cannot be read (vs. e.g. ffprobe missing): it is quarantined
+
+class ProbeTimeout(ProbeError):
+    def __init__(self, message: str):
+        super().__init__(message, is_file_error=True)
+
+# ffprobe timeout: ffprobe may have to seek far into large files (e.g. to a moov atom at the end) on slow storage,
+# so the timeout grows with the file size, and doubles on each retry after a timeout
+PROBE_TIMEOUT_SECONDS = 10
+PROBE_TIMEOUT_SECONDS_PER_GB = 5
+PROBE_MAX_TIMEOUT_SECONDS = 120
+PROBE_RETRIES = 2
+
+# ffprobe processes currently running, so that they can be killed when the user cancels
+active_probe_processes = set()
+active_probe_processes_lock = threading.Lock()
+
+def get_probe_timeout(file_path, attempt: int = 0) -> float:
+    try:
+        size_bytes = os.path.getsize(file_path)
+    except OSError:
+        size_bytes = 0
+    return min(PROBE_MAX_TIMEOUT_SECONDS, (PROBE_TIMEOUT_SECONDS + size_bytes / 1e9 * PROBE_TIMEOUT_SECONDS_PER_GB) * 2 ** attempt)
+
+def run_ffprobe(file_path, timeout: float | None = None) -> dict:
+    if (timeout == None):
+        timeout = get_probe_timeout(file_path)
+
+    startup_info = None
+    if os.name == 'nt':  # Check if the OS is Windows
+        startup_info = subprocess.STARTUPINFO()
+        startup_info.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+    # file_path = 'F:\\Footage\\2024-06-22 валентина - арман\\camera1\\CLIP\\C0001.MP4'
+
+    cmd = [
+        # 'ffprobe', '-i', file_path, '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams'
+        'ffprobe', file_path, '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams'
+    ]
+
+    try:
+        if is_debug():
+            print_debug(f"Running command: {' '.join(cmd)}")
+
+        with trace.span("probe", "ffprobe", file_path=file_path) as probe_span, subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, startupinfo=startup_info) as proc:
+            with active_probe_processes_lock:
+                active_probe_processes.add(proc)
+            try:                
+                stdout, stderr = proc.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                stdout, stderr = proc.communicate()
+                raise ProbeTimeout(f"Timeout expired for ffprobe command on '{file_path}' ({timeout:.0f}s)")
+            finally:
+                with active_probe_processes_lock:
+                    active_probe_processes.discard(proc)
+
+            probe_span.set(exit_code=proc.returncode, output_bytes=len(stdout))
+            if proc.returncode != 0:
+                raise ProbeError(f"Error running ffprobe for '{file_path}' (exit code {proc.returncode}).\n command: {cmd}\n stderr:\n{stderr}\n\nstdout:\n{stdout}", is_file_error=True)
+
+            # print_debug(f"stdout: {stdout}")
+            try:
+                return json.loads(stdout)
+            except ValueError as e:
+                raise ProbeError(f"Invalid ffprobe output for '{file_path}': {e}", is_file_error=True) from e
+    except ProbeError:
+        raise
+    except Exception as e:
+        raise ProbeError(f"Error running ffprobe for '{file_path}': {str(e)}") from e
+
+def kill_active_probes() -> None:
+    with active_probe_processes_lock:
+        for proc in active_probe_processes:
+            proc.kill()
+
+def probe_file(file_path, use_native_parser: bool = True) -> dict:
+    # MP4/MOV headers are read in-process when possible, anything else goes through ffprobe
+    if (use_native_parser and mp4.is_supported_file(file_path)):
+        try:
+            with trace.span("probe", "native mp4", file_path=file_path):
+                return mp4.probe_mp4(file_path)
+        except mp4.Mp4ParseError as e:
+            print_debug(f"Native MP4 parser could not read '{file_path}' ({e}), falling back to ffprobe")
+
+    for attempt in range(PROBE_RETRIES + 1):
+        try:
+            return run_ffprobe(file_path, get_probe_timeout(file_path, attempt))
+        except ProbeTimeout as e:
+            if (attempt == PROBE_RETRIES):
+                raise
+            print_debug(f"{e}, retrying with a longer timeout")
+
+def get_clip_ffmpeg_metadata(file_path, use_native_parser: bool = True):
+    try:
+        return probe_file(file_path, use_native_parser)
+    except ProbeError as e:
+        print_error(str(e))
+        return None
+
+def build_clip_metadata(clipPath, clip_name, ffmpeg_metadata, issues=None) -> ClipMetadata:
+    # raises ProbeError when the probe output lacks what the sync needs; warnings go to `issues` (a ClipIssues) if given
+    try:
+        return read_clip_metadata(clipPath, clip_name, ffmpeg_metadata, issues)
+    except (KeyError, IndexError, TypeError, ValueError, OSError) as e:
+        raise ProbeError(f"Clip '{clip_name}': unexpected probe output ({type(e).__name__}: {e})", is_file_error=True) from e
+
+def read_clip_metadata(clipPath, clip_name, ffmpeg_metadata, issues=None) -> ClipMetadata:
+    video_streams = [stream for stream in ffmpeg_metadata["streams"] if stream["codec_type"] == "video"]
+
+    if (len(video_streams) == 0):
+        raise ProbeError(f"Clip '{clip_name}' does not have a video stream. Skipping this clip.", is_file_error=True)
+
+    if (len(video_streams) > 1):
+        message = f"Clip '{clip_name}' has more than one video stream. Only the first stream will be considered."
+        if (issues != None):
+            issues.add("warning", "probe", clipPath, message)
+        else:
+            print_warning(message)
+
+    main_video_stream = video_streams[0]                            
+    # file path, size, creation time etc.
+
+    creation_time_iso = ffmpeg_metadata["format"]["tags"]["creation_time"]
+    creation_time = datetime.fromisoformat(creation_time_iso)                        
+    os_creation_timestamp = os.path.getctime(clipPath)
+    os_creation_time = datetime.fromtimestamp(os_creation_timestamp)
+
+    if is_debug():
+        print_debug(f"Clip '{clip_name}': creation time (ffmpeg) = {creation_time}, creation time (OS) = {os_creation_time}")
+
+    # only the fields the sync uses are kept, not the ffprobe stream dicts
+    clip_metadata = ClipMetadata(
+        file_path=clipPath,
+        size_bytes=int(ffmpeg_metadata["format"]["size"]),
+        duration_seconds=float(ffmpeg_metadata["format"]["duration"]),
+        frame_rate=main_video_stream["r_frame_rate"],
+        nb_frames=int(float(main_video_stream["nb_frames"])),
+        creation_time=creation_time,
+        os_creation_time=os_creation_time,
+        width=int(main_video_stream["width"]),
+        height=int(main_video_stream["height"]),
+        codec_name=main_video_stream["codec_name"],
+    )
+
+    return clip_metadata
+
+class ProbePool:
+    # Worker threads shared by successive probe runs (the folders of a batch, see batch.py), started once for all of
+    # them. The pool grows to the number of workers the largest run needs; the runs must not overlap. Its owner shuts
+    # it down.
+    def __init__(self):
+        self.executor = None
+        self.nb_workers = 0
+
+    def get_executor(self, nb_workers: int) -> ThreadPoolExecutor:
+        if (nb_workers > self.nb_workers):
+            if (self.executor != None):
+                self.executor.shutdown(wait=False) # idle between runs: its threads exit at once
+            self.executor = ThreadPoolExecutor(max_workers=nb_workers, thread_name_prefix="ffprobe")
+            self.nb_workers = nb_workers
+        return self.executor
+
+    def shutdown(self) -> None:
+        if (self.executor != None):
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+            self.nb_workers = 0
+
+def probe_job(job: dict, use_native_parser: bool, process_result):
+    ffmpeg_metadata = probe_file(job["file_path"], use_native_parser)
+    return process_result(job, ffmpeg_metadata) if process_result != None else ffmpeg_metadata
+
+def probe_clips_parallel(probe_jobs: list[dict], concurrency: int, on_progress, is_cancelled, use_native_parser: bool = True, process_result=None, issues=None, on_result=None,
+                         device_concurrency: dict | None = None, nb_priority_jobs: int = 0, probe_pool: ProbePool | None = None) -> tuple[list, dict]:
+    # Runs ffprobe for the jobs on worker threads, with a queue and a number of concurrent probes per storage device
+    # (see devices.py: `concurrency` for SSDs, fewer for spinning disks and cards, more for network shares, or
+    # device_concurrency {mount point: probes}). Results are returned in the order of probe_jobs (None for clips that
+    # could not be probed). With process_result(job, ffmpeg_metadata), the worker returns what it makes of the probe
+    # output instead of the output itself, so that the ffprobe JSON of a clip is dropped as soon as it is read. Failures
+    # go to `issues` (a ClipIssues) if given, and the other clips are still probed.
+    # On each device the first nb_priority_jobs jobs start first, in the order of probe_jobs (the clips needed first),
+    # then the others by file path, so that a disk reads the files of a folder one after the other.
+    # on_progress(nb_probed, clips_per_second), on_result(job, result or None) and is_cancelled() are called from the
+    # calling thread only. The stats have the throughput of each device in probe_stats["devices"].
+    # The workers are those of probe_pool when given (see ProbePool), otherwise they are started for this run.
+    results = [None] * len(probe_jobs)
+    nb_probed = 0
+    start_time = time.perf_counter()
+
+    storage_devices = StorageDevices(device_concurrency, concurrency)
+    device_queues = {}
+    for job_index, job in enumerate(probe_jobs):
+        device_queues.setdefault(storage_devices.get_device(job["file_path"]), []).append(job_index)
+    for device, job_indexes in device_queues.items():
+        job_indexes.sort(key=lambda job_index: (0, job_index, "") if job_index < nb_priority_jobs else (1, 0, probe_jobs[job_index]["file_path"]))
+        device_queues[device] = collections.deque(job_indexes)
+    device_limits = {device: storage_devices.get_concurrency(device) for device in device_queues}
+    device_stats = {device: {"nb_clips": 0, "nb_failed": 0, "probe_seconds": 0.0, "first_start_time": None, "last_end_time": None} for device in device_queues}
+    device_in_flight = {device: 0 for device in device_queues}
+
+    # every device has workers for all its probes in flight: a probe never waits behind the probes of another device
+    nb_workers = max(1, sum(device_limits.values()))
+    executor = probe_pool.get_executor(nb_workers) if probe_pool != None else ThreadPoolExecutor(max_workers=nb_workers, thread_name_prefix="ffprobe")
+    futures = {}
+    try:
+        while (any(device_queues.values()) or len(futures) > 0):
+            if is_cancelled():
+                break
+
+            for device, job_queue in device_queues.items():
+                while (len(job_queue) > 0 and device_in_flight[device] < device_limits[device]):
+                    job_index = job_queue.popleft()
+                    submit_time = time.perf_counter()
+                    futures[executor.submit(probe_job, probe_jobs[job_index], use_native_parser, process_result)] = (job_index, device, submit_time)
+                    device_in_flight[device] += 1
+                    if (device_stats[device]["first_start_time"] == None):
+                        device_stats[device]["first_start_time"] = submit_time
+
+            done, _ = wait(futures, timeout=0.1, return_when=FIRST_COMPLETED)
+            end_time = time.perf_counter()
+            for future in done:
+                job_index, device, submit_time = futures.pop(future)
+                device_in_flight[device] -= 1
+                stats = device_stats[device]
+                stats["nb_clips"] += 1
+                stats["probe_seconds"] += end_time - submit_time
+                stats["last_end_time"] = end_time
+                try:
+                    results[job_index] = future.result()
+                except ProbeError as e:
+                    stats["nb_failed"] += 1
+                    if (issues != None):
+                        issues.add("error", "probe", probe_jobs[job_index]["file_path"], str(e), quarantine=e.is_file_error)
+                    else:
+                        print_error(str(e))
+                nb_probed += 1
+                if (on_result != None):
+                    on_result(probe_jobs[job_index], results[job_index])
+
+            elapsed_seconds = time.perf_counter() - start_time
+            on_progress(nb_probed, nb_probed / elapsed_seconds if elapsed_seconds > 0 else 0.0)
+    finally:
+        if (probe_pool != None):
+            # the pool is kept for the next run: only the probes of this run are stopped
+            for future in futures:
+                future.cancel()
+            kill_active_probes()
+            wait(futures)
+        else:
+            executor.shutdown(wait=False, cancel_futures=True)
+            kill_active_probes()
+            executor.shutdown(wait=True)
+
+    elapsed_seconds = time.perf_counter() - start_time
+    probe_stats = {
+        "nb_clips": nb_probed,
+        "concurrency": nb_workers,
+        "elapsed_seconds": elapsed_seconds,
+        "clips_per_second": nb_probed / elapsed_seconds if elapsed_seconds > 0 else 0.0,
+        "devices": [get_device_probe_stats(device, device_limits[device], stats) for device, stats in device_stats.items()],
+    }
+
+    return results, probe_stats
+
+def get_device_probe_stats(device: StorageDevice, concurrency: int, stats: dict) -> dict:
+    busy_seconds = stats["last_end_time"] - stats["first_start_time"] if stats["last_end_time"] != None else 0.0
+    return {
+        "device": str(device),
+        "mount_point": device.mount_point,
+        "kind": device.kind,
+        "concurrency": concurrency,
+        "nb_clips": stats["nb_clips"],
+        "nb_failed": stats["nb_failed"],
+        "busy_seconds": busy_seconds, # from the first probe started to the last one done on the device
+        "clips_per_second": stats["nb_clips"] / busy_seconds if busy_seconds > 0 else 0.0,
+        "mean_probe_seconds": stats["probe_seconds"] / stats["nb_clips"] if stats["nb_clips"] > 0 else 0.0,
+    }
+
+def format_device_probe_stats(device_probe_stats: list[dict]) -> str:
+    # one line per device, to tune settings.device_concurrency
+    lines = []
+    for stats in device_probe_stats:
+        lines.append(f"- {stats['device']}: {stats['nb_clips']} clips ({stats['nb_failed']} failed) in {stats['busy_seconds']:.1f}s, {stats['clips_per_second']:.1f} clips/s, "
+                     f"{stats['mean_probe_seconds'] * 1000:.0f} ms per clip, {stats['concurrency']} concurrent probes")
+    return "\n".join(lines)
+
+
+# --- Probe service client (the service itself is in probe_service.py) ---
+
+PROBE_SERVICE_PROTOCOL_VERSION = 1
+DEFAULT_PROBE_SERVICE_ADDRESS = "127.0.0.1:47851"
+PROBE_SERVICE_CONNECT_TIMEOUT = 0.5 # no service listening usually fails at once (connection refused)
+PROBE_SERVICE_IDLE_TIMEOUT = PROBE_MAX_TIMEOUT_SECONDS * (PROBE_RETRIES + 1) # longest a service probe of one clip may take with its retries
+
+class ProbeServiceError(Exception):
+    pass
+
+def parse_service_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    if (host == "" or not port.isdigit()):
+        raise ValueError(f"Invalid probe service address '{address}', expected HOST:PORT, e.g. {DEFAULT_PROBE_SERVICE_ADDRESS}")
+    return host, int(port)
+
+class LineReader:
+    # newline-delimited messages from a socket with a timeout, so that the caller can check for cancellation
+    def __init__(self, connection: socket.socket):
+        self.connection = connection
+        self.buffer = b""
+
+    def read_line(self) -> bytes | None:
+        # a complete line, None on timeout; raises ConnectionError when the service closed the connection
+        while (b"\n" not in self.buffer):
+            try:
+                data = self.connection.recv(1 << 16)
+            except socket.timeout:
+                return None
+            if (len(data) == 0):
+                raise ConnectionError("the probe service closed the connection")
+            self.buffer += data
+        line, self.buffer = self.buffer.split(b"\n", 1)
+        return line
+
+def request_clip_metadata(file_paths: list[str], address: str = DEFAULT_PROBE_SERVICE_ADDRESS, use_native_parser: bool = True, on_progress=None, is_cancelled=None, issues=None) -> dict | None:
+    # Returns {file_path: ClipMetadata | None (the service could not read the file)} for the files the service answered,
+    # which may be only part of them if the connection is lost, the service sends nothing for PROBE_SERVICE_IDLE_TIMEOUT
+    # (a stalled worker, a hung network mount) or the run is cancelled; None when no service is reachable.
+    # on_progress(nb_answered, clips_per_second) and is_cancelled() are called from the calling thread.
+    try:
+        connection = socket.create_connection(parse_service_address(address), timeout=PROBE_SERVICE_CONNECT_TIMEOUT)
+    except (OSError, ValueError) as e:
+        if is_debug():
+            print_debug(f"No probe service at {address} ({e}), probing in-process")
+        return None
+
+    results = {}
+    start_time = time.perf_counter()
+    try:
+        with connection:
+            connection.sendall(json.dumps({"version": PROBE_SERVICE_PROTOCOL_VERSION, "op": "probe", "paths": file_paths, "use_native_parser": use_native_parser}).encode("utf-8") + b"\n")
+            connection.settimeout(0.1)
+            line_reader = LineReader(connection)
+            last_answer_time = time.perf_counter()
+            while True:
+                if (is_cancelled != None and is_cancelled()):
+                    break
+                line = line_reader.read_line()
+                if (line == None and time.perf_counter() - last_answer_time > PROBE_SERVICE_IDLE_TIMEOUT):
+                    raise ProbeServiceError(f"no answer for {PROBE_SERVICE_IDLE_TIMEOUT}s")
+                if (line != None):
+                    last_answer_time = time.perf_counter()
+                    message = json.loads(line)
+                    if (message.get("done")):
+                        break
+                    if ("path" not in message):
+                        raise ProbeServiceError(message.get("error", "unexpected answer"))
+                    if ("metadata" in message):
+                        results[message["path"]] = ClipMetadata.from_dict(message["metadata"])
+                    else:
+                        error = f"Probe service could not read '{message['path']}': {message.get('error')}"
+                        if (issues != None):
+                            issues.add("error", "probe", message["path"], error, quarantine=message.get("is_file_error", False))
+                        else:
+                            print_error(error)
+                        results[message["path"]] = None
+                if (on_progress != None):
+                    elapsed_seconds = time.perf_counter() - start_time
+                    on_progress(len(results), len(results) / elapsed_seconds if elapsed_seconds > 0 else 0.0)
+    except (OSError, ValueError, ProbeServiceError) as e:
+        print_warning(f"Probe service at {address} failed after {len(results)} of {len(file_paths)} clips ({e}), probing the rest in-process")
+    return results
@@ -0,0 +1,241 @@
+# --- Probe service ---
+# Optional long-running process owning a warm probe worker pool and the metadata cache, shared by every sync run (and
+# every editor) that can reach it:
+#
+#   python -m multicam_sync.probe_service                            # listens on 127.0.0.1:47851
+#   python -m multicam_sync.probe_service --address 0.0.0.0:47851    # reachable from other workstations
+#
+# probe_clips asks the service for the clips missing from the local metadata cache (probe.request_clip_metadata) and
+# probes in-process whatever it could not answer (no service listening, connection lost). The service keeps the
+# ClipMetadata of every file it has seen in memory (validated against the file identity like the cache), so files
+# already probed by anyone are answered without touching ffprobe, and a file requested by several clients at once is
+# probed only once. When it is shared between workstations, the footage must be mounted at the same path on all of them.
+#
+# Protocol: newline-delimited JSON over TCP. The client sends {"version": 1, "op": "probe", "paths": [...],
+# "use_native_parser": true}; the service answers one line per path as soon as it is known, {"path": ..., "metadata":
+# {...}} (ClipMetadata.to_dict()) or {"path": ..., "error": "...", "is_file_error": bool}, then {"done": true}.
+
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from . import probe
+from .probe import PROBE_SERVICE_PROTOCOL_VERSION, DEFAULT_PROBE_SERVICE_ADDRESS, parse_service_address
+from .cache import MetadataCache, get_metadata_cache_path, get_file_identity
+from .clip_store import ClipMetadata
+from .log import print_debug, print_error, set_debug
+
+MAX_KNOWN_FILES = 1000000 # files kept in memory by the service, oldest dropped first
+
+
+# --- Service ---
+
+class ProbeService:
+    def __init__(self, concurrency: int, metadata_cache: MetadataCache | None):
+        self.concurrency = max(1, concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ffprobe")
+        self.metadata_cache = metadata_cache
+        self.cache_lock = threading.Lock() # the cache is shared by the connection threads, one at a time
+        self.lock = threading.Lock()
+        self.known_files = {} # file_path: (file identity, ClipMetadata)
+        self.in_flight = {} # file_path: Future of (ClipMetadata, None) or (None, ProbeError), shared by the requests
+        self.new_clip_metadata_by_path = {} # probed since the last cache write
+        self.stats = {"requests": 0, "files": 0, "memory_hits": 0, "cache_hits": 0, "probed": 0, "deduplicated": 0, "errors": 0}
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.flush_cache()
+        if (self.metadata_cache != None):
+            self.metadata_cache.close()
+
+    def count(self, key: str, value: int = 1) -> None:
+        with self.lock:
+            self.stats[key] += value
+
+    def get_known_metadata(self, file_path: str) -> ClipMetadata | None:
+        with self.lock:
+            known_file = self.known_files.get(file_path)
+        if (known_file == None or known_file[0] != get_file_identity(file_path)):
+            return None
+        return known_file[1]
+
+    def remember(self, file_path: str, clip_metadata: ClipMetadata) -> None:
+        identity = get_file_identity(file_path)
+        if (identity == None):
+            return
+        with self.lock:
+            self.known_files.pop(file_path, None)
+            self.known_files[file_path] = (identity, clip_metadata)
+            if (len(self.known_files) > MAX_KNOWN_FILES):
+                del self.known_files[next(iter(self.known_files))]
+
+    def probe_file(self, file_path: str, use_native_parser: bool) -> tuple[ClipMetadata | None, probe.ProbeError | None]:
+        # runs on the worker pool; never raises, so that one bad file does not stop the service
+        try:
+            ffmpeg_metadata = probe.probe_file(file_path, use_native_parser)
+            clip_metadata = probe.build_clip_metadata(file_path, os.path.basename(file_path), ffmpeg_metadata)
+        except probe.ProbeError as e:
+            self.count("errors")
+            return None, e
+        except Exception as e:
+            self.count("errors")
+            return None, probe.ProbeError(f"Unexpected error probing '{file_path}': {type(e).__name__}: {e}")
+        self.count("probed")
+        self.remember(file_path, clip_metadata)
+        with self.lock:
+            self.new_clip_metadata_by_path[file_path] = clip_metadata
+        return clip_metadata, None
+
+    def submit(self, file_path: str, use_native_parser: bool) -> Future:
+        # one probe per file at a time, whoever asks for it
+        with self.lock:
+            future = self.in_flight.get(file_path)
+            if (future != None):
+                self.stats["deduplicated"] += 1
+                return future
+            future = self.executor.submit(self.probe_file, file_path, use_native_parser)
+            self.in_flight[file_path] = future
+
+        def forget(done_future: Future) -> None:
+            with self.lock:
+                if (self.in_flight.get(file_path) is done_future):
+                    del self.in_flight[file_path]
+        future.add_done_callback(forget)
+        return future
+
+    def flush_cache(self) -> None:
+        with self.lock:
+            new_clip_metadata_by_path = self.new_clip_metadata_by_path
+            self.new_clip_metadata_by_path = {}
+        if (self.metadata_cache != None and len(new_clip_metadata_by_path) > 0):
+            with self.cache_lock:
+                self.metadata_cache.put_many(new_clip_metadata_by_path)
+
+    def handle_probe(self, file_paths: list[str], use_native_parser: bool, send) -> None:
+        # calls send(message) for each file as soon as its metadata is known
+        self.count("requests")
+        self.count("files", len(file_paths))
+
+        files_to_read = []
+        for file_path in file_paths:
+            clip_metadata = self.get_known_metadata(file_path)
+            if (clip_metadata == None):
+                files_to_read.append(file_path)
+                continue
+            self.count("memory_hits")
+            send({"path": file_path, "metadata": clip_metadata.to_dict()})
+
+        if (self.metadata_cache != None and len(files_to_read) > 0):
+            with self.cache_lock:
+                cached_metadata = self.metadata_cache.get_many(files_to_read)
+            for file_path, clip_metadata in cached_metadata.items():
+                self.remember(file_path, clip_metadata)
+                send({"path": file_path, "metadata": clip_metadata.to_dict()})
+            self.count("cache_hits", len(cached_metadata))
+            files_to_read = [file_path for file_path in files_to_read if file_path not in cached_metadata]
+
+        # a few probes per worker in flight for this request, so that a disconnected client leaves little work behind
+        try:
+            next_file_index = 0
+            futures = {}
+            while (next_file_index < len(files_to_read) or len(futures) > 0):
+                while (next_file_index < len(files_to_read) and len(futures) < self.concurrency * 4):
+                    futures[self.submit(files_to_read[next_file_index], use_native_parser)] = files_to_read[next_file_index]
+                    next_file_index += 1
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = futures.pop(future)
+                    clip_metadata, error = future.result()
+                    if (clip_metadata != None):
+                        send({"path": file_path, "metadata": clip_metadata.to_dict()})
+                    else:
+                        send({"path": file_path, "error": str(error), "is_file_error": error.is_file_error})
+        finally:
+            self.flush_cache()
+
+    def summary(self) -> str:
+        with self.lock:
+            stats = dict(self.stats)
+            nb_known_files = len(self.known_files)
+        return (f"Probe service: {stats['requests']} requests, {stats['files']} files ({stats['memory_hits']} from memory, {stats['cache_hits']} from the cache, "
+                f"{stats['probed']} probed, {stats['deduplicated']} shared with another request, {stats['errors']} errors), {nb_known_files} files in memory")
+
+
+class ProbeRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        service = self.server.probe_service
+        for line in self.rfile:
+            def send(message: dict) -> None:
+                self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+
+            try:
+                request = json.loads(line)
+                if (request.get("version") != PROBE_SERVICE_PROTOCOL_VERSION):
+                    send({"error": f"unsupported protocol version {request.get('version')}, the service speaks version {PROBE_SERVICE_PROTOCOL_VERSION}"})
+                elif (request.get("op") == "probe"):
+                    start_time = time.perf_counter()
+                    service.handle_probe(request["paths"], request.get("use_native_parser", True), send)
+                    print(f"{self.client_address[0]}: {len(request['paths'])} files in {time.perf_counter() - start_time:.2f}s")
+                else:
+                    send({"error": f"unknown operation '{request.get('op')}'"})
+                send({"done": True})
+            except (BrokenPipeError, ConnectionResetError):
+                print_debug(f"{self.client_address[0]}: client disconnected")
+                return
+            except (ValueError, KeyError) as e:
+                send({"error": f"invalid request: {e}"})
+                send({"done": True})
+
+
+class ProbeServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: str, probe_service: ProbeService):
+        self.probe_service = probe_service
+        super().__init__(parse_service_address(address), ProbeRequestHandler)
+
+
+# --- Entry point ---
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="multicam_sync.probe_service", description="Probe service shared by the sync runs: keeps a warm worker pool and the metadata of every clip already probed.")
+    parser.add_argument("--address", default=os.environ.get("MULTICAM_SYNC_PROBE_SERVICE", DEFAULT_PROBE_SERVICE_ADDRESS), help=f"HOST:PORT to listen on (default: {DEFAULT_PROBE_SERVICE_ADDRESS}; 0.0.0.0:PORT to serve other workstations)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="number of files probed in parallel")
+    parser.add_argument("--no-cache", action="store_true", help="only keep the metadata in memory, not in the metadata cache")
+    parser.add_argument("--cache-max-size-mb", type=int, default=256)
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args(argv)
+    set_debug(args.debug)
+
+    metadata_cache = None
+    if (not args.no_cache):
+        metadata_cache = MetadataCache(get_metadata_cache_path(), args.cache_max_size_mb * 1024 * 1024)
+    probe_service = ProbeService(args.workers, metadata_cache)
+    try:
+        server = ProbeServer(args.address, probe_service)
+    except (OSError, ValueError) as e:
+        print_error(f"Cannot listen on {args.address}: {e}")
+        probe_service.close()
+        return 1
+
+    print(f"Probe service listening on {args.address} with {probe_service.concurrency} workers" + (f", metadata cache '{metadata_cache.db_path}'" if metadata_cache != None else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        probe_service.close()
+        print(probe_service.summary())
+    return 0
+
+
+if (__name__ == "__main__"):
+    sys.exit(main())
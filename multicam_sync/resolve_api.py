@@ -0,0 +1,266 @@
+# --- Access to DaVinci Resolve ---
+# The sync only uses a handful of calls of the Resolve scripting API, described by the protocols below.
+# connect_resolve() imports DaVinciResolveScript lazily, so the rest of the package can be imported (and tested)
+# without Resolve. The Local* classes implement the same calls on top of a directory tree: each subdirectory
+# is a folder and each media file a clip, and clip properties and timelines built by the sync are kept in memory.
+
+import fnmatch
+import os
+from typing import Protocol
+
+from .timecode import FrameRate, Timecode
+
+
+class ResolveError(Exception):
+    pass
+
+
+class Clip(Protocol):
+    def GetName(self) -> str: ...
+    def GetClipProperty(self, property_name: str = None): ...
+    def SetClipProperty(self, property_name: str, value) -> bool: ...
+
+class Folder(Protocol):
+    def GetName(self) -> str: ...
+    def GetSubFolders(self) -> dict: ...
+    def GetClips(self) -> dict: ...
+
+class Timeline(Protocol):
+    def GetName(self) -> str: ...
+    def GetStartFrame(self) -> int: ...
+    def GetTrackCount(self, track_type: str) -> int: ...
+    def AddTrack(self, track_type: str) -> bool: ...
+    def SetTrackName(self, track_type: str, track_index: int, name: str) -> bool: ...
+    def SetStartTimecode(self, timecode: str) -> bool: ... # Resolve 18.5 and later
+
+class MediaPool(Protocol):
+    def GetRootFolder(self) -> Folder: ...
+    def GetCurrentFolder(self) -> Folder: ...
+    def CreateEmptyTimeline(self, name: str) -> Timeline: ...
+    def AppendToTimeline(self, clip_infos: list[dict]) -> list: ...
+
+class Project(Protocol):
+    def GetName(self) -> str: ...
+    def GetSetting(self, setting_name: str): ...
+    def GetMediaPool(self) -> MediaPool: ...
+    def GetTimelineCount(self) -> int: ...
+    def GetTimelineByIndex(self, timeline_index: int) -> Timeline: ...
+    def SetCurrentTimeline(self, timeline: Timeline) -> bool: ...
+
+
+def connect_resolve():
+    try:
+        import DaVinciResolveScript as dvr_script
+    except ImportError as e:
+        raise ResolveError("The DaVinciResolveScript module could not be imported. Run the script from DaVinci Resolve or set up the Resolve scripting environment (RESOLVE_SCRIPT_API, RESOLVE_SCRIPT_LIB, PYTHONPATH).") from e
+
+    resolve = dvr_script.scriptapp("Resolve")
+    if (resolve == None):
+        raise ResolveError("Could not connect to DaVinci Resolve. Make sure it is running and external scripting is enabled.")
+    return resolve
+
+def get_current_project(resolve) -> Project:
+    current_project = resolve.GetProjectManager().GetCurrentProject()
+    if (current_project == None):
+        raise ResolveError("No current_project is currently open. Please open a current_project and try again.")
+    return current_project
+
+def get_project_frame_rate(project: Project) -> FrameRate:
+    # Resolve returns the frame rate as a string, e.g. "25", "29.97" or "29.97 DF", and drop-frame as "0" or "1"
+    frame_rate_setting = str(project.GetSetting("timelineFrameRate")).strip()
+    drop_frame = frame_rate_setting.upper().endswith("DF") or str(project.GetSetting("timelineDropFrameTimecode")).strip() == "1"
+    try:
+        return FrameRate(frame_rate_setting.upper().removesuffix("DF").strip(), drop_frame)
+    except ValueError as e:
+        raise ResolveError(f"Unsupported timeline frame rate '{frame_rate_setting}': {e}") from e
+
+def find_folder(media_pool: MediaPool, folder_path: str | None = None) -> Folder:
+    # folder_path is a '/' separated path from the media pool root, e.g. "Footage/Day 1"; None means the selected folder
+    if (folder_path == None):
+        selected_folder = media_pool.GetCurrentFolder()
+        if (selected_folder == None):
+            raise ResolveError("Multiple folders selected: please select only one folder with subfolders representing the clips for each camera. E.g. footage/Camera1, footage/Camera2, etc.")
+        return selected_folder
+
+    folder = media_pool.GetRootFolder()
+    for folder_name in [name for name in folder_path.replace("\\", "/").split("/") if name]:
+        matching_folders = [sub_folder for sub_folder in folder.GetSubFolders().values() if sub_folder.GetName() == folder_name]
+        if (len(matching_folders) == 0):
+            raise ResolveError(f"Folder '{folder_name}' not found in '{folder.GetName()}' (path '{folder_path}')")
+        folder = matching_folders[0]
+    return folder
+
+def find_matching_folders(media_pool: MediaPool, pattern: str, root_path: str | None = None) -> list[tuple[str, Folder]]:
+    # (path, folder) of the folders under root_path (default: the media pool root) whose '/' separated path from there
+    # matches the fnmatch pattern, e.g. "Day *" or "*/Day *"; the subfolders of a matching folder are its cameras and
+    # are not searched. The paths include root_path, so that find_folder() finds them again.
+    root_folder = find_folder(media_pool, root_path) if root_path else media_pool.GetRootFolder()
+    root_prefix = "/".join(name for name in (root_path or "").replace("\\", "/").split("/") if name)
+    matching_folders = []
+    folders_to_search = [("", root_folder)]
+    while (len(folders_to_search) > 0):
+        relative_path, folder = folders_to_search.pop(0)
+        sub_folders = [(f"{relative_path}/{sub_folder.GetName()}" if relative_path else sub_folder.GetName(), sub_folder) for sub_folder in folder.GetSubFolders().values()]
+        for sub_folder_path, sub_folder in sub_folders:
+            if fnmatch.fnmatchcase(sub_folder_path, pattern):
+                matching_folders.append((f"{root_prefix}/{sub_folder_path}" if root_prefix else sub_folder_path, sub_folder))
+            else:
+                folders_to_search.append((sub_folder_path, sub_folder))
+    return matching_folders
+
+def get_unique_timeline_name(project: Project, name: str) -> str:
+    # CreateEmptyTimeline fails when the project already has a timeline with that name: "multicam" -> "multicam 2", ...
+    timeline_names = set()
+    for timeline_index in range(1, (project.GetTimelineCount() or 0) + 1):
+        timeline = project.GetTimelineByIndex(timeline_index)
+        if (timeline != None):
+            timeline_names.add(timeline.GetName())
+    unique_name = name
+    suffix = 2
+    while (unique_name in timeline_names):
+        unique_name = f"{name} {suffix}"
+        suffix += 1
+    return unique_name
+
+
+# --- Local stand-in ---
+
+VIDEO_FILE_EXTENSIONS = (".mp4", ".mov", ".m4v", ".mxf", ".mts", ".m2ts", ".avi", ".mkv", ".3gp")
+
+class LocalClip:
+    def __init__(self, file_path: str):
+        self.properties = {
+            "Clip Name": os.path.basename(file_path),
+            "File Path": file_path,
+            "Type": "Video",
+        }
+
+    def GetName(self) -> str:
+        return self.properties["Clip Name"]
+
+    def GetClipProperty(self, property_name: str = None):
+        if (property_name == None):
+            return dict(self.properties)
+        return self.properties.get(property_name, "")
+
+    def SetClipProperty(self, property_name: str, value) -> bool:
+        self.properties[property_name] = value
+        return True
+
+class LocalFolder:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.sub_folders = None
+        self.clips = None
+
+    def GetName(self) -> str:
+        return os.path.basename(os.path.normpath(self.directory))
+
+    def GetUniqueId(self) -> str:
+        return os.path.abspath(self.directory)
+
+    def GetSubFolders(self) -> dict:
+        # like Resolve, returns {1: folder, 2: folder, ...}
+        if (self.sub_folders == None):
+            directories = sorted(entry.path for entry in os.scandir(self.directory) if entry.is_dir())
+            self.sub_folders = {index + 1: LocalFolder(directory) for index, directory in enumerate(directories)}
+        return self.sub_folders
+
+    def GetClips(self) -> dict:
+        # media files anywhere under this directory, so card structures like camera1/CLIP/C0001.MP4 work as-is
+        if (self.clips == None):
+            file_paths = []
+            for directory, directory_names, file_names in os.walk(self.directory):
+                file_paths.extend(os.path.join(directory, file_name) for file_name in file_names if file_name.lower().endswith(VIDEO_FILE_EXTENSIONS))
+            self.clips = {index + 1: LocalClip(file_path) for index, file_path in enumerate(sorted(file_paths))}
+        return self.clips
+
+class LocalTimeline:
+    def __init__(self, name: str, frame_rate: FrameRate):
+        self.name = name
+        self.frame_rate = frame_rate
+        self.start_frame = 0
+        self.track_names = {"video": ["Video 1"], "audio": ["Audio 1"]}
+        self.items = [] # the clip infos given to AppendToTimeline
+
+    def GetName(self) -> str:
+        return self.name
+
+    def GetStartFrame(self) -> int:
+        return self.start_frame
+
+    def GetStartTimecode(self) -> str:
+        return self.frame_rate.format(self.start_frame)
+
+    def SetStartTimecode(self, timecode: str) -> bool:
+        self.start_frame = Timecode.from_timecode_str(timecode, self.frame_rate).total_frames
+        return True
+
+    def GetTrackCount(self, track_type: str) -> int:
+        return len(self.track_names.get(track_type, []))
+
+    def AddTrack(self, track_type: str) -> bool:
+        track_names = self.track_names.setdefault(track_type, [])
+        track_names.append(f"{track_type.capitalize()} {len(track_names) + 1}")
+        return True
+
+    def SetTrackName(self, track_type: str, track_index: int, name: str) -> bool:
+        track_names = self.track_names.get(track_type, [])
+        if (track_index < 1 or track_index > len(track_names)):
+            return False
+        track_names[track_index - 1] = name
+        return True
+
+class LocalMediaPool:
+    def __init__(self, root_directory: str, frame_rate: FrameRate):
+        self.root_folder = LocalFolder(root_directory)
+        self.frame_rate = frame_rate
+        self.timelines = []
+        self.current_timeline = None
+
+    def GetRootFolder(self) -> LocalFolder:
+        return self.root_folder
+
+    def GetCurrentFolder(self) -> LocalFolder:
+        return self.root_folder
+
+    def CreateEmptyTimeline(self, name: str) -> LocalTimeline | None:
+        if (any(timeline.name == name for timeline in self.timelines)):
+            return None
+        self.current_timeline = LocalTimeline(name, self.frame_rate)
+        self.timelines.append(self.current_timeline)
+        return self.current_timeline
+
+    def AppendToTimeline(self, clip_infos: list[dict]) -> list:
+        # like Resolve, appends to the current timeline and returns the added items
+        if (self.current_timeline == None):
+            return []
+        items = [dict(clip_info) for clip_info in clip_infos if clip_info["trackIndex"] <= self.current_timeline.GetTrackCount("video")]
+        self.current_timeline.items.extend(items)
+        return items
+
+class LocalProject:
+    def __init__(self, root_directory: str, frame_rate="25", drop_frame: bool = False):
+        self.settings = {"timelineFrameRate": str(frame_rate), "timelineDropFrameTimecode": "1" if drop_frame else "0"}
+        self.media_pool = LocalMediaPool(root_directory, FrameRate(frame_rate, drop_frame))
+
+    def GetName(self) -> str:
+        return f"Local: {self.media_pool.root_folder.directory}"
+
+    def GetSetting(self, setting_name: str):
+        return self.settings.get(setting_name, "")
+
+    def GetMediaPool(self) -> LocalMediaPool:
+        return self.media_pool
+
+    def GetTimelineCount(self) -> int:
+        return len(self.media_pool.timelines)
+
+    def GetTimelineByIndex(self, timeline_index: int) -> LocalTimeline | None:
+        if (timeline_index < 1 or timeline_index > len(self.media_pool.timelines)):
+            return None
+        return self.media_pool.timelines[timeline_index - 1]
+
+    def SetCurrentTimeline(self, timeline: LocalTimeline) -> bool:
+        self.media_pool.current_timeline = timeline
+        return True
@@ -0,0 +1,149 @@
+# --- Clip sequences ---
+# Cameras name their clips in sequences (C0001, C0002... or MVI_0001...). With settings.sample_clip_sequences, probe_clips
+# fully probes only the first and last clip of each run of consecutive numbers in a camera folder and one clip in
+# settings.sequence_sample_interval in between, and infers the metadata of the other clips from their file (stat
+# only, nothing is read from the file):
+# - the recording settings (frame rate, size, codec) are those of the probed clips around them,
+# - the duration is the file size at the bit rate of the probed clips around them,
+# - the start is the modification time, which cameras set when they close the file, minus the duration and minus the
+#   difference between the modification time and the end of the recording seen on the probed clips.
+# This only holds when the files kept their camera modification times and the camera records at a constant bit rate:
+# the probed clips around a clip must agree on both (SEQUENCE_CLOCK_TOLERANCE_SECONDS, SEQUENCE_BITRATE_TOLERANCE), and
+# an inferred clip must start after the previous clip ends and end before the next probed clip starts. Clips that fail
+# a check are probed after all. The inferred metadata is an estimate: it is not stored in the metadata cache.
+
+import os
+import re
+from datetime import datetime
+from fractions import Fraction
+
+from .clip_store import ClipMetadata
+
+SEQUENCE_NAME_PATTERN = re.compile(r"^(.*?)(\d+)(\D*)$") # prefix, clip number and suffix of a clip file name without its extension
+SEQUENCE_CLOCK_TOLERANCE_SECONDS = 2.0 # FAT file systems store modification times with a 2 s resolution
+SEQUENCE_BITRATE_TOLERANCE = 0.1 # relative bit rate difference between the probed clips around inferred clips
+
+
+def find_clip_runs(probe_jobs: list[dict]) -> list[list[dict]]:
+    # Runs of clips of a camera in the same directory with the same name apart from consecutive clip numbers, in number
+    # order; a clip whose name has no number is a run of its own
+    sequences = {}
+    runs = []
+    for probe_job in probe_jobs:
+        name, extension = os.path.splitext(os.path.basename(probe_job["file_path"]))
+        match = SEQUENCE_NAME_PATTERN.match(name)
+        if (match == None):
+            runs.append([probe_job])
+            continue
+        prefix, number, suffix = match.groups()
+        sequence_key = (probe_job["camera_name"], os.path.dirname(probe_job["file_path"]), prefix, suffix, extension.lower(), len(number))
+        sequences.setdefault(sequence_key, []).append((int(number), probe_job))
+
+    for numbered_jobs in sequences.values():
+        numbered_jobs.sort(key=lambda numbered_job: numbered_job[0])
+        run = []
+        previous_number = None
+        for number, probe_job in numbered_jobs:
+            if (previous_number != None and number != previous_number + 1):
+                runs.append(run)
+                run = []
+            run.append(probe_job)
+            previous_number = number
+        runs.append(run)
+    return runs
+
+def get_sampled_jobs(runs: list[list[dict]], sample_interval: int) -> list[dict]:
+    # the clips to probe fully: the first and last clip of each run and one clip in sample_interval in between
+    sample_interval = max(1, sample_interval)
+    sampled_jobs = []
+    for run in runs:
+        sampled_jobs.extend(probe_job for job_index, probe_job in enumerate(run) if job_index % sample_interval == 0 or job_index == len(run) - 1)
+    return sampled_jobs
+
+def get_end_timestamp(clip_metadata: ClipMetadata) -> float:
+    return clip_metadata.creation_time.timestamp() + clip_metadata.duration_seconds
+
+def get_clock_offset(clip_metadata: ClipMetadata) -> float | None:
+    # modification time of the file minus the end of the recording, None when the file cannot be read
+    try:
+        return os.stat(clip_metadata.file_path).st_mtime - get_end_timestamp(clip_metadata)
+    except OSError:
+        return None
+
+def can_infer_between(first_metadata: ClipMetadata | None, last_metadata: ClipMetadata | None) -> bool:
+    # the probed clips around a part of a run agree on the recording settings, the bit rate and the file clock
+    if (first_metadata == None or last_metadata == None):
+        return False
+    if ((first_metadata.frame_rate, first_metadata.width, first_metadata.height, first_metadata.codec_name) != (last_metadata.frame_rate, last_metadata.width, last_metadata.height, last_metadata.codec_name)):
+        return False
+    if (first_metadata.duration_seconds <= 0 or last_metadata.duration_seconds <= 0):
+        return False
+    first_bitrate = first_metadata.size_bytes / first_metadata.duration_seconds
+    last_bitrate = last_metadata.size_bytes / last_metadata.duration_seconds
+    if (abs(first_bitrate - last_bitrate) > SEQUENCE_BITRATE_TOLERANCE * max(first_bitrate, last_bitrate)):
+        return False
+    first_clock_offset = get_clock_offset(first_metadata)
+    last_clock_offset = get_clock_offset(last_metadata)
+    return first_clock_offset != None and last_clock_offset != None and abs(first_clock_offset - last_clock_offset) <= SEQUENCE_CLOCK_TOLERANCE_SECONDS
+
+def infer_run_metadata(run: list[dict], known_metadata: dict) -> tuple[dict, list[dict]]:
+    # ({file_path: inferred ClipMetadata}, jobs that could not be inferred) for the clips of the run missing from
+    # known_metadata ({file_path: ClipMetadata} of the probed, cached... clips)
+    inferred_metadata = {}
+    failed_jobs = []
+    job_index = 0
+    while (job_index < len(run)):
+        if (run[job_index]["file_path"] in known_metadata):
+            job_index += 1
+            continue
+        # the clips up to the next known one, between two known clips
+        end_index = job_index
+        while (end_index < len(run) and run[end_index]["file_path"] not in known_metadata):
+            end_index += 1
+        first_metadata = known_metadata.get(run[job_index - 1]["file_path"]) if job_index > 0 else None
+        last_metadata = known_metadata.get(run[end_index]["file_path"]) if end_index < len(run) else None
+        if (can_infer_between(first_metadata, last_metadata)):
+            segment_metadata, segment_failed_jobs = infer_segment_metadata(run[job_index:end_index], first_metadata, last_metadata)
+            inferred_metadata.update(segment_metadata)
+            failed_jobs.extend(segment_failed_jobs)
+        else:
+            failed_jobs.extend(run[job_index:end_index])
+        job_index = end_index
+    return inferred_metadata, failed_jobs
+
+def infer_segment_metadata(probe_jobs: list[dict], first_metadata: ClipMetadata, last_metadata: ClipMetadata) -> tuple[dict, list[dict]]:
+    bitrate = (first_metadata.size_bytes + last_metadata.size_bytes) / (first_metadata.duration_seconds + last_metadata.duration_seconds)
+    clock_offset = (get_clock_offset(first_metadata) + get_clock_offset(last_metadata)) / 2
+    frames_per_second = float(Fraction(first_metadata.frame_rate))
+    next_start_timestamp = last_metadata.creation_time.timestamp()
+
+    inferred_metadata = {}
+    failed_jobs = []
+    previous_end_timestamp = get_end_timestamp(first_metadata)
+    for probe_job in probe_jobs:
+        file_path = probe_job["file_path"]
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            failed_jobs.append(probe_job)
+            continue
+        duration_seconds = stat.st_size / bitrate
+        start_timestamp = stat.st_mtime - clock_offset - duration_seconds
+        if (duration_seconds <= 0 or start_timestamp < previous_end_timestamp - SEQUENCE_CLOCK_TOLERANCE_SECONDS
+                or start_timestamp + duration_seconds > next_start_timestamp + SEQUENCE_CLOCK_TOLERANCE_SECONDS):
+            failed_jobs.append(probe_job)
+            continue
+        inferred_metadata[file_path] = ClipMetadata(
+            file_path=file_path,
+            size_bytes=stat.st_size,
+            duration_seconds=duration_seconds,
+            frame_rate=first_metadata.frame_rate,
+            nb_frames=round(duration_seconds * frames_per_second),
+            creation_time=datetime.fromtimestamp(start_timestamp, first_metadata.creation_time.tzinfo),
+            os_creation_time=datetime.fromtimestamp(stat.st_ctime),
+            width=first_metadata.width,
+            height=first_metadata.height,
+            codec_name=first_metadata.codec_name,
+        )
+        previous_end_timestamp = start_timestamp + duration_seconds
+    return inferred_metadata, failed_jobs
@@ -0,0 +1,51 @@
+import os
+from dataclasses import dataclass, field
+from enum import Enum
+
+from .probe import DEFAULT_PROBE_SERVICE_ADDRESS
+
+
+class StartTimeSource(Enum):
+    OS_FILE_CREATION_TIME = 1
+    FORMAT_TAG_CREATION_TIME = 2
+    SIDECAR_CREATION_TIME = 3 # recording start in the camera sidecar XML (see sidecar.py), format tag for clips without one
+
+class OffsetSource(Enum):
+    CAMERA_START_TIME = 1 # cameras are assumed to have started recording at the same time
+    AUDIO_CROSS_CORRELATION = 2 # offsets are estimated by cross-correlating the audio of overlapping clips
+    VISUAL_LUMA_CORRELATION = 3 # offsets are estimated by cross-correlating the luma and scene changes of overlapping clips (no audio needed)
+
+
+@dataclass
+class SyncSettings:
+    start_time_source: StartTimeSource = StartTimeSource.FORMAT_TAG_CREATION_TIME
+    camera_property: str = "Angle"
+    show_ui: bool = True
+    debug: bool = False
+    multicam_clip_name: str = "multicam" # name of the timeline built from the synced clips
+    build_timeline: bool = True # build a timeline with one video track per camera and the clips at their start timecodes
+    timeline_per_session: bool = False # one timeline per recording session ("multicam - Session 1", ...) instead of one in all
+    clips_number_limit: int = 1000000
+    probe_concurrency: int = field(default_factory=lambda: os.cpu_count() or 4) # clips probed in parallel on each SSD or unknown storage device (see devices.py)
+    device_concurrency: dict = field(default_factory=dict) # {mount point: clips probed in parallel}, overriding the default of the device kind
+    use_metadata_cache: bool = True
+    clear_metadata_cache: bool = False
+    metadata_cache_max_size_mb: int = 256
+    retry_quarantined: bool = False # probe again the files that could not be read on a previous run (see MetadataCache.get_quarantined)
+    use_fingerprints: bool = True # sampled content fingerprints, to report duplicate clips and find moved files in the metadata cache
+    skip_duplicate_clips: bool = False # leave out the clips with the same content as a clip found earlier in the folder
+    sample_clip_sequences: bool = False # fast mode: probe the ends and a sample of each run of sequentially named clips, infer the others (see sequences.py)
+    sequence_sample_interval: int = 10 # with sample_clip_sequences, one clip in this many is probed inside a run
+    probe_output_dir: str | None = None # when set, the raw probe output of each probed clip is also written there as JSON
+    use_native_mp4_parser: bool = True
+    use_probe_service: bool = True # ask the probe service (see probe_service.py) for the clips missing from the metadata cache
+    probe_service_address: str = field(default_factory=lambda: os.environ.get("MULTICAM_SYNC_PROBE_SERVICE", DEFAULT_PROBE_SERVICE_ADDRESS)) # HOST:PORT of the probe service
+    offset_source: OffsetSource = OffsetSource.CAMERA_START_TIME
+    audio_sync_min_confidence: float = 0.2
+    visual_sync_min_confidence: float = 0.3
+    incremental: bool = False # only write clips that are new or changed since the previous sync of the folder
+    session_gap_seconds: float = 600 # a new recording session starts after a gap this long in all the cameras
+    session_property: str = "" # clip property receiving the session name ("Session 1", ...), e.g. "Scene"; empty to disable
+    plan_file: str | None = None # where run_sync saves the sync plan (default: plan.get_last_plan_path())
+    plan_only: bool = False # stop once the sync plan is saved, without writing anything to Resolve
+    trace_file: str | None = field(default_factory=lambda: os.environ.get("MULTICAM_SYNC_TRACE")) # Chrome trace JSON written at the end of the sync
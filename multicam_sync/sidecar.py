@@ -0,0 +1,143 @@
+# --- Camera sidecar metadata ---
+# Sony cameras (and others following the XDCAM NonRealTimeMeta schema) write an XML file next to each clip, e.g.
+# PRIVATE/M4ROOT/CLIP/C0001.MP4 and C0001M01.XML, holding the recording start time, the frame rate, the duration in
+# frames and the video format. Reading it is a small file read instead of an ffprobe process, so with
+# StartTimeSource.SIDECAR_CREATION_TIME the clips are read from their sidecars and only the clips without one are probed.
+# SidecarIndex lists each directory holding clips once and matches the clips to their sidecars by name; the XML is read
+# with iterparse, which stops as soon as the elements the sync needs have been seen.
+
+import os
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+from .clip_store import ClipMetadata
+from .log import is_debug, print_debug
+from .timecode import parse_frame_rate
+
+SIDECAR_EXTENSIONS = (".xml",)
+
+# C0001M01.XML is the sidecar of C0001.MP4 (the M01 suffix numbers the metadata revision)
+SIDECAR_SUFFIX_PATTERN = re.compile(r"^(?P<stem>.+?)M\d\d$", re.IGNORECASE)
+
+# videoCodec attribute prefix (e.g. "AVC_3840_2160_HP@L51") and the ffprobe codec name it stands for
+VIDEO_CODEC_PREFIXES = {
+    "AVC": "h264",
+    "HEVC": "hevc",
+    "MPEG2": "mpeg2video",
+    "MPEG4": "mpeg4",
+    "PRORES": "prores",
+}
+
+# elements read from the sidecar; parsing stops once they have all been seen
+SIDECAR_ELEMENTS = ("Duration", "CreationDate", "VideoFrame", "VideoLayout")
+
+
+class SidecarError(Exception):
+    pass
+
+
+def get_clip_keys(sidecar_name: str) -> list[str]:
+    # upper-case names (without extension) of the clips a sidecar may belong to: C0001M01.XML -> C0001M01, C0001
+    stem = os.path.splitext(sidecar_name)[0].upper()
+    match = SIDECAR_SUFFIX_PATTERN.match(stem)
+    return [stem, match.group("stem")] if match else [stem]
+
+
+class SidecarIndex:
+    def __init__(self):
+        self.sidecar_paths = {} # (directory, upper-case clip name without extension): sidecar path
+        self.scanned_directories = set()
+
+    def scan_directory(self, directory: str) -> None:
+        # one listing per directory, whatever the number of clips in it
+        if (directory in self.scanned_directories):
+            return
+        self.scanned_directories.add(directory)
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if (not entry.name.lower().endswith(SIDECAR_EXTENSIONS) or not entry.is_file()):
+                        continue
+                    # a sidecar named exactly after the clip (C0001.XML) wins over a suffixed one (C0001M01.XML)
+                    clip_keys = get_clip_keys(entry.name)
+                    self.sidecar_paths[(directory, clip_keys[0])] = entry.path
+                    for clip_key in clip_keys[1:]:
+                        self.sidecar_paths.setdefault((directory, clip_key), entry.path)
+        except OSError as e:
+            print_debug(f"Cannot list '{directory}' for sidecar files: {e}")
+
+    def find(self, file_path: str) -> str | None:
+        directory, file_name = os.path.split(file_path)
+        self.scan_directory(directory)
+        return self.sidecar_paths.get((directory, os.path.splitext(file_name)[0].upper()))
+
+
+def parse_format_fps(value: str):
+    # "25p", "29.97p", "50i" (fields per second: 25 frames) -> exact frame rate
+    match = re.fullmatch(r"\s*([0-9.]+)\s*([pPiI]?)\s*", value)
+    if (not match):
+        raise SidecarError(f"unknown frame rate '{value}'")
+    frame_rate = parse_frame_rate(match.group(1))
+    if (match.group(2).lower() == "i"):
+        frame_rate = frame_rate / 2
+    return frame_rate
+
+def get_codec_name(video_codec: str) -> str:
+    for prefix, codec_name in VIDEO_CODEC_PREFIXES.items():
+        if (video_codec.upper().startswith(prefix)):
+            return codec_name
+    return video_codec.split("_")[0].lower() or "unknown"
+
+def read_sidecar_elements(sidecar_path: str) -> dict:
+    # {element name: attributes} of the SIDECAR_ELEMENTS found in the sidecar
+    elements = {}
+    try:
+        with open(sidecar_path, "rb") as file:
+            for index, (_, element) in enumerate(ET.iterparse(file, events=("start",))):
+                name = element.tag.rpartition("}")[2] # without the namespace
+                if (index == 0 and name != "NonRealTimeMeta"):
+                    raise SidecarError(f"not a NonRealTimeMeta sidecar (root element '{name}')")
+                if (name in SIDECAR_ELEMENTS and name not in elements):
+                    elements[name] = dict(element.attrib)
+                    if (len(elements) == len(SIDECAR_ELEMENTS)):
+                        break
+    except ET.ParseError as e:
+        raise SidecarError(f"invalid XML: {e}") from e
+    return elements
+
+def read_sidecar_metadata(file_path: str, sidecar_path: str) -> ClipMetadata:
+    # ClipMetadata of the clip at file_path from its sidecar; raises SidecarError when the sidecar lacks what the sync needs
+    try:
+        elements = read_sidecar_elements(sidecar_path)
+        missing_elements = [name for name in ("Duration", "CreationDate", "VideoFrame") if name not in elements]
+        if (len(missing_elements) > 0):
+            raise SidecarError(f"missing {', '.join(missing_elements)}")
+
+        video_frame = elements["VideoFrame"]
+        frame_rate = parse_format_fps(video_frame.get("formatFps") or video_frame["captureFps"])
+        nb_frames = int(elements["Duration"]["value"])
+        creation_time = datetime.fromisoformat(elements["CreationDate"]["value"])
+        if (creation_time.tzinfo == None):
+            # could not be compared with the (UTC) creation times of the probed clips
+            raise SidecarError(f"creation date '{elements['CreationDate']['value']}' has no time zone")
+        video_layout = elements.get("VideoLayout", {})
+        file_stat = os.stat(file_path)
+    except (KeyError, ValueError, OSError) as e:
+        raise SidecarError(f"{type(e).__name__}: {e}") from e
+
+    if is_debug():
+        print_debug(f"Clip '{os.path.basename(file_path)}': creation time (sidecar) = {creation_time}")
+
+    return ClipMetadata(
+        file_path=file_path,
+        size_bytes=file_stat.st_size,
+        duration_seconds=float(nb_frames / frame_rate),
+        frame_rate=f"{frame_rate.numerator}/{frame_rate.denominator}",
+        nb_frames=nb_frames,
+        creation_time=creation_time,
+        os_creation_time=datetime.fromtimestamp(file_stat.st_ctime),
+        width=int(video_layout.get("pixel", 0)),
+        height=int(video_layout.get("numOfVerticalLine", 0)),
+        codec_name=get_codec_name(video_frame.get("videoCodec", "")),
+    )
@@ -0,0 +1,72 @@
+# --- Media pool snapshot ---
+# Every call on a Resolve object is a round trip to the Resolve process. take_snapshot() walks the selected folder once
+# and reads all the properties of each clip with a single GetClipProperty() call; the rest of the sync reads the
+# snapshot instead of Resolve, and only goes back to Resolve to write (clip.SetClipProperty).
+# clip_id is the position of the clip in the snapshot, not a Resolve id.
+
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
+
+from . import trace
+
+
+@dataclass(frozen=True, slots=True)
+class ClipSnapshot:
+    clip_id: int
+    camera_name: str
+    clip: object # the Resolve media pool item, for writes
+    properties: Mapping[str, str]
+
+    @property
+    def name(self) -> str:
+        return self.properties.get("Clip Name", "")
+
+    @property
+    def file_path(self) -> str:
+        return self.properties.get("File Path", "")
+
+    @property
+    def is_video_file(self) -> bool:
+        return "Video" in self.properties.get("Type", "")
+
+
+@dataclass(frozen=True, slots=True)
+class MediaPoolSnapshot:
+    folder_name: str
+    camera_names: tuple[str, ...] # one camera per subfolder, in media pool order
+    clips: tuple[ClipSnapshot, ...] # indexed by clip_id
+    clips_by_camera: Mapping[str, tuple[ClipSnapshot, ...]]
+    clips_by_file_path: Mapping[str, ClipSnapshot]
+
+    def get_clip(self, clip_id: int) -> ClipSnapshot:
+        return self.clips[clip_id]
+
+    def video_file_clips(self, camera_name: str) -> list[ClipSnapshot]:
+        return [clip for clip in self.clips_by_camera[camera_name] if clip.is_video_file]
+
+
+def take_snapshot(folder) -> MediaPoolSnapshot:
+    # one GetName() and GetClips() per subfolder, one GetClipProperty() per clip
+    camera_names = []
+    clips = []
+    clips_by_camera = {}
+    for sub_folder in folder.GetSubFolders().values():
+        camera_name = sub_folder.GetName()
+        camera_names.append(camera_name)
+        camera_clips = []
+        with trace.span("folder", camera_name) as folder_span:
+            for clip in sub_folder.GetClips().values():
+                properties = clip.GetClipProperty() or {}
+                camera_clips.append(ClipSnapshot(len(clips) + len(camera_clips), camera_name, clip, MappingProxyType(dict(properties))))
+            folder_span.set(nb_clips=len(camera_clips))
+        clips.extend(camera_clips)
+        clips_by_camera[camera_name] = tuple(camera_clips)
+
+    return MediaPoolSnapshot(
+        folder_name=folder.GetName(),
+        camera_names=tuple(camera_names),
+        clips=tuple(clips),
+        clips_by_camera=MappingProxyType(clips_by_camera),
+        clips_by_file_path=MappingProxyType({clip.file_path: clip for clip in clips if clip.file_path}),
+    )
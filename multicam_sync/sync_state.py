@@ -0,0 +1,98 @@
+# --- Applied sync state ---
+# What the last sync of a folder set in Resolve: the timeline zero time, the camera offsets and, for each clip, the
+# file identity, camera and start timecode. An incremental sync compares against it to only write what changed.
+# Kept in a SQLite database next to the metadata cache.
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from .cache import get_metadata_cache_path
+
+SYNC_STATE_SCHEMA_VERSION = 1
+
+def get_sync_state_path() -> str:
+    return os.path.join(os.path.dirname(get_metadata_cache_path()), "sync_state.sqlite")
+
+class SyncStateStore:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+
+        schema_version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if (schema_version != SYNC_STATE_SCHEMA_VERSION):
+            self.connection.execute("DROP TABLE IF EXISTS synced_folder")
+            self.connection.execute("DROP TABLE IF EXISTS applied_clip")
+            self.connection.execute(f"PRAGMA user_version = {SYNC_STATE_SCHEMA_VERSION}")
+
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS synced_folder (
+                folder_key TEXT PRIMARY KEY,
+                frame_rate TEXT NOT NULL,
+                start_time_source TEXT NOT NULL,
+                camera_property TEXT NOT NULL,
+                zero_creation_time TEXT NOT NULL,
+                camera_offsets TEXT NOT NULL,
+                synced_at REAL NOT NULL
+            )""")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS applied_clip (
+                folder_key TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                camera_name TEXT NOT NULL,
+                start_tc TEXT NOT NULL,
+                PRIMARY KEY (folder_key, file_path)
+            )""")
+        self.connection.commit()
+
+    def load(self, folder_key: str) -> dict | None:
+        row = self.connection.execute(
+            "SELECT frame_rate, start_time_source, camera_property, zero_creation_time, camera_offsets FROM synced_folder WHERE folder_key = ?", (folder_key,)).fetchone()
+        if (row == None):
+            return None
+
+        applied_clips = {}
+        for file_path, size_bytes, mtime_ns, inode, camera_name, start_tc in self.connection.execute(
+                "SELECT file_path, size_bytes, mtime_ns, inode, camera_name, start_tc FROM applied_clip WHERE folder_key = ?", (folder_key,)):
+            applied_clips[file_path] = {
+                "identity": (size_bytes, mtime_ns, inode),
+                "camera_name": camera_name,
+                "start_tc": start_tc,
+            }
+
+        return {
+            "frame_rate": row[0],
+            "start_time_source": row[1],
+            "camera_property": row[2],
+            "zero_creation_time": datetime.fromisoformat(row[3]),
+            "camera_offsets": json.loads(row[4]), # {camera_name: offset in frames}
+            "applied_clips": applied_clips,
+        }
+
+    def save(self, folder_key: str, frame_rate: str, start_time_source: str, camera_property: str, zero_creation_time: datetime, camera_offsets: dict, applied_clips: dict) -> None:
+        # replaces the state of the folder; applied_clips is {file_path: {"identity", "camera_name", "start_tc"}}
+        self.connection.execute(
+            "INSERT OR REPLACE INTO synced_folder (folder_key, frame_rate, start_time_source, camera_property, zero_creation_time, camera_offsets, synced_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (folder_key, frame_rate, start_time_source, camera_property, zero_creation_time.isoformat(), json.dumps(camera_offsets), time.time()))
+        self.connection.execute("DELETE FROM applied_clip WHERE folder_key = ?", (folder_key,))
+        self.connection.executemany(
+            "INSERT INTO applied_clip (folder_key, file_path, size_bytes, mtime_ns, inode, camera_name, start_tc) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(folder_key, file_path, *applied_clip["identity"], applied_clip["camera_name"], applied_clip["start_tc"])
+             for file_path, applied_clip in applied_clips.items() if applied_clip["identity"] != None])
+        self.connection.commit()
+
+    def delete(self, folder_key: str) -> None:
+        # forgets the folder, e.g. once its sync has been reverted
+        self.connection.execute("DELETE FROM synced_folder WHERE folder_key = ?", (folder_key,))
+        self.connection.execute("DELETE FROM applied_clip WHERE folder_key = ?", (folder_key,))
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
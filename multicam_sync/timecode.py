@@ -0,0 +1,302 @@
+# --- Timecodes ---
+# Timecodes are stored as an exact frame count; FrameRate does all the frame <-> time <-> label math with integers and
+# fractions (23.976 is 24000/1001, not 23.976), so no rounding error accumulates over a long shoot. NTSC rates count
+# labels on the nominal rate (30 for 29.97), and drop-frame labels skip frame numbers 0 and 1 (0-3 at 59.94) at the
+# start of every minute except every tenth minute.
+# start_timecodes() computes the start timecodes of many clips at once with NumPy when it is available.
+
+from datetime import datetime, timedelta
+from fractions import Fraction
+
+try:
+    import numpy as np
+except ImportError: # start_timecodes() falls back to a loop
+    np = None
+
+MICROSECONDS_PER_SECOND = 1000000
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# rates written in decimal by Resolve and in some metadata, and the exact rate they stand for
+NTSC_FRAME_RATES = {
+    "23.976": Fraction(24000, 1001),
+    "23.98": Fraction(24000, 1001),
+    "29.97": Fraction(30000, 1001),
+    "47.952": Fraction(48000, 1001),
+    "59.94": Fraction(60000, 1001),
+    "119.88": Fraction(120000, 1001),
+}
+
+
+def parse_frame_rate(value) -> Fraction:
+    # accepts 25, 29.97, "29.97", "30000/1001" or a Fraction
+    if isinstance(value, Fraction):
+        frame_rate = value
+    elif isinstance(value, int):
+        frame_rate = Fraction(value)
+    else:
+        text = str(value).strip()
+        if ("/" in text):
+            numerator, denominator = text.split("/", 1)
+            if (int(denominator) == 0):
+                raise ValueError(f"Invalid frame rate: {value}")
+            frame_rate = Fraction(int(numerator), int(denominator))
+        else:
+            text = f"{float(text):g}"
+            frame_rate = NTSC_FRAME_RATES.get(text, None) or Fraction(text)
+    if (frame_rate <= 0):
+        raise ValueError(f"Invalid frame rate: {value}")
+    return frame_rate
+
+
+class FrameRate:
+    __slots__ = ("rate", "drop_frame", "timebase", "dropped_frames", "frames_per_minute", "frames_per_10_minutes")
+
+    def __init__(self, frame_rate, drop_frame: bool = False):
+        self.rate = parse_frame_rate(frame_rate)
+        self.timebase = round(self.rate) # frames per second in the labels
+        if (self.timebase == 0):
+            raise ValueError(f"Frame rate {frame_rate} is below 1 frame per second")
+
+        if (drop_frame and (self.rate.denominator != 1001 or self.timebase % 30 != 0)):
+            raise ValueError(f"Drop-frame timecode is only defined for 29.97 and 59.94 fps, not {frame_rate}")
+        self.drop_frame = bool(drop_frame)
+        self.dropped_frames = 2 * self.timebase // 30 if self.drop_frame else 0
+        self.frames_per_minute = self.timebase * 60 - self.dropped_frames
+        self.frames_per_10_minutes = self.timebase * 600 - self.dropped_frames * 9
+
+    @classmethod
+    def of(cls, frame_rate):
+        # frame_rate as a FrameRate or anything parse_frame_rate accepts
+        if isinstance(frame_rate, FrameRate):
+            return frame_rate
+        return cls(frame_rate)
+
+    def __eq__(self, other):
+        if not isinstance(other, FrameRate):
+            return NotImplemented
+        return self.rate == other.rate and self.drop_frame == other.drop_frame
+
+    def __hash__(self):
+        return hash((self.rate, self.drop_frame))
+
+    def __float__(self):
+        return float(self.rate)
+
+    def __str__(self):
+        rate = f"{float(self.rate):.3f}".rstrip("0").rstrip(".")
+        return f"{rate} DF" if self.drop_frame else rate
+
+    def __repr__(self):
+        return f"FrameRate({self.rate.numerator}/{self.rate.denominator}{', drop_frame=True' if self.drop_frame else ''})"
+
+    # -- Frames <-> time --
+
+    def frames_from_microseconds(self, microseconds: int) -> int:
+        # frame containing the given instant (floor), exact for any rate
+        return (microseconds * self.rate.numerator) // (self.rate.denominator * MICROSECONDS_PER_SECOND)
+
+    def frames_from_timedelta(self, time_delta: timedelta) -> int:
+        return self.frames_from_microseconds(time_delta // ONE_MICROSECOND)
+
+    def microseconds_from_frames(self, total_frames: int) -> int:
+        return (total_frames * self.rate.denominator * MICROSECONDS_PER_SECOND) // self.rate.numerator
+
+    # -- Frames <-> labels --
+
+    def label_frames(self, total_frames: int) -> int:
+        # frame number shown in the label, counted at the timebase (differs from total_frames with drop-frame only)
+        if not self.drop_frame:
+            return total_frames
+        ten_minutes, remainder = divmod(total_frames, self.frames_per_10_minutes)
+        skipped = self.dropped_frames * 9 * ten_minutes
+        if (remainder >= self.dropped_frames):
+            skipped += self.dropped_frames * ((remainder - self.dropped_frames) // self.frames_per_minute)
+        return total_frames + skipped
+
+    def split(self, total_frames: int) -> tuple[int, int, int, int]:
+        seconds, frames = divmod(self.label_frames(total_frames), self.timebase)
+        minutes, seconds = divmod(seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        return hours, minutes, seconds, frames
+
+    def join(self, hours: int, minutes: int, seconds: int, frames: int) -> int:
+        total_frames = ((hours * 60 + minutes) * 60 + seconds) * self.timebase + frames
+        if self.drop_frame:
+            total_minutes = hours * 60 + minutes
+            total_frames -= self.dropped_frames * (total_minutes - total_minutes // 10)
+        return total_frames
+
+    def format(self, total_frames: int) -> str:
+        hours, minutes, seconds, frames = self.split(total_frames)
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}{';' if self.drop_frame else ':'}{frames:02d}"
+
+    def validate(self, hours: int, minutes: int, seconds: int, frames: int) -> None:
+        for name, value in (("Hours", hours), ("Minutes", minutes), ("Seconds", seconds), ("Frames", frames)):
+            if not isinstance(value, int):
+                raise ValueError(f"{name} value {value} is not an integer")
+
+        if (hours < 0):
+            raise ValueError(f"Hours value {hours} is negative")
+
+        if (minutes < 0 or minutes >= 60):
+            raise ValueError(f"Minutes value {minutes} is not in the range 0-59")
+
+        if (seconds < 0 or seconds >= 60):
+            raise ValueError(f"Seconds value {seconds} is not in the range 0-59")
+
+        if (frames < 0 or frames >= self.timebase):
+            raise ValueError(f"Frames value {frames} is not in the range 0-{self.timebase - 1}")
+
+        if (self.drop_frame and seconds == 0 and minutes % 10 != 0 and frames < self.dropped_frames):
+            raise ValueError(f"Frames value {frames} does not exist in drop-frame timecode at {hours:02d}:{minutes:02d}:00")
+
+    # -- Batches --
+
+    def frames_from_microseconds_batch(self, microseconds):
+        # vectorized frames_from_microseconds on an int64 array; split in whole seconds and remainder so that the
+        # products stay far below the int64 range even for deltas of several years at 120 fps
+        microseconds_per_unit = self.rate.denominator * MICROSECONDS_PER_SECOND
+        units, remainder = np.divmod(np.asarray(microseconds, dtype=np.int64), microseconds_per_unit)
+        return units * self.rate.numerator + (remainder * self.rate.numerator) // microseconds_per_unit
+
+    def format_batch(self, total_frames) -> list[str]:
+        label_frames = np.asarray(total_frames, dtype=np.int64)
+        if self.drop_frame:
+            ten_minutes, remainder = np.divmod(label_frames, self.frames_per_10_minutes)
+            minutes_in_ten = np.maximum(remainder - self.dropped_frames, 0) // self.frames_per_minute
+            label_frames = label_frames + self.dropped_frames * (9 * ten_minutes + minutes_in_ten)
+        seconds, frames = np.divmod(label_frames, self.timebase)
+        minutes, seconds = np.divmod(seconds, 60)
+        hours, minutes = np.divmod(minutes, 60)
+        separator = ";" if self.drop_frame else ":"
+        if (len(hours) == 0 or hours.max() > 99 or self.timebase > 100):
+            return [f"{h:02d}:{m:02d}:{s:02d}{separator}{f:02d}" for h, m, s, f in zip(hours.tolist(), minutes.tolist(), seconds.tolist(), frames.tolist())]
+
+        # write the "HH:MM:SS:FF" characters of all labels into one byte matrix: much faster than formatting each label
+        characters = np.empty((len(hours), 11), dtype=np.uint8)
+        for column, values in ((0, hours), (3, minutes), (6, seconds), (9, frames)):
+            characters[:, column] = ord("0") + values // 10
+            characters[:, column + 1] = ord("0") + values % 10
+        characters[:, [2, 5]] = ord(":")
+        characters[:, 8] = ord(separator)
+        return characters.view("S11").ravel().astype("U11").tolist()
+
+
+class Timecode:
+    # a frame count at a frame rate; hours/minutes/seconds/frames are the label fields
+    __slots__ = ("frame_rate", "total_frames")
+
+    def __init__(self, frame_rate, hours: int = 0, minutes: int = 0, seconds: int = 0, frames: int = 0):
+        frame_rate = FrameRate.of(frame_rate)
+        frame_rate.validate(hours, minutes, seconds, frames)
+        self.frame_rate = frame_rate
+        self.total_frames = frame_rate.join(hours, minutes, seconds, frames)
+
+    @property
+    def hours(self) -> int:
+        return self.frame_rate.split(self.total_frames)[0]
+
+    @property
+    def minutes(self) -> int:
+        return self.frame_rate.split(self.total_frames)[1]
+
+    @property
+    def seconds(self) -> int:
+        return self.frame_rate.split(self.total_frames)[2]
+
+    @property
+    def frames(self) -> int:
+        return self.frame_rate.split(self.total_frames)[3]
+
+    def __add__(self, other):
+        if not isinstance(other, Timecode):
+            return NotImplemented
+
+        return self.from_total_frames(self.total_frames + other.total_frames, self.frame_rate)
+
+    def __sub__(self, other):
+        if not isinstance(other, Timecode):
+            return NotImplemented
+
+        return self.from_total_frames(self.total_frames - other.total_frames, self.frame_rate)
+
+    def __eq__(self, other):
+        if not isinstance(other, Timecode):
+            return NotImplemented
+        return self.total_frames == other.total_frames and self.frame_rate == other.frame_rate
+
+    def __hash__(self):
+        return hash((self.total_frames, self.frame_rate))
+
+    def to_total_frames(self) -> int:
+        return self.total_frames
+
+    @classmethod
+    def from_total_frames(cls, total_frames: int, frame_rate):
+        if (total_frames < 0):
+            raise ValueError(f"Timecode of {total_frames} frames is negative")
+        timecode = cls.__new__(cls) # total_frames is always valid: skip the label validation
+        timecode.frame_rate = FrameRate.of(frame_rate)
+        timecode.total_frames = int(total_frames)
+        return timecode
+
+    @classmethod
+    def from_timecode_str(cls, timecode_str: str, frame_rate):
+        parts = timecode_str.strip().replace(";", ":").replace(".", ":").split(":")
+        if (len(parts) != 4):
+            raise ValueError(f"Invalid timecode format: {timecode_str}. Please use the format HH:MM:SS:FF")
+        try:
+            hours = int(parts[0])
+            minutes = int(parts[1])
+            seconds = int(parts[2])
+            frames = int(parts[3])
+        except ValueError as e:
+            raise ValueError(f"Invalid timecode format: {timecode_str}. Please use the format HH:MM:SS:FF") from e
+        return cls(frame_rate, hours, minutes, seconds, frames)
+
+    @classmethod
+    def from_timedelta(cls, time_delta: timedelta, frame_rate):
+        frame_rate = FrameRate.of(frame_rate)
+        return cls.from_total_frames(frame_rate.frames_from_timedelta(time_delta), frame_rate)
+
+    def to_timedelta(self) -> timedelta:
+        return timedelta(microseconds=self.frame_rate.microseconds_from_frames(self.total_frames))
+
+    def __str__(self):
+        return self.frame_rate.format(self.total_frames)
+
+    def __repr__(self):
+        return f"Timecode('{self}', {self.frame_rate!r})"
+
+
+def get_end_timecode(start_timecode: Timecode, nb_frames: int, frame_rate) -> Timecode:
+    frame_rate = FrameRate.of(frame_rate)
+    frames_per_hour = frame_rate.join(1, 0, 0, 0)
+    return Timecode.from_total_frames((start_timecode.total_frames + nb_frames) % frames_per_hour, frame_rate)
+
+
+def start_frames(creation_times: list[datetime], offset_frames: list[int], zero_creation_time: datetime, frame_rate):
+    # Start frame of each clip: the frame of its creation time on the timeline starting at zero_creation_time, minus the
+    # frame offset of its camera. An int64 array with NumPy, a list otherwise.
+    frame_rate = FrameRate.of(frame_rate)
+    microseconds = [(creation_time - zero_creation_time) // ONE_MICROSECOND for creation_time in creation_times]
+
+    if (np == None):
+        frames = [frame_rate.frames_from_microseconds(delta) - offset for delta, offset in zip(microseconds, offset_frames)]
+        if any(start_frame < 0 for start_frame in frames):
+            raise ValueError("A clip starts before the start of the timeline")
+        return frames
+
+    frames = frame_rate.frames_from_microseconds_batch(np.array(microseconds, dtype=np.int64)) - np.asarray(offset_frames, dtype=np.int64)
+    if (len(frames) > 0 and frames.min() < 0):
+        raise ValueError("A clip starts before the start of the timeline")
+    return frames
+
+def format_timecodes(frames, frame_rate) -> list[str]:
+    frame_rate = FrameRate.of(frame_rate)
+    if (np == None):
+        return [frame_rate.format(total_frames) for total_frames in frames]
+    return frame_rate.format_batch(frames)
+
+def start_timecodes(creation_times: list[datetime], offset_frames: list[int], zero_creation_time: datetime, frame_rate) -> list[str]:
+    return format_timecodes(start_frames(creation_times, offset_frames, zero_creation_time, frame_rate), frame_rate)
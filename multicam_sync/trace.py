@@ -0,0 +1,196 @@
+# --- Tracing ---
+# Spans for each phase, each clip, each probe, each Resolve API call and each UI refresh, exported as a Chrome trace
+# (chrome://tracing or https://ui.perfetto.dev) and summarized as a latency table. Tracing is off unless start() is
+# called: span() then returns a shared no-op span and the Resolve objects are not wrapped, so the cost is one check.
+# Spans: phase (sync steps), folder, clip (write-back), probe, resolve (scripting API calls), ui (progress refresh).
+#
+#   with trace.span("probe", "ffprobe", file_path=file_path) as probe_span:
+#       ...
+#       probe_span.set(exit_code=proc.returncode)
+
+import functools
+import json
+import os
+import threading
+import time
+
+tracer = None # the active Tracer, None when tracing is off
+
+
+class Span:
+    __slots__ = ("tracer", "category", "name", "args", "start_ns")
+
+    def __init__(self, tracer, category: str, name: str, args: dict):
+        self.tracer = tracer
+        self.category = category
+        self.name = name
+        self.args = args
+
+    def set(self, **args) -> None:
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        end_ns = time.perf_counter_ns()
+        if (exc_type != None):
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.category, self.name, self.start_ns, end_ns - self.start_ns, self.args)
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def set(self, **args) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    def __init__(self):
+        self.origin_ns = time.perf_counter_ns()
+        self.events = [] # (category, name, start_ns, duration_ns, thread id, args); list.append is thread-safe
+        self.thread_names = {}
+
+    def record(self, category: str, name: str, start_ns: int, duration_ns: int, args: dict) -> None:
+        thread = threading.current_thread()
+        self.thread_names[thread.ident] = thread.name
+        self.events.append((category, name, start_ns, duration_ns, thread.ident, args))
+
+    def to_chrome_trace(self) -> dict:
+        pid = os.getpid()
+        trace_events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": thread_name}}
+            for thread_id, thread_name in self.thread_names.items()
+        ]
+        for category, name, start_ns, duration_ns, thread_id, args in self.events:
+            trace_events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start_ns - self.origin_ns) / 1000,
+                "dur": duration_ns / 1000,
+                "pid": pid,
+                "tid": thread_id,
+                "args": {key: value if isinstance(value, (int, float, bool, type(None))) else str(value) for key, value in args.items()},
+            })
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def summary(self) -> str:
+        durations = {}
+        for category, name, start_ns, duration_ns, thread_id, args in self.events:
+            durations.setdefault((category, name), []).append(duration_ns / 1e6)
+
+        lines = [f"{'category':<10} {'span':<28} {'count':>7} {'total ms':>10} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for (category, name), values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+            values.sort()
+            lines.append(f"{category:<10} {name[:28]:<28} {len(values):7d} {sum(values):10.1f} {percentile(values, 50):9.3f} {percentile(values, 90):9.3f} {percentile(values, 99):9.3f} {values[-1]:9.3f}")
+        return "\n".join(lines)
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    # nearest-rank percentile of an already sorted list
+    index = max(0, min(len(sorted_values) - 1, int(round(percent / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def is_enabled() -> bool:
+    return tracer != None
+
+def start() -> None:
+    global tracer
+    tracer = Tracer()
+
+def stop(trace_file: str | None = None) -> str | None:
+    # stops tracing, writes the Chrome trace to trace_file and returns the summary table
+    global tracer
+    if (tracer == None):
+        return None
+    stopped_tracer = tracer
+    tracer = None
+
+    if (trace_file != None):
+        with open(trace_file, "w", encoding="utf-8") as file:
+            json.dump(stopped_tracer.to_chrome_trace(), file)
+    return stopped_tracer.summary()
+
+def span(category: str, name: str, **args):
+    if (tracer == None):
+        return NULL_SPAN
+    return Span(tracer, category, name, args)
+
+def traced(category: str):
+    # decorator: one span per call of the function, named after it
+    def decorator(function):
+        @functools.wraps(function)
+        def traced_function(*args, **kwargs):
+            if (tracer == None):
+                return function(*args, **kwargs)
+            with Span(tracer, category, function.__name__, {}):
+                return function(*args, **kwargs)
+        return traced_function
+    return decorator
+
+
+# --- Resolve API calls ---
+
+class TracedResolveObject:
+    # Proxy timing every method call of a Resolve scripting object; the objects it returns (folders, clips, the media
+    # pool...) are wrapped too, so wrapping the project is enough to trace all the calls made through it
+    __slots__ = ("target",)
+
+    def __init__(self, target):
+        object.__setattr__(self, "target", target)
+
+    def __getattr__(self, attribute_name: str):
+        attribute = getattr(self.target, attribute_name)
+        if not callable(attribute):
+            return attribute
+
+        def traced_call(*args, **kwargs):
+            # Resolve only accepts its own objects as arguments (e.g. the media pool items of AppendToTimeline clip infos)
+            args = unwrap_resolve_argument(list(args))
+            kwargs = unwrap_resolve_argument(kwargs)
+            with span("resolve", attribute_name, argument=args[0] if len(args) > 0 and not isinstance(args[0], (list, dict)) else None):
+                result = attribute(*args, **kwargs)
+            return wrap_resolve_result(result)
+        return traced_call
+
+    def __eq__(self, other):
+        return self.target == (other.target if isinstance(other, TracedResolveObject) else other)
+
+    def __hash__(self):
+        return hash(self.target)
+
+def wrap_resolve_result(result):
+    if isinstance(result, (str, bytes, int, float, bool, type(None))):
+        return result
+    if isinstance(result, dict):
+        return {key: wrap_resolve_result(value) for key, value in result.items()}
+    if isinstance(result, list):
+        return [wrap_resolve_result(value) for value in result]
+    return TracedResolveObject(result)
+
+def unwrap_resolve_argument(argument):
+    if isinstance(argument, TracedResolveObject):
+        return argument.target
+    if isinstance(argument, dict):
+        return {key: unwrap_resolve_argument(value) for key, value in argument.items()}
+    if isinstance(argument, list):
+        return [unwrap_resolve_argument(value) for value in argument]
+    return argument
+
+def trace_resolve_calls(resolve_object):
+    # wraps a Resolve object (e.g. the project) when tracing is on
+    if (tracer == None or resolve_object == None):
+        return resolve_object
+    return TracedResolveObject(resolve_object)
@@ -0,0 +1,539 @@
+# --- Tk user interface ---
+# Interactive flow used when the script is started from DaVinci Resolve (Workspace > Scripts > Timeit):
+# settings dialog, progress window, editable camera offsets and a final summary. All the work is done by core.py, on a
+# worker thread: the Tk thread only handles events and redraws the progress window from a queue at PROGRESS_REFRESH_HZ.
+
+import queue
+import threading
+import time
+import tkinter as tk
+from tkinter import simpledialog, messagebox, ttk
+
+from . import core, resolve_api, trace
+from .issues import ClipIssues
+from .plan import get_last_plan_path
+from .log import print_error, print_warning, set_debug, set_message_handler
+from .settings import StartTimeSource, OffsetSource, SyncSettings
+from .timecode import Timecode
+
+
+def show_message_box(level: str, message: str) -> None:
+    if (level == "error"):
+        messagebox.showerror("Error", message)
+    elif (level == "warning"):
+        messagebox.showwarning("Warning", message)
+    else:
+        messagebox.showinfo("Information", message)
+
+
+# Create a custom dialog class
+class SettingsDialog(simpledialog.Dialog):        
+    camera_names: list[str] = []
+
+    def __init__(self, parent, title, folder_name: str, camera_names: list[str], settings: SyncSettings):
+        self.folder_name = folder_name
+        self.camera_names = camera_names
+        self.settings = settings
+        super().__init__(parent, title)
+
+    def body(self, master):
+        self.result = None
+        settings = self.settings
+
+        tk.Label(master, text=f"Folder:").grid(row=0, sticky="W")        
+        tk.Label(master, text=f"{self.folder_name}").grid(row=0, column=1, sticky="W")
+
+        # Show detected cameras as Camera1, Camera2, etc.
+        tk.Label(master, text=f"Detected Cameras:").grid(row=1, sticky="W")        
+        tk.Label(master, text=', '.join(self.camera_names)).grid(row=1, column=1, sticky="W")
+
+        tk.Label(master, text="Start Time Source:").grid(row=2, sticky="W")
+        tk.Label(master, text="Camera Property:").grid(row=3, sticky="W")
+        tk.Label(master, text="Timeline Name:").grid(row=4, sticky="W")
+        tk.Label(master, text="Clips Number Limit:").grid(row=5, sticky="W")
+        tk.Label(master, text="Probe Workers:").grid(row=6, sticky="W")
+        tk.Label(master, text="Use Metadata Cache:").grid(row=7, sticky="W")
+        tk.Label(master, text="Clear Metadata Cache:").grid(row=8, sticky="W")
+        tk.Label(master, text="Native MP4 Parser:").grid(row=9, sticky="W")
+        tk.Label(master, text="Offset Source:").grid(row=10, sticky="W")
+        tk.Label(master, text="Incremental Sync:").grid(row=11, sticky="W")
+        tk.Label(master, text="Session Gap (s):").grid(row=12, sticky="W")
+        tk.Label(master, text="Session Property:").grid(row=13, sticky="W")
+        tk.Label(master, text="Retry Quarantined Files:").grid(row=14, sticky="W")
+        tk.Label(master, text="Build Timeline:").grid(row=15, sticky="W")
+        tk.Label(master, text="Timeline Per Session:").grid(row=16, sticky="W")
+        tk.Label(master, text="Debug:").grid(row=17, sticky="W")        
+
+        self.start_time_source_var = tk.StringVar(value=settings.start_time_source.name)
+        self.camera_property_var = tk.StringVar(value=settings.camera_property)
+        self.multicam_clip_name_var = tk.StringVar(value=settings.multicam_clip_name)
+        self.debug_var = tk.BooleanVar(value=settings.debug)
+        self.clips_number_limit_var = tk.IntVar(value=settings.clips_number_limit)
+        self.probe_concurrency_var = tk.IntVar(value=settings.probe_concurrency)
+        self.use_metadata_cache_var = tk.BooleanVar(value=settings.use_metadata_cache)
+        self.clear_metadata_cache_var = tk.BooleanVar(value=settings.clear_metadata_cache)
+        self.use_native_mp4_parser_var = tk.BooleanVar(value=settings.use_native_mp4_parser)
+        self.offset_source_var = tk.StringVar(value=settings.offset_source.name)
+        self.incremental_var = tk.BooleanVar(value=settings.incremental)
+        self.session_gap_seconds_var = tk.DoubleVar(value=settings.session_gap_seconds)
+        self.session_property_var = tk.StringVar(value=settings.session_property)
+        self.retry_quarantined_var = tk.BooleanVar(value=settings.retry_quarantined)
+        self.build_timeline_var = tk.BooleanVar(value=settings.build_timeline)
+        self.timeline_per_session_var = tk.BooleanVar(value=settings.timeline_per_session)
+
+        self.start_time_source_combobox = ttk.Combobox(master, textvariable=self.start_time_source_var, state="readonly")
+        self.start_time_source_combobox['values'] = [source.name for source in StartTimeSource]
+        self.start_time_source_combobox.grid(row=2, column=1, sticky="W")
+
+        self.camera_property_combobox = ttk.Combobox(master, textvariable=self.camera_property_var)
+        self.camera_property_combobox['values'] = ("Camera #", "Angle")
+        self.camera_property_combobox.grid(row=3, column=1, sticky="W")
+
+        self.multicam_clip_name_entry = tk.Entry(master, textvariable=self.multicam_clip_name_var)
+        self.multicam_clip_name_entry.grid(row=4, column=1, sticky="W")
+
+        self.clips_number_limit_entry = tk.Entry(master, textvariable=self.clips_number_limit_var)
+        self.clips_number_limit_entry.grid(row=5, column=1, sticky="W")
+
+        self.probe_concurrency_entry = tk.Entry(master, textvariable=self.probe_concurrency_var)
+        self.probe_concurrency_entry.grid(row=6, column=1, sticky="W")
+
+        self.use_metadata_cache_checkbox = tk.Checkbutton(master, variable=self.use_metadata_cache_var)
+        self.use_metadata_cache_checkbox.grid(row=7, column=1, sticky="W")
+
+        self.clear_metadata_cache_checkbox = tk.Checkbutton(master, variable=self.clear_metadata_cache_var)
+        self.clear_metadata_cache_checkbox.grid(row=8, column=1, sticky="W")
+
+        self.use_native_mp4_parser_checkbox = tk.Checkbutton(master, variable=self.use_native_mp4_parser_var)
+        self.use_native_mp4_parser_checkbox.grid(row=9, column=1, sticky="W")
+
+        self.offset_source_combobox = ttk.Combobox(master, textvariable=self.offset_source_var, state="readonly")
+        self.offset_source_combobox['values'] = [source.name for source in OffsetSource]
+        self.offset_source_combobox.grid(row=10, column=1, sticky="W")
+
+        self.incremental_checkbox = tk.Checkbutton(master, variable=self.incremental_var)
+        self.incremental_checkbox.grid(row=11, column=1, sticky="W")
+
+        self.session_gap_seconds_entry = tk.Entry(master, textvariable=self.session_gap_seconds_var)
+        self.session_gap_seconds_entry.grid(row=12, column=1, sticky="W")
+
+        self.session_property_combobox = ttk.Combobox(master, textvariable=self.session_property_var)
+        self.session_property_combobox['values'] = ("", "Scene", "Shot", "Comments")
+        self.session_property_combobox.grid(row=13, column=1, sticky="W")
+
+        self.retry_quarantined_checkbox = tk.Checkbutton(master, variable=self.retry_quarantined_var)
+        self.retry_quarantined_checkbox.grid(row=14, column=1, sticky="W")
+
+        self.build_timeline_checkbox = tk.Checkbutton(master, variable=self.build_timeline_var)
+        self.build_timeline_checkbox.grid(row=15, column=1, sticky="W")
+
+        self.timeline_per_session_checkbox = tk.Checkbutton(master, variable=self.timeline_per_session_var)
+        self.timeline_per_session_checkbox.grid(row=16, column=1, sticky="W")
+
+        self.debug_checkbox = tk.Checkbutton(master, variable=self.debug_var)
+        self.debug_checkbox.grid(row=17, column=1, sticky="W")
+
+        return self.start_time_source_combobox  # initial focus
+
+    def apply(self):
+        self.result = {
+            "start_time_source": self.start_time_source_var.get(),
+            "camera_property": self.camera_property_var.get(),
+            "multicam_clip_name": self.multicam_clip_name_var.get(),
+            "clips_number_limit": self.clips_number_limit_var.get(),
+            "probe_concurrency": self.probe_concurrency_var.get(),
+            "use_metadata_cache": self.use_metadata_cache_var.get(),
+            "clear_metadata_cache": self.clear_metadata_cache_var.get(),
+            "use_native_mp4_parser": self.use_native_mp4_parser_var.get(),
+            "offset_source": self.offset_source_var.get(),
+            "incremental": self.incremental_var.get(),
+            "session_gap_seconds": self.session_gap_seconds_var.get(),
+            "session_property": self.session_property_var.get().strip(),
+            "retry_quarantined": self.retry_quarantined_var.get(),
+            "build_timeline": self.build_timeline_var.get(),
+            "timeline_per_session": self.timeline_per_session_var.get(),
+            "debug": self.debug_var.get()
+        }
+
+
+class CameraOffsetsDialog(simpledialog.Dialog):
+    cameras: dict = {}
+
+    def __init__(self, parent, title, cameras: dict, frame_rate):
+        self.cameras = cameras
+        self.frame_rate = frame_rate
+        super().__init__(parent, title)
+
+    def body(self, master):
+        self.result = None
+
+        tk.Label(master, text="Camera").grid(row=0, column=0)
+        tk.Label(master, text="Offset").grid(row=0, column=1)
+
+        # confidence of the audio or visual sync of each camera, when the offsets were estimated from the clips
+        sync_key = next((key for key in ("audio_sync", "visual_sync") if any(key in camera for camera in self.cameras.values())), None)
+        if (sync_key != None):
+            tk.Label(master, text="Audio Sync Confidence" if sync_key == "audio_sync" else "Visual Sync Confidence").grid(row=0, column=2)
+
+        self.camera_offset_entries = {}
+
+        row_index = 1
+        for camera_name, camera in self.cameras.items():
+            tk.Label(master, text=camera_name).grid(row=row_index, column=0)
+            self.camera_offset_entries[camera_name] = tk.Entry(master)
+
+            self.camera_offset_entries[camera_name].grid(row=row_index, column=1)
+            self.camera_offset_entries[camera_name].insert(0, str(camera["offset"]))
+            if (sync_key != None):
+                tk.Label(master, text=camera.get(sync_key, "")).grid(row=row_index, column=2)
+            row_index += 1
+
+        return self.camera_offset_entries[camera_name] # initial focus
+
+    def apply(self) -> None:
+        self.result = {}
+        for camera_name, camera in self.cameras.items():
+            offset_str = self.camera_offset_entries[camera_name].get()
+
+            try:
+                self.result[camera_name] = Timecode.from_timecode_str(offset_str, self.frame_rate)
+            except ValueError as e:
+                print_error(f"Invalid timecode format for camera '{camera_name}': {offset_str}. Please use the format HH:MM:SS:FF")
+                return
+
+
+PROGRESS_REFRESH_HZ = 10
+ETA_MIN_ELAPSED_SECONDS = 2 # no ETA until the phase has run long enough for the rate to mean something
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds + 0.5), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours > 0 else f"{minutes}:{seconds:02d}"
+
+
+class ProgressWindow:
+    # update(), is_cancelled() and show_message() can be called from any thread; the window itself is only touched by
+    # the Tk thread, when it drains the event queue
+    def __init__(self, root):
+        self.root = root
+        self.tk_thread = threading.current_thread()
+        self.cancel_event = threading.Event()
+        self.events = queue.Queue()
+        self.phase = None
+        self.phase_start_time = time.perf_counter()
+
+        self.window = tk.Toplevel(root)
+        self.window.title("Processing Clips")
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.label = tk.Label(self.window, text="Processing clips...")
+        self.label.pack(pady=10)
+        self.progress_bar = ttk.Progressbar(self.window, orient="horizontal", length=300, mode="determinate")
+        self.progress_bar.pack(pady=10)
+        self.eta_label = tk.Label(self.window, text="")
+        self.eta_label.pack()
+
+        self.cancel_button = tk.Button(self.window, text="Cancel", command=self.cancel)
+        self.cancel_button.pack(pady=10)
+        self.window.update()
+
+    def cancel(self) -> None:
+        # the worker stops at the next clip; the window stays until it has
+        self.cancel_event.set()
+        self.label["text"] = "Cancelling..."
+        self.cancel_button["state"] = "disabled"
+
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def update(self, value: float | int, text) -> None:
+        self.events.put(("progress", value, text))
+
+    def show_message(self, level: str, message: str) -> None:
+        if (threading.current_thread() is self.tk_thread):
+            show_message_box(level, message)
+        else:
+            self.events.put(("message", level, message))
+
+    def refresh(self) -> None:
+        with trace.span("ui", "refresh"):
+            self.draw_pending_events()
+
+    def draw_pending_events(self) -> None:
+        # drain the queue: messages are shown in order, only the latest progress is drawn
+        latest_progress = None
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if (event[0] == "progress"):
+                latest_progress = event[1:]
+            else:
+                show_message_box(event[1], event[2])
+
+        if (latest_progress == None or self.is_cancelled()):
+            return
+
+        value, text = latest_progress
+        phase = text.split("...")[0]
+        if (phase != self.phase):
+            self.phase = phase
+            self.phase_start_time = time.perf_counter()
+
+        self.progress_bar["value"] = int(value)
+        self.label["text"] = text
+        self.eta_label["text"] = self.format_eta(value)
+
+    def format_eta(self, value: float) -> str:
+        elapsed_seconds = time.perf_counter() - self.phase_start_time
+        if (value <= 0 or value >= 100 or elapsed_seconds < ETA_MIN_ELAPSED_SECONDS):
+            return ""
+        remaining_seconds = elapsed_seconds * (100 - value) / value
+        return f"Elapsed {format_duration(elapsed_seconds)}, about {format_duration(remaining_seconds)} remaining"
+
+    def run_in_background(self, function, *args):
+        # Runs function(*args) on a worker thread while the Tk loop keeps running, and returns its result
+        # (or raises its exception) once it is done
+        return self.start_in_background(function, *args).wait()
+
+    def start_in_background(self, function, *args) -> "BackgroundTask":
+        # Starts function(*args) on a worker thread; the progress window is redrawn until it is done, also while a
+        # dialog is shown in the meantime
+        return BackgroundTask(self, function, *args)
+
+    def destroy(self) -> None:
+        self.refresh() # pending messages
+        self.window.destroy()
+
+
+class BackgroundTask:
+    # function(*args) running on a worker thread, see ProgressWindow.start_in_background
+    def __init__(self, progress_window: ProgressWindow, function, *args):
+        self.progress_window = progress_window
+        self.outcome = {}
+        self.until_event = None
+        self.woken = tk.BooleanVar(progress_window.window, value=False) # written when the task is done or until_event is set
+
+        def work() -> None:
+            try:
+                self.outcome["result"] = function(*args)
+            except BaseException as e:
+                self.outcome["error"] = e
+
+        self.worker = threading.Thread(target=work, name="multicam_sync", daemon=True)
+        self.worker.start()
+        self.progress_window.window.after(1000 // PROGRESS_REFRESH_HZ, self.poll)
+
+    def poll(self) -> None:
+        self.progress_window.refresh()
+        if (not self.worker.is_alive()):
+            self.woken.set(True)
+            return
+        if (self.until_event != None and self.until_event.is_set()):
+            self.until_event = None
+            self.woken.set(True)
+        self.progress_window.window.after(1000 // PROGRESS_REFRESH_HZ, self.poll)
+
+    def is_done(self) -> bool:
+        return not self.worker.is_alive()
+
+    def wait_until(self, event: threading.Event) -> bool:
+        # runs the Tk loop until the event is set (True) or the task is done first (False)
+        if (not event.is_set() and not self.is_done()):
+            self.until_event = event
+            self.progress_window.window.wait_variable(self.woken)
+        return event.is_set()
+
+    def wait(self):
+        # returns the result of the function (or raises its exception) once it is done
+        while (not self.is_done()):
+            self.progress_window.window.wait_variable(self.woken)
+        if ("error" in self.outcome):
+            raise self.outcome["error"]
+        return self.outcome.get("result")
+
+
+def show_settings_dialog(root, folder_name: str, camera_names: list[str], settings: SyncSettings) -> dict:
+    dialog_result = None
+    dialog = SettingsDialog(root, title="Timecode Generator Settings", folder_name=folder_name, camera_names=camera_names, settings=settings)
+    try:            
+        dialog.update_idletasks()            
+        dialog_result = dialog.result            
+    finally:
+        dialog.destroy()
+        
+    return dialog_result
+
+def apply_settings_dialog_result(settings: SyncSettings, dialog_result: dict) -> None:
+    settings.multicam_clip_name = dialog_result["multicam_clip_name"]
+    settings.start_time_source = StartTimeSource[dialog_result["start_time_source"]]
+    settings.camera_property = dialog_result["camera_property"]
+    settings.debug = dialog_result["debug"]
+    settings.clips_number_limit = dialog_result["clips_number_limit"]
+    settings.probe_concurrency = max(1, dialog_result["probe_concurrency"])
+    settings.use_metadata_cache = dialog_result["use_metadata_cache"]
+    settings.clear_metadata_cache = dialog_result["clear_metadata_cache"]
+    settings.use_native_mp4_parser = dialog_result["use_native_mp4_parser"]
+    settings.offset_source = OffsetSource[dialog_result["offset_source"]]
+    settings.incremental = dialog_result["incremental"]
+    settings.session_gap_seconds = dialog_result["session_gap_seconds"]
+    settings.session_property = dialog_result["session_property"]
+    settings.retry_quarantined = dialog_result["retry_quarantined"]
+    settings.build_timeline = dialog_result["build_timeline"]
+    settings.timeline_per_session = dialog_result["timeline_per_session"]
+
+def show_dialog_with_editable_camera_offsets(root, cameras: dict, frame_rate) -> dict:
+    dialog = CameraOffsetsDialog(root, title="Camera Offsets", cameras=cameras, frame_rate=frame_rate)
+    dialog.update_idletasks()
+    return dialog.result
+
+
+def run(settings: SyncSettings | None = None, project=None, folder_path: str | None = None) -> None:
+    if (settings == None):
+        settings = SyncSettings()
+    
+    root = tk.Tk()
+    root.withdraw()  # Hide the root window
+    set_message_handler(show_message_box)
+    
+    try:
+        if (project == None):
+            project = resolve_api.get_current_project(resolve_api.connect_resolve())
+        project = core.start_tracing(settings, project)
+        
+        print(f"Working with current_project '{project.GetName()}'")
+        frame_rate = resolve_api.get_project_frame_rate(project)
+        print(f"Current project frame rate: {frame_rate}")
+        
+        selected_folder = resolve_api.find_folder(project.GetMediaPool(), folder_path)
+        print(f"Currently selected folder: '{selected_folder.GetName()}'")
+        
+        # the folder is read once, before the dialog; the probe jobs keep the values of the clip properties the sync
+        # replaces, which include the camera and session properties chosen in the dialog
+        media_pool_snapshot = core.take_folder_snapshot(selected_folder)
+        
+        # ask the user if they want to proceed and show settings dialog
+        dialog_result = show_settings_dialog(root, selected_folder.GetName(), list(media_pool_snapshot.camera_names), settings)
+        if (dialog_result == None):
+            print_warning("Operation cancelled by user")
+            return
+        
+        apply_settings_dialog_result(settings, dialog_result)
+        set_debug(settings.debug)
+        probe_jobs = core.enumerate_sync_clips(selected_folder, settings, media_pool_snapshot)
+        
+        # clips that cannot be read or written are collected here and shown once in the final summary
+        issues = ClipIssues()
+        progress_window = ProgressWindow(root)
+        set_message_handler(progress_window.show_message)
+        try:
+            # with the camera start times, the offsets only depend on the earliest clip of each camera: they are shown as
+            # soon as the likely earliest clips are read, while the other clips are probed. Not with an incremental sync,
+            # which restores the offsets of the previous sync.
+            show_early_offsets = settings.show_ui and settings.offset_source == OffsetSource.CAMERA_START_TIME and not settings.incremental
+            provisional = {}
+            provisional_cameras_ready = threading.Event()
+
+            def on_provisional_cameras(provisional_cameras: dict) -> None:
+                provisional["cameras"] = provisional_cameras
+                provisional_cameras_ready.set()
+
+            probe_task = progress_window.start_in_background(lambda: core.probe_clips(probe_jobs, settings, frame_rate, progress_window.update, progress_window.is_cancelled, issues,
+                                                                                      on_provisional_cameras if show_early_offsets else None))
+            chosen_offsets = None
+            if (show_early_offsets and probe_task.wait_until(provisional_cameras_ready) and not probe_task.is_done()):
+                provisional_cameras = provisional["cameras"]
+                core.compute_offsets(provisional_cameras, settings, frame_rate)
+                chosen_offsets = show_dialog_with_editable_camera_offsets(root, provisional_cameras, frame_rate)
+                if (chosen_offsets == None):
+                    progress_window.cancel()
+                    try:
+                        probe_task.wait()
+                    except core.SyncCancelled:
+                        pass
+                    print_warning("Operation cancelled by user")
+                    return
+            cameras, report = probe_task.wait()
+
+            # duplicate clips are left out before the offsets are computed, as they would move the camera start times
+            duplicates = report["duplicates"]
+            if (len(duplicates) > 0 and not settings.skip_duplicate_clips and settings.show_ui):
+                progress_window.update(float(0), f"Waiting for user input... ({len(duplicates)} duplicate clips)")
+                progress_window.refresh()
+                examples = "\n".join(f"- {clip_record.camera_name}/{clip_record.clip_name} = {original_clip_record.camera_name}/{original_clip_record.clip_name}" for clip_record, original_clip_record in duplicates[:10])
+                settings.skip_duplicate_clips = messagebox.askyesno("Duplicate Clips",
+                    f"{len(duplicates)} clips have the same content as another clip of the folder (a card imported twice?):\n\n{examples}"
+                    + (f"\n... and {len(duplicates) - 10} more (see the console)" if len(duplicates) > 10 else "")
+                    + "\n\nSkip the duplicate clips? (No: sync them as they are)")
+            if (len(duplicates) > 0 and settings.skip_duplicate_clips):
+                cameras = core.remove_duplicate_clips(cameras, duplicates, settings, frame_rate)
+
+            def compute_offsets():
+                if (chosen_offsets != None):
+                    # the offsets chosen early, corrected for the clips probed since (the corrections are shown as warnings)
+                    zero_creation_time, _ = core.correct_provisional_offsets(cameras, provisional["cameras"], chosen_offsets, settings, frame_rate, progress_window.update, progress_window.is_cancelled)
+                    return zero_creation_time, None
+                zero_creation_time = core.compute_offsets(cameras, settings, frame_rate, progress_window.update, progress_window.is_cancelled)
+                previous_clips = None
+                if (settings.incremental):
+                    previous_clips = core.reconcile_with_previous_sync(cameras, zero_creation_time, core.load_sync_state(selected_folder), settings, frame_rate)
+                return zero_creation_time, previous_clips
+
+            zero_creation_time, previous_clips = progress_window.run_in_background(compute_offsets)
+            
+            if (settings.show_ui and chosen_offsets == None):
+                progress_window.update(float(0), f"Waiting for user input... ({len(probe_jobs)} clips)")
+                progress_window.refresh()
+                camera_offsets = show_dialog_with_editable_camera_offsets(root, cameras, frame_rate)
+                
+                if (camera_offsets == None):
+                    print_warning("Operation cancelled by user")
+                    return
+                
+                for camera_name, camera_offset in camera_offsets.items():
+                    cameras[camera_name]["offset"] = camera_offset
+            
+            def save_plan_and_write_sync():
+                # the plan is saved first, so that a failed or cancelled write can be finished with --apply-plan
+                sync_plan = core.make_sync_plan(selected_folder, probe_jobs, cameras, zero_creation_time, settings, frame_rate)
+                plan_path = core.save_sync_plan(sync_plan, settings.plan_file or get_last_plan_path())
+                try:
+                    return core.write_sync(selected_folder, cameras, zero_creation_time, settings, frame_rate, progress_window.update, progress_window.is_cancelled, previous_clips, issues, project)
+                except core.SyncError as e:
+                    raise type(e)(f"{e}\n\nThe sync plan is saved in '{plan_path}': python -m multicam_sync --apply-plan \"{plan_path}\" finishes the sync without probing again.") from e
+
+            sync_report = progress_window.run_in_background(save_plan_and_write_sync)
+            apply_result, analysis, timeline_result = sync_report["apply"], sync_report["analysis"], sync_report["timeline"]
+        finally:
+            progress_window.destroy()
+            set_message_handler(show_message_box)
+        
+        summary = f"Time codes and camera names have been set for {apply_result['nb_clips'] - apply_result['nb_failed']} clips."
+        summary += f"\n\n{len(analysis['sessions'])} recording sessions, {analysis['nb_overlapping_pairs']} overlapping clip pairs across cameras."
+        if (settings.session_property):
+            summary += f" Sessions are in the '{settings.session_property}' clip property."
+        if (timeline_result != None):
+            timeline_names = ", ".join(f"'{timeline['name']}'" for timeline in timeline_result["timelines"])
+            summary += f"\n\nTimeline {timeline_names}: {timeline_result['nb_added']} clips added in {timeline_result['elapsed_seconds']:.1f}s."
+        if (previous_clips != None):
+            summary += f"\n\n{apply_result['nb_added']} clips added, {apply_result['nb_updated']} updated, {apply_result['nb_skipped']} unchanged."
+        if (report["cache_summary"] != None):
+            summary += f"\n\n{report['cache_summary']}"
+        
+        issues_summary = issues.summary()
+        if (issues_summary != None):
+            messagebox.showwarning("Warning", f"{summary}\n\n{issues_summary}")
+        else:
+            messagebox.showinfo("Information", summary)
+    except core.SyncCancelled as e:
+        print_warning(str(e))
+    except (core.SyncError, resolve_api.ResolveError) as e:
+        print_error(str(e))
+    except Exception as e:
+        print_error(str(e))
+        raise e
+    finally:
+        core.finish_tracing(settings)
+        set_message_handler(None)
+        root.destroy()
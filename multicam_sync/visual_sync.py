@@ -0,0 +1,234 @@
+# --- Visual luma sync ---
+# Estimates the clock difference between each camera and a reference camera from the picture, for cameras without
+# usable audio: ffmpeg decodes a tiny grayscale stream (32x18) of a pair of overlapping clips through a pipe, each
+# frame is reduced to its mean luma and to a scene-change value (mean absolute difference with the previous frame),
+# and the two signatures are cross-correlated like the audio (see audio_sync.py). Lighting changes, flashes and people
+# crossing the frame show in every angle at the same time, even when the framings differ.
+# Decoding is what costs, so it is bounded like the audio: the coarse pass decodes only the key frames of a window of
+# each clip (ffmpeg -skip_frame nokey, a few frames per second to decode whatever the resolution of the footage), and
+# the fine pass decodes every frame of a few seconds around the coarse match, where the camera clip changes most. The
+# signatures are cached on disk, keyed by the clip fingerprint (or file identity) and the decoded range, so later runs
+# do not decode again.
+
+import hashlib
+import os
+import time
+
+import numpy as np
+
+from . import content_sync
+from .audio_sync import DEFAULT_MAX_LAG_SECONDS, cross_correlate, best_position, correlation_coefficient
+from .content_sync import ContentSyncError, read_ffmpeg_output, get_pair_segments
+from .cache import get_file_identity, get_metadata_cache_path
+from .log import print_debug
+
+SIGNATURE_WIDTH = 32
+SIGNATURE_HEIGHT = 18
+COARSE_FPS = 4.0 # key frames (usually 1 or 2 per second on cameras) are repeated up to this rate
+COARSE_SMOOTHING_SECONDS = 2.0 # the key frames of two cameras are not at the same times: their changes are spread over this
+FINE_FPS = 25.0
+DEFAULT_WINDOW_SECONDS = 180.0
+FINE_WINDOW_SECONDS = 10.0 # camera clip decoded at FINE_FPS around its most changing part
+FINE_MARGIN_SECONDS = 2.0 # around the coarse match in the reference clip (more than a key frame interval)
+SIGNATURE_CACHE_MAX_SIZE_BYTES = 64 * 1024 * 1024
+
+
+class VisualSyncError(ContentSyncError):
+    pass
+
+
+# --- Decoding ---
+
+def decode_luma(file_path, start_seconds: float, duration_seconds: float, fps: float, keyframes_only: bool) -> np.ndarray:
+    # (frames, SIGNATURE_HEIGHT * SIGNATURE_WIDTH) uint8 luma at `fps` frames per second
+    cmd = [
+        'ffmpeg', '-v', 'error', '-nostdin',
+        *(['-skip_frame', 'nokey'] if keyframes_only else []),
+        '-ss', f"{max(0.0, start_seconds):.3f}", '-t', f"{duration_seconds:.3f}", '-i', file_path,
+        '-an', '-sn', '-vf', f"fps={fps:g},scale={SIGNATURE_WIDTH}:{SIGNATURE_HEIGHT}:flags=area,format=gray",
+        '-f', 'rawvideo', 'pipe:1'
+    ]
+
+    frame_size = SIGNATURE_WIDTH * SIGNATURE_HEIGHT
+    frames = np.empty((int(duration_seconds * fps) + int(fps) + 1, frame_size), dtype=np.uint8)
+    nb_bytes = read_ffmpeg_output(cmd, memoryview(frames).cast("B"), file_path, "video", VisualSyncError)
+    if nb_bytes // frame_size < 2:
+        raise VisualSyncError(f"Clip '{file_path}' has no video in the requested range")
+
+    return frames[:nb_bytes // frame_size]
+
+
+def compute_signature(frames: np.ndarray) -> np.ndarray:
+    # (2, frames) float32: mean luma and scene change of each frame
+    frames = frames.astype(np.float32)
+    scene_change = np.empty(len(frames), dtype=np.float32)
+    scene_change[0] = 0.0
+    scene_change[1:] = np.abs(np.diff(frames, axis=0)).mean(axis=1)
+    return np.stack([frames.mean(axis=1), scene_change])
+
+
+def get_signature_cache_dir() -> str:
+    return os.path.join(os.path.dirname(get_metadata_cache_path()), "visual_signatures")
+
+
+def get_signature(clip: tuple, start_seconds: float, duration_seconds: float, fps: float, keyframes_only: bool, cache_dir: str | None) -> np.ndarray:
+    # signature of a range of the clip, read from the cache when it was already decoded; clip is (file_path,
+    # start_seconds, duration_seconds, fingerprint), the fingerprint being None when it was not computed
+    file_path, fingerprint = clip[0], clip[3]
+    cache_path = None
+    if (cache_dir != None):
+        clip_key = fingerprint or f"{os.path.abspath(file_path)}|{get_file_identity(file_path)}"
+        range_key = f"{clip_key}|{start_seconds:.3f}|{duration_seconds:.3f}|{fps:g}|{keyframes_only}|{SIGNATURE_WIDTH}x{SIGNATURE_HEIGHT}"
+        cache_path = os.path.join(cache_dir, hashlib.sha1(range_key.encode("utf-8")).hexdigest() + ".npy")
+        try:
+            signature = np.load(cache_path)
+            os.utime(cache_path) # recently used: pruned last
+            return signature
+        except (OSError, ValueError):
+            pass
+
+    signature = compute_signature(decode_luma(file_path, start_seconds, duration_seconds, fps, keyframes_only))
+    if (cache_path != None):
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temporary_path, "wb") as file:
+                np.save(file, signature)
+            os.replace(temporary_path, cache_path)
+        except OSError as e:
+            print_debug(f"Cannot cache the visual signature of '{file_path}': {e}")
+    return signature
+
+
+def prune_signature_cache(cache_dir: str, max_size_bytes: int = SIGNATURE_CACHE_MAX_SIZE_BYTES) -> None:
+    # drop the least recently used signatures until the cache fits in max_size_bytes
+    try:
+        entries = [entry for entry in os.scandir(cache_dir) if entry.name.endswith(".npy")]
+    except OSError:
+        return
+    entries = sorted(((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries), reverse=True)
+    total_size = 0
+    for _, size, path in entries:
+        total_size += size
+        if (total_size > max_size_bytes):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# --- Correlation ---
+
+def standardize(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.float64) - values.mean()
+    deviation = values.std()
+    return values / deviation if deviation > 0 else values
+
+
+def signature_signal(signature: np.ndarray) -> np.ndarray:
+    # what is correlated: the scene changes and the changes of the mean luma (not the mean luma itself, which depends
+    # on the framing and the exposure of each camera)
+    mean_luma, scene_change = signature
+    return standardize(scene_change) + standardize(np.abs(np.diff(mean_luma, prepend=mean_luma[0])))
+
+
+def smooth(signal: np.ndarray, length: int) -> np.ndarray:
+    if (length <= 1):
+        return signal
+    return np.convolve(signal, np.ones(length) / length, mode="same")
+
+
+def estimate_position(reference: np.ndarray, signal: np.ndarray, min_position: int, max_position: int) -> tuple[int, float]:
+    # where `signal` starts within `reference` (in frames, between min_position and max_position) and the correlation
+    # coefficient there (0..1)
+    min_position = max(min_position, -(len(signal) - 1))
+    max_position = min(max_position, len(reference) - 1)
+    if min_position > max_position:
+        raise VisualSyncError("The search range does not overlap the decoded video")
+    position = best_position(cross_correlate(reference, signal), min_position, max_position)
+    return position, max(0.0, correlation_coefficient(reference, signal, position))
+
+
+def most_changing_window(signal: np.ndarray, window_length: int) -> int:
+    # start of the window of the signal with the most scene changes, where the fine match is the most reliable
+    if (len(signal) <= window_length):
+        return 0
+    cumulative = np.concatenate([[0.0], np.cumsum(np.maximum(signal, 0.0))])
+    return int(np.argmax(cumulative[window_length:] - cumulative[:-window_length]))
+
+
+# --- Camera offsets ---
+
+def estimate_pair_offset(task: dict) -> dict:
+    # Runs in a worker: the clock difference (camera clock - reference clock) in seconds from one reference clip and
+    # one camera clip, as audio_sync.estimate_pair_offset
+    reference_clip = task["reference_clip"]
+    camera_clip = task["camera_clip"]
+    reference_path, reference_start, reference_duration = reference_clip[:3]
+    camera_path, camera_start = camera_clip[:2]
+    max_lag_seconds = task["max_lag_seconds"]
+    cache_dir = task["cache_dir"]
+    segments = get_pair_segments(task)
+    overlap_start = segments["overlap_start"]
+    segment_duration = segments["segment_duration"]
+    camera_segment_start = segments["camera_segment_start"]
+    reference_segment_start = segments["reference_segment_start"]
+    reference_segment_end = segments["reference_segment_end"]
+
+    started = time.perf_counter()
+
+    # coarse: key frames of the whole search range
+    smoothing_length = int(COARSE_SMOOTHING_SECONDS * COARSE_FPS)
+    reference_signal = smooth(signature_signal(get_signature(reference_clip, reference_segment_start, reference_segment_end - reference_segment_start, COARSE_FPS, True, cache_dir)), smoothing_length)
+    camera_signal = smooth(signature_signal(get_signature(camera_clip, camera_segment_start, segment_duration, COARSE_FPS, True, cache_dir)), smoothing_length)
+    nominal_position = (overlap_start - reference_start - reference_segment_start) * COARSE_FPS
+    max_lag = max_lag_seconds * COARSE_FPS
+    coarse_position, coarse_confidence = estimate_position(reference_signal, camera_signal, int(nominal_position - max_lag), int(nominal_position + max_lag))
+    # reference clip time where the camera segment starts
+    coarse_reference_time = reference_segment_start + coarse_position / COARSE_FPS
+
+    # fine: every frame of the most changing part of the camera segment, around the coarse match in the reference clip
+    fine_window_seconds = min(FINE_WINDOW_SECONDS, segment_duration)
+    fine_camera_offset = most_changing_window(camera_signal, int(fine_window_seconds * COARSE_FPS)) / COARSE_FPS
+    fine_reference_start = max(0.0, coarse_reference_time + fine_camera_offset - FINE_MARGIN_SECONDS)
+    fine_reference_end = min(reference_duration, coarse_reference_time + fine_camera_offset + fine_window_seconds + FINE_MARGIN_SECONDS)
+    reference_time = coarse_reference_time
+    confidence = coarse_confidence
+    try:
+        fine_reference_signal = signature_signal(get_signature(reference_clip, fine_reference_start, fine_reference_end - fine_reference_start, FINE_FPS, False, cache_dir))
+        fine_camera_signal = signature_signal(get_signature(camera_clip, camera_segment_start + fine_camera_offset, fine_window_seconds, FINE_FPS, False, cache_dir))
+        nominal_fine_position = (coarse_reference_time + fine_camera_offset - fine_reference_start) * FINE_FPS
+        margin = FINE_MARGIN_SECONDS * FINE_FPS
+        fine_position, confidence = estimate_position(fine_reference_signal, fine_camera_signal, int(nominal_fine_position - margin), int(nominal_fine_position + margin))
+        reference_time = fine_reference_start + fine_position / FINE_FPS - fine_camera_offset
+    except VisualSyncError as e:
+        # too close to the end of a clip for the fine window: the key frame match is kept
+        print_debug(f"Fine visual match of '{camera_path}' failed ({e}), keeping the key frame match")
+
+    clock_difference = (camera_start + camera_segment_start) - (reference_start + reference_time)
+
+    return {
+        "clock_difference_seconds": clock_difference,
+        "confidence": confidence,
+        "reference_clip": reference_path,
+        "clip": camera_path,
+        "elapsed_seconds": time.perf_counter() - started,
+    }
+
+
+def estimate_camera_offsets(cameras: dict, reference_camera: str, nominal_differences: dict,
+                            max_lag_seconds: float = DEFAULT_MAX_LAG_SECONDS,
+                            window_seconds: float = DEFAULT_WINDOW_SECONDS,
+                            max_workers: int | None = None,
+                            cache_dir: str | None = None,
+                            on_progress=None, is_cancelled=None) -> dict:
+    # cameras: {camera_name: [(file_path, start_seconds, duration_seconds, fingerprint), ...]} (start on the camera's own
+    # clock); nominal_differences: {camera_name: expected (camera clock - reference clock) in seconds}; cache_dir: where
+    # the signatures are cached (None: not cached)
+    # Returns {camera_name: estimate dict or None when no overlapping clip pair was found}, as audio_sync
+    task_parameters = {"max_lag_seconds": max_lag_seconds, "window_seconds": window_seconds, "cache_dir": cache_dir}
+    estimates = content_sync.estimate_camera_offsets(estimate_pair_offset, cameras, reference_camera, nominal_differences, task_parameters,
+                                                     max_workers, "visual_sync", on_progress, is_cancelled)
+    if (cache_dir != None):
+        prune_signature_cache(cache_dir)
+    return estimates
@@ -0,0 +1,334 @@
+# --- Ingest watch mode ---
+# Probes the footage while the cards are being copied, so that the metadata is already in the metadata cache when the
+# sync runs on the Resolve folder:
+#
+#   python -m multicam_sync.watch /Volumes/Ingest/Day1 /Volumes/Ingest/Day2
+#   python -m multicam_sync.watch --poll /mnt/share/ingest      # network shares: inotify does not see remote copies
+#
+# Changes are noticed with inotify on Linux and by polling the directory modification times elsewhere (or with --poll).
+# Neither probes on an event: an event only marks its directory to be listed again, so a card of thousands of files is
+# a few directory listings, whatever the number of events. A file is probed once its size and modification time have
+# not changed for --stable-seconds (a file still being copied keeps changing), and the probes run on a worker pool
+# while the watch goes on. The results go to the metadata cache, keyed by the file identity like any probe: the sync
+# must see the files at the same paths as the watch.
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import sqlite3
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import probe
+from .cache import MetadataCache, get_metadata_cache_path, get_file_identity
+from .log import print_debug, print_error, print_warning, set_debug
+from .resolve_api import VIDEO_FILE_EXTENSIONS
+
+WATCH_STABLE_SECONDS = 5.0 # a file is probed once it has not changed for this long
+WATCH_POLL_INTERVAL_SECONDS = 2.0 # directory modification times are checked this often when polling
+WATCH_TICK_SECONDS = 1.0 # the pending files are checked this often
+
+
+# --- inotify (Linux) ---
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# new files and directories; IN_MODIFY is left out, there would be one event per write of every copied file
+INOTIFY_WATCH_MASK = IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE | IN_DELETE_SELF
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyError(Exception):
+    pass
+
+
+class Inotify:
+    def __init__(self):
+        if (not sys.platform.startswith("linux")):
+            raise InotifyError("inotify is only available on Linux")
+        libc_name = ctypes.util.find_library("c")
+        if (libc_name == None):
+            raise InotifyError("C library not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if (self.fd < 0):
+            raise InotifyError(f"inotify_init1 failed: {os.strerror(ctypes.get_errno())}")
+        self.directories = {} # watch descriptor: directory
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+    def add_watch(self, directory: str) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), INOTIFY_WATCH_MASK)
+        if (wd < 0):
+            error = ctypes.get_errno()
+            if (error == errno.ENOSPC):
+                raise InotifyError("too many watched directories (raise fs.inotify.max_user_watches or use --poll)")
+            print_debug(f"Cannot watch '{directory}': {os.strerror(error)}")
+            return
+        self.directories[wd] = directory
+
+    def read_events(self, timeout: float) -> tuple[set, bool]:
+        # (directories with changes, whether events were lost) once something happened or after timeout seconds
+        changed_directories = set()
+        overflow = False
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        while (readable):
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while (offset < len(data)):
+                wd, mask, _, name_length = INOTIFY_EVENT_HEADER.unpack_from(data, offset)
+                offset += INOTIFY_EVENT_HEADER.size + name_length
+                if (mask & IN_Q_OVERFLOW):
+                    overflow = True
+                elif (mask & IN_DELETE_SELF):
+                    if (wd in self.directories):
+                        # listed again: it is dropped from the watch when the listing fails
+                        changed_directories.add(self.directories.pop(wd))
+                elif (wd in self.directories):
+                    changed_directories.add(self.directories[wd])
+            readable, _, _ = select.select([self.fd], [], [], 0)
+        return changed_directories, overflow
+
+
+# --- Watch ---
+
+def is_video_file_name(name: str) -> bool:
+    # hidden files are the temporary files of copy tools (rsync writes .C0001.MP4.XXXXXX and renames it at the end)
+    return not name.startswith(".") and name.lower().endswith(VIDEO_FILE_EXTENSIONS)
+
+
+class IngestWatcher:
+    def __init__(self, directories: list[str], metadata_cache: MetadataCache, concurrency: int, stable_seconds: float = WATCH_STABLE_SECONDS,
+                 use_native_parser: bool = True, use_inotify: bool = True):
+        self.root_directories = [os.path.abspath(directory) for directory in directories]
+        self.metadata_cache = metadata_cache
+        self.concurrency = max(1, concurrency)
+        self.stable_seconds = stable_seconds
+        self.use_native_parser = use_native_parser
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ffprobe")
+
+        self.inotify = None
+        if (use_inotify):
+            try:
+                self.inotify = Inotify()
+            except InotifyError as e:
+                print_warning(f"{e}: polling the directories every {WATCH_POLL_INTERVAL_SECONDS:.0f}s instead", show=False)
+
+        self.directory_mtimes = {} # directory: modification time (ns) when it was last listed
+        self.changed_directories = set() # directories to list again
+        self.known_files = {} # file_path: identity of the file when it was probed, cached or quarantined
+        self.pending_files = {} # file_path: (identity, time it was last seen changing)
+        self.in_flight = {} # Future: (file_path, identity before the probe), queued or being probed
+        self.in_flight_paths = set()
+        self.new_clip_metadata_by_path = {} # probed, not yet in the cache
+        self.new_quarantined_files = {} # file_path: reason
+        self.stats = {"probed": 0, "errors": 0, "cached": 0, "changed_while_probed": 0}
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        probe.kill_active_probes()
+        self.executor.shutdown(wait=True)
+        self.flush_cache()
+        if (self.inotify != None):
+            self.inotify.close()
+
+    def add_directory(self, directory: str) -> None:
+        if (directory in self.directory_mtimes):
+            return
+        self.directory_mtimes[directory] = None
+        # watched before it is listed, so that a file copied in between is not missed
+        if (self.inotify != None):
+            try:
+                self.inotify.add_watch(directory)
+            except InotifyError as e:
+                print_warning(f"{e}: polling the directories every {WATCH_POLL_INTERVAL_SECONDS:.0f}s instead", show=False)
+                self.inotify.close()
+                self.inotify = None
+        self.changed_directories.add(directory)
+
+    def list_directory(self, directory: str) -> list[str]:
+        # the new video files of the directory; subdirectories are added to the watch
+        new_file_paths = []
+        try:
+            self.directory_mtimes[directory] = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if (entry.is_dir(follow_symlinks=False)):
+                        self.add_directory(entry.path)
+                    elif (is_video_file_name(entry.name) and entry.path not in self.pending_files and entry.path not in self.in_flight_paths):
+                        # a known file is new again when it was replaced (e.g. a card copied twice)
+                        if (entry.path not in self.known_files or get_file_identity(entry.path) != self.known_files[entry.path]):
+                            new_file_paths.append(entry.path)
+        except OSError as e:
+            print_debug(f"Cannot list '{directory}': {e}")
+            self.directory_mtimes.pop(directory, None)
+        return new_file_paths
+
+    def poll_directories(self) -> None:
+        # a directory gets a new modification time when a file is created, renamed or deleted in it
+        for directory, mtime_ns in list(self.directory_mtimes.items()):
+            try:
+                if (os.stat(directory).st_mtime_ns != mtime_ns):
+                    self.changed_directories.add(directory)
+            except OSError:
+                self.directory_mtimes.pop(directory, None)
+
+    def scan_changed_directories(self) -> int:
+        # lists the changed directories (and the directories found in them); the new files start waiting to be stable
+        new_file_paths = []
+        while (len(self.changed_directories) > 0):
+            new_file_paths += self.list_directory(self.changed_directories.pop())
+        if (len(new_file_paths) == 0):
+            return 0
+
+        # files already in the cache (e.g. after a restart of the watch) or quarantined are not probed again
+        known_files = {**self.metadata_cache.get_many(new_file_paths), **self.metadata_cache.get_quarantined(new_file_paths)}
+        now = time.monotonic()
+        for file_path in new_file_paths:
+            identity = get_file_identity(file_path)
+            if (identity == None):
+                continue
+            if (file_path in known_files):
+                self.known_files[file_path] = identity
+            else:
+                self.pending_files[file_path] = (identity, now)
+        return len(new_file_paths) - len(known_files)
+
+    def check_pending_files(self) -> None:
+        # a file whose identity did not change for stable_seconds is no longer being copied
+        now = time.monotonic()
+        for file_path, (identity, changed_at) in list(self.pending_files.items()):
+            current_identity = get_file_identity(file_path)
+            if (current_identity == None):
+                del self.pending_files[file_path]
+            elif (current_identity != identity):
+                self.pending_files[file_path] = (current_identity, now)
+            elif (now - changed_at >= self.stable_seconds):
+                del self.pending_files[file_path]
+                self.in_flight[self.executor.submit(self.probe_file, file_path)] = (file_path, identity)
+                self.in_flight_paths.add(file_path)
+
+    def probe_file(self, file_path: str):
+        ffmpeg_metadata = probe.probe_file(file_path, self.use_native_parser)
+        return probe.build_clip_metadata(file_path, os.path.basename(file_path), ffmpeg_metadata)
+
+    def collect_probe_results(self) -> None:
+        # once per tick, so that the cache is written in batches
+        for future in [future for future in self.in_flight if future.done()]:
+            file_path, identity = self.in_flight.pop(future)
+            self.in_flight_paths.discard(file_path)
+            current_identity = get_file_identity(file_path)
+            if (current_identity != identity):
+                # the copy went on after a pause longer than stable_seconds: the file waits to be stable again
+                self.stats["changed_while_probed"] += 1
+                if (current_identity != None):
+                    self.pending_files[file_path] = (current_identity, time.monotonic())
+                continue
+            try:
+                self.new_clip_metadata_by_path[file_path] = future.result()
+                self.stats["probed"] += 1
+            except probe.ProbeError as e:
+                print_error(str(e), show=False)
+                self.stats["errors"] += 1
+                if (e.is_file_error):
+                    self.new_quarantined_files[file_path] = str(e).splitlines()[0]
+            self.known_files[file_path] = identity
+
+    def flush_cache(self) -> None:
+        # the sync may be reading the cache at the same time: what cannot be written now is written on the next tick
+        try:
+            if (len(self.new_clip_metadata_by_path) > 0):
+                self.metadata_cache.put_many(self.new_clip_metadata_by_path)
+                self.stats["cached"] += len(self.new_clip_metadata_by_path)
+                self.new_clip_metadata_by_path = {}
+            if (len(self.new_quarantined_files) > 0):
+                self.metadata_cache.quarantine_many(self.new_quarantined_files)
+                self.new_quarantined_files = {}
+        except sqlite3.OperationalError as e:
+            print_debug(f"Cannot write to the metadata cache now ({e}), retrying")
+
+    def status(self) -> str:
+        return (f"{self.stats['probed']} clips probed ({self.stats['errors']} errors), {len(self.pending_files)} being copied, "
+                f"{len(self.in_flight)} waiting for a probe, {len(self.directory_mtimes)} directories watched")
+
+    def run(self, is_stopped=lambda: False) -> None:
+        for directory in self.root_directories:
+            self.add_directory(directory)
+        last_poll_time = time.monotonic()
+        last_status = None
+        while (not is_stopped()):
+            if (self.inotify != None):
+                changed_directories, overflow = self.inotify.read_events(WATCH_TICK_SECONDS)
+                self.changed_directories |= changed_directories
+                if (overflow):
+                    # events were lost: every directory is listed again
+                    self.changed_directories |= set(self.directory_mtimes)
+            else:
+                time.sleep(WATCH_TICK_SECONDS)
+                if (time.monotonic() - last_poll_time >= WATCH_POLL_INTERVAL_SECONDS):
+                    self.poll_directories()
+                    last_poll_time = time.monotonic()
+
+            nb_new_files = self.scan_changed_directories()
+            if (nb_new_files > 0):
+                print_debug(f"{nb_new_files} new files")
+            self.check_pending_files()
+            self.collect_probe_results()
+            self.flush_cache()
+
+            status = self.status()
+            if (status != last_status):
+                print(status)
+                last_status = status
+
+
+# --- Entry point ---
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="multicam_sync.watch", description="Watch the ingest directories and probe the clips as soon as they are copied, so that the sync finds their metadata in the metadata cache.")
+    parser.add_argument("directories", nargs="+", metavar="DIRECTORY", help="directories the cards are copied to (watched with their subdirectories)")
+    parser.add_argument("--poll", action="store_true", help="poll the directories instead of using inotify (network shares)")
+    parser.add_argument("--stable-seconds", type=float, default=WATCH_STABLE_SECONDS, help="probe a file once it has not changed for this long (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="number of files probed in parallel")
+    parser.add_argument("--no-native-mp4-parser", action="store_true", help="probe every file with ffprobe")
+    parser.add_argument("--cache-max-size-mb", type=int, default=256)
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args(argv)
+    set_debug(args.debug)
+
+    missing_directories = [directory for directory in args.directories if not os.path.isdir(directory)]
+    if (len(missing_directories) > 0):
+        print_error(f"Not a directory: {', '.join(missing_directories)}")
+        return 1
+
+    metadata_cache = MetadataCache(get_metadata_cache_path(), args.cache_max_size_mb * 1024 * 1024)
+    watcher = IngestWatcher(args.directories, metadata_cache, args.workers, args.stable_seconds, not args.no_native_mp4_parser, not args.poll)
+    print(f"Watching {', '.join(watcher.root_directories)} ({'inotify' if watcher.inotify != None else 'polling'}), metadata cache '{metadata_cache.db_path}'")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        metadata_cache.close()
+        print(watcher.status())
+    return 0
+
+
+if (__name__ == "__main__"):
+    sys.exit(main())